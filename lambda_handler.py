@@ -260,11 +260,16 @@ async def run_optimization(case_data: Dict[str, Any], run_id: str):
                     "objective_value": objective
                 })
             
+            # A case rejected without solving (e.g. solver.capacity_precheck = "reject")
+            rejected = meta.get('rejected')
             result = {
-                'status': 'completed',
+                'status': 'rejected' if rejected else 'completed',
                 'solutions': solutions,
-                'solver_stats': meta.get('phase2', {})
+                'solver_stats': meta.get('phase2') or {}
             }
+            if rejected:
+                result['rejected'] = rejected
+                result['capacity_precheck'] = meta.get('capacity_precheck')
             
         finally:
             # Clean up temp file
@@ -282,9 +287,9 @@ async def run_optimization(case_data: Dict[str, Any], run_id: str):
         
         # Update active_runs with completion
         active_runs[run_id].update({
-            "status": "completed",
+            "status": result['status'],
             "progress": 100,
-            "message": "Optimization completed successfully",
+            "message": f"Case rejected ({rejected})" if rejected else "Optimization completed successfully",
             "result": result,
             "output_directory": folder_name,
             "completed_at": datetime.utcnow().isoformat()
@@ -421,7 +426,7 @@ async def get_status(run_id: str):
             "progress": status_data.get("progress", 0)
         }
         
-        if status_data.get("status") == "completed":
+        if status_data.get("status") in ("completed", "rejected"):
             response["results"] = status_data.get("result")
             response["output_directory"] = status_data.get("output_directory")
         
@@ -441,7 +446,7 @@ async def get_status(run_id: str):
                 "progress": run_data.get("progress", 0)
             }
             
-            if run_data["status"] == "completed":
+            if run_data["status"] in ("completed", "rejected"):
                 response["results"] = run_data.get("result")
                 response["output_directory"] = run_data.get("output_directory")
             
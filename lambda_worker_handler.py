@@ -326,11 +326,16 @@ def run_optimization(case_data: Dict[str, Any], run_id: str):
                     "objective_value": objective
                 })
             
+            # A case rejected without solving (e.g. solver.capacity_precheck = "reject")
+            rejected = meta.get('rejected')
             result = {
-                'status': 'completed',
+                'status': 'rejected' if rejected else 'completed',
                 'solutions': solutions,
-                'solver_stats': meta.get('phase2', {})
+                'solver_stats': meta.get('phase2') or {}
             }
+            if rejected:
+                result['rejected'] = rejected
+                result['capacity_precheck'] = meta.get('capacity_precheck')
             
         finally:
             # Clean up temp file
@@ -355,9 +360,9 @@ def run_optimization(case_data: Dict[str, Any], run_id: str):
         
         # Mark as complete
         status.update({
-            "status": "completed",
+            "status": result['status'],
             "progress": 100,
-            "message": "Optimization completed successfully",
+            "message": f"Case rejected ({rejected})" if rejected else "Optimization completed successfully",
             "output_directory": folder_name,
             "completed_at": datetime.utcnow().isoformat(),
             "result": result  # Include full result for API to return
@@ -31,6 +31,7 @@ from typing import Dict, Any, List, Optional
 import traceback
 from concurrent.futures import ThreadPoolExecutor
 import threading
+import time
 
 try:
     from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, BackgroundTasks
@@ -192,7 +193,10 @@ class AdvancedSchedulingSolver:
             except Exception as e:
                 logger.warning(f"Failed to generate Excel outputs: {e}")
             
-            self._update_progress(run_id, 100, "Optimization completed successfully!")
+            if model_result.get('solver_status') == 'REJECTED':
+                self._update_progress(run_id, 100, f"Case rejected ({model_result.get('rejected')})")
+            else:
+                self._update_progress(run_id, 100, "Optimization completed successfully!")
             
             return {
                 "status": "success",
@@ -258,6 +262,17 @@ class AdvancedSchedulingSolver:
                         except:
                             pass  # Don't fail if cleanup fails
                             
+                        # A case Solve_test_case rejected (solver.capacity_precheck =
+                        # "reject") must not be solved by the fallbacks below.
+                        rejected = self._rejected_result(tcg_out)
+                        if rejected is not None:
+                            logger.warning(f"testcase_gui rejected the case: {rejected['rejected']}")
+                            rejected['solver_info'] = {
+                                'implementation': 'testcase_gui.py',
+                                'bridge': 'fastapi_solver_service',
+                            }
+                            return rejected
+
                         # We don't rely on exact shape; adapt best-effort
                         result_payload = self._coerce_tcg_result(tcg_out)
                         logger.info(f"_coerce_tcg_result returned: {result_payload is not None}")
@@ -420,9 +435,11 @@ class AdvancedSchedulingSolver:
             solution_collector = SolutionCollector(shift_assignments, shifts, providers, k_solutions)
             status = solver.solve_with_solution_callback(model, solution_collector)
             solutions = solution_collector.get_solutions()
+            callback_time_s = solution_collector.callback_time_s
         else:
             status = solver.Solve(model)
             solutions = []
+            callback_time_s = 0.0
             
             if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
                 # Extract single solution
@@ -469,6 +486,7 @@ class AdvancedSchedulingSolver:
                 "provider_workload": dict(provider_stats),
                 "shift_type_coverage": dict(shift_type_stats),
                 "runtime_seconds": solver.WallTime(),
+                "callback_time_s": round(callback_time_s, 4),
                 "objective_value": solver.ObjectiveValue() if solutions else 0
             },
             "solver_info": {
@@ -524,9 +542,10 @@ class AdvancedSchedulingSolver:
                 'status': model_result.get('solver_status', 'UNKNOWN')
             }
 
+        rejected = model_result.get('solver_status') == 'REJECTED'
         payload = {
-            'status': 'completed',
-            'message': 'Optimization completed',
+            'status': 'rejected' if rejected else 'completed',
+            'message': f"Case rejected ({model_result.get('rejected')})" if rejected else 'Optimization completed',
             'run_id': run_id,
             'progress': 100,
             'results': {
@@ -537,8 +556,28 @@ class AdvancedSchedulingSolver:
         }
         if 'solver_info' in model_result:
             payload['solver_info'] = model_result['solver_info']
+        if rejected:
+            payload['rejected'] = model_result.get('rejected')
+            payload['capacity_precheck'] = model_result.get('capacity_precheck')
         return payload
 
+    def _rejected_result(self, tcg_out: Any) -> Optional[Dict[str, Any]]:
+        """Result payload for a case testcase_gui rejected without solving it (its meta
+        carries "rejected", e.g. from solver.capacity_precheck = "reject"), else None."""
+        if not (isinstance(tcg_out, tuple) and len(tcg_out) == 2 and isinstance(tcg_out[1], dict)):
+            return None
+        meta = tcg_out[1]
+        if not meta.get('rejected'):
+            return None
+        return {
+            'solver_status': 'REJECTED',
+            'solutions_found': 0,
+            'solutions': [],
+            'statistics': {},
+            'rejected': meta['rejected'],
+            'capacity_precheck': meta.get('capacity_precheck'),
+        }
+
     def _coerce_tcg_result(self, tcg_out: Any) -> Optional[Dict[str, Any]]:
         """Best-effort adapter to transform testcase_gui outputs into API result schema.
         Accepts either a dict with solutions/assignments or a custom structure.
@@ -661,32 +700,37 @@ class SolutionCollector(cp_model.CpSolverSolutionCallback):
         self._providers = providers
         self._solutions = []
         self._max_solutions = max_solutions
+        # Flat registry of (shift, provider) pairs and the proto index of their variable,
+        # so each callback reads the solution once instead of calling Value() per pair
+        self._pairs = [(shift, provider['name']) for shift in shifts for provider in providers]
+        self._index = [shift_assignments[(name, shift['id'])].Index() for shift, name in self._pairs]
+        self.callback_time_s = 0.0
     
     def on_solution_callback(self):
         if len(self._solutions) >= self._max_solutions:
             self.StopSearch()
             return
         
+        t0 = time.perf_counter()
         # Extract current solution
+        values = self.Response().solution
         assignments = []
-        for shift in self._shifts:
-            shift_id = shift['id']
-            for provider in self._providers:
-                provider_name = provider['name']
-                if self.Value(self._shift_assignments[(provider_name, shift_id)]):
-                    assignments.append({
-                        "shift_id": shift_id,
-                        "provider_name": provider_name,
-                        "date": shift['date'],
-                        "shift_type": shift.get('type', ''),
-                        "start_time": shift.get('start', ''),
-                        "end_time": shift.get('end', '')
-                    })
+        for (shift, provider_name), idx in zip(self._pairs, self._index):
+            if values[idx]:
+                assignments.append({
+                    "shift_id": shift['id'],
+                    "provider_name": provider_name,
+                    "date": shift['date'],
+                    "shift_type": shift.get('type', ''),
+                    "start_time": shift.get('start', ''),
+                    "end_time": shift.get('end', '')
+                })
         
         self._solutions.append({
             "assignments": assignments,
             "objective_value": self.ObjectiveValue()
         })
+        self.callback_time_s += time.perf_counter() - t0
     
     def get_solutions(self) -> List[Dict[str, Any]]:
         return self._solutions
@@ -735,10 +779,12 @@ async def run_optimization(case_data: Dict[str, Any], run_id: str):
         result = await solver.solve_async(case_data, run_id)
         
         # Update final status
+        rejected = result["status"] == "success" and result.get("result", {}).get("solver_status") == "REJECTED"
         active_runs[run_id].update({
-            "status": result["status"],
+            "status": "rejected" if rejected else result["status"],
             "progress": 100 if result["status"] == "success" else -1,
-            "message": "Completed" if result["status"] == "success" else result.get("message", "Failed"),
+            "message": f"Rejected ({result['result'].get('rejected')})" if rejected
+                       else "Completed" if result["status"] == "success" else result.get("message", "Failed"),
             "result": result,
             "completed_at": datetime.now().isoformat()
         })
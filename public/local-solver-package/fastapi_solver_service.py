@@ -31,6 +31,7 @@ from typing import Dict, Any, List, Optional
 import traceback
 from concurrent.futures import ThreadPoolExecutor
 import threading
+import time
 import calendar as pycalendar
 import shutil
 from ortools.sat.python import cp_model
@@ -253,7 +254,10 @@ class AdvancedSchedulingSolver:
             except Exception as e:
                 logger.warning(f"Failed to generate Excel outputs: {e}")
             
-            self._update_progress(run_id, 100, "Optimization completed successfully!")
+            if isinstance(model_result, dict) and model_result.get('solver_status') == 'REJECTED':
+                self._update_progress(run_id, 100, f"Case rejected ({model_result.get('rejected')})")
+            else:
+                self._update_progress(run_id, 100, "Optimization completed successfully!")
             # Defensive: ensure model_result is a dict before manipulating debug_info
             if not isinstance(model_result, dict):
                 logger.warning(f"Model result is not a dict (type={type(model_result)}). Coercing to dict.")
@@ -355,6 +359,11 @@ class AdvancedSchedulingSolver:
                 raise RuntimeError(f"Solver script failed: {error_message}")
 
             tables, meta = solver_result
+            if meta.get('rejected'):
+                # rejected before solving (solver.capacity_precheck = "reject"): nothing to report
+                logger.warning(f"testcase_gui.py rejected the case: {meta['rejected']}")
+                return { 'status': 'rejected', 'solver_status': 'REJECTED', 'solutions': [],
+                         'rejected': meta['rejected'], 'capacity_precheck': meta.get('capacity_precheck') }
 
             solutions = []
             for i, table_data in enumerate(tables):
@@ -594,9 +603,11 @@ class AdvancedSchedulingSolver:
             solution_collector = SolutionCollector(shift_assignments, shifts, providers, k_solutions)
             status = solver.SolveWithSolutionCallback(model, solution_collector)
             solutions = solution_collector.get_solutions()
+            callback_time_s = solution_collector.callback_time_s
         else:
             status = solver.Solve(model)
             solutions = []
+            callback_time_s = 0.0
             
             if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
                 # Extract single solution
@@ -643,6 +654,7 @@ class AdvancedSchedulingSolver:
                 "provider_workload": dict(provider_stats),
                 "shift_type_coverage": dict(shift_type_stats),
                 "runtime_seconds": solver.WallTime(),
+                "callback_time_s": round(callback_time_s, 4),
                 "objective_value": solver.ObjectiveValue() if solutions else 0
             },
             "solver_info": {
@@ -858,32 +870,37 @@ class SolutionCollector(cp_model.CpSolverSolutionCallback):
         self._providers = providers
         self._solutions = []
         self._max_solutions = max_solutions
+        # Flat registry of (shift, provider) pairs and the proto index of their variable,
+        # so each callback reads the solution once instead of calling Value() per pair
+        self._pairs = [(shift, provider['name']) for shift in shifts for provider in providers]
+        self._index = [shift_assignments[(name, shift['id'])].Index() for shift, name in self._pairs]
+        self.callback_time_s = 0.0
     
     def on_solution_callback(self):
         if len(self._solutions) >= self._max_solutions:
             self.StopSearch()
             return
         
+        t0 = time.perf_counter()
         # Extract current solution
+        values = self.Response().solution
         assignments = []
-        for shift in self._shifts:
-            shift_id = shift['id']
-            for provider in self._providers:
-                provider_name = provider['name']
-                if self.Value(self._shift_assignments[(provider_name, shift_id)]):
-                    assignments.append({
-                        "shift_id": shift_id,
-                        "provider_name": provider_name,
-                        "date": shift['date'],
-                        "shift_type": shift.get('type', ''),
-                        "start_time": shift.get('start', ''),
-                        "end_time": shift.get('end', '')
-                    })
+        for (shift, provider_name), idx in zip(self._pairs, self._index):
+            if values[idx]:
+                assignments.append({
+                    "shift_id": shift['id'],
+                    "provider_name": provider_name,
+                    "date": shift['date'],
+                    "shift_type": shift.get('type', ''),
+                    "start_time": shift.get('start', ''),
+                    "end_time": shift.get('end', '')
+                })
         
         self._solutions.append({
             "assignments": assignments,
             "objective_value": self.ObjectiveValue()
         })
+        self.callback_time_s += time.perf_counter() - t0
     
     def get_solutions(self) -> List[Dict[str, Any]]:
         return self._solutions
@@ -914,15 +931,17 @@ async def run_optimization(case_data: Dict[str, Any], run_id: str):
             result["packaged_files"] = packaged_files
         
         # Update final status
+        rejected = result["status"] == "success" and result.get("result", {}).get("solver_status") == "REJECTED"
         active_runs[run_id].update({
-            "status": "completed" if result["status"] == "success" else "failed",
+            "status": "rejected" if rejected else "completed" if result["status"] == "success" else "failed",
             "progress": 100 if result["status"] == "success" else -1,
-            "message": "Completed" if result["status"] == "success" else result.get("message", "Failed"),
+            "message": f"Rejected ({result['result'].get('rejected')})" if rejected
+                       else "Completed" if result["status"] == "success" else result.get("message", "Failed"),
             "result": result,
             "completed_at": datetime.now().isoformat()
         })
         
-        if result["status"] == "success":
+        if result["status"] == "success" and not rejected:
             await _send_final_result(run_id, result)
         
     except Exception as e:
@@ -1000,7 +1019,7 @@ async def get_status(run_id: str):
     }
     
     # Include full results when completed
-    if run_data["status"] == "completed" and "result" in run_data:
+    if run_data["status"] in ("completed", "rejected") and "result" in run_data:
         response["results"] = run_data["result"]
     
     # Include error details if failed
@@ -47,7 +47,8 @@ def Solve_test_case_lambda(case_file_path: str) -> Tuple[List[Dict], Dict[str, A
     
     Returns:
         tables: List of solution tables from solver
-        meta: Metadata including output_dir with all generated files
+        meta: Metadata including output_dir with all generated files; meta['rejected']
+              is set (and tables is empty) when the case was rejected without solving
     """
     # CRITICAL: This log MUST appear if wrapper is called
     logger.error("!!! WRAPPER FUNCTION CALLED - solver_core_real.Solve_test_case_lambda() !!!")
@@ -83,8 +84,14 @@ def Solve_test_case_lambda(case_file_path: str) -> Tuple[List[Dict], Dict[str, A
             logger.info("[SOLVER] Calling testcase_gui.Solve_test_case()...")
             print("[SOLVER] Calling testcase_gui.Solve_test_case()...", flush=True)
             tables, meta = testcase_gui.Solve_test_case(case_file_path)
-            logger.info(f"[SOLVER] Solver completed. Generated {len(tables)} solution(s)")
-            print(f"[SOLVER] Solver completed. Generated {len(tables)} solution(s)", flush=True)
+            if meta.get('rejected'):
+                # e.g. solver.capacity_precheck = "reject": nothing was solved; callers
+                # report meta['rejected'] instead of a completed run
+                logger.warning(f"[SOLVER] Case rejected ({meta['rejected']}); no solution generated")
+                print(f"[SOLVER] Case rejected ({meta['rejected']}); no solution generated", flush=True)
+            else:
+                logger.info(f"[SOLVER] Solver completed. Generated {len(tables)} solution(s)")
+                print(f"[SOLVER] Solver completed. Generated {len(tables)} solution(s)", flush=True)
             
             # Check if solver created an 'out' directory or Result_N directories
             logger.info(f"[INFO] Contents of {work_dir}: {os.listdir(work_dir)}")
@@ -337,17 +337,21 @@ def process_solver_job(message_body: Dict[str, Any]):
                 'solver_metadata': meta
             }
             
+            rejected = meta.get('rejected')
+            if rejected:
+                metadata['rejected'] = rejected
+            
             folder_name = upload_results_to_s3(run_id, output_dir, metadata)
             
-            # Update status: completed
-            update_job_status(run_id, 'completed', {
+            # Update status: completed, or rejected (e.g. solver.capacity_precheck = "reject")
+            update_job_status(run_id, 'rejected' if rejected else 'completed', {
                 'progress': 100,
-                'message': 'Optimization completed',
+                'message': f'Case rejected ({rejected})' if rejected else 'Optimization completed',
                 'folder': folder_name,
                 **metadata
             })
             
-            logger.info(f"JOB COMPLETED: {run_id} -> {folder_name}")
+            logger.info(f"JOB {'REJECTED' if rejected else 'COMPLETED'}: {run_id} -> {folder_name}")
             
     except Exception as e:
         logger.error(f"Job failed: {run_id}", exc_info=True)
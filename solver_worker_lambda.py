@@ -92,6 +92,8 @@ def upload_results_to_s3(run_id: str, tables: List[Dict], metadata: Dict[str, An
             'upload_start_time': creation_timestamp,
             'runtime_seconds': metadata.get('runtime_seconds', 0)
         }
+        if metadata.get('rejected'):
+            metadata_to_store['rejected'] = metadata['rejected']
         
         metadata_key = f"{folder_name}/metadata.json"
         s3_client.put_object(
@@ -233,7 +235,10 @@ def lambda_handler(event, context):
                 # Upload results to S3 with all solver output files
                 folder_name = upload_results_to_s3(run_id, tables, meta, solver_output_dir)
                 
-                logger.info(f"[SUCCESS] Run {run_id} completed: {folder_name}")
+                if meta.get('rejected'):
+                    logger.warning(f"[REJECTED] Run {run_id} rejected ({meta['rejected']}): {folder_name}")
+                else:
+                    logger.info(f"[SUCCESS] Run {run_id} completed: {folder_name}")
                 
             except Exception as solver_error:
                 logger.error(f"[SOLVER ERROR] Run {run_id}: {type(solver_error).__name__}: {solver_error}")
@@ -55,12 +55,17 @@ def _ensure_tkinter_imported():
 
 import argparse, json, os, re, sys, subprocess, traceback
 import datetime as dt
+import contextlib
+import hashlib
+import heapq
+import time as _time
 from collections import defaultdict
 from typing import Dict, Any, List
 
 import logging
 from logging import Logger
 
+import numpy as np
 from ortools.sat.python import cp_model
 from openpyxl import Workbook
 CHOSPITAL = ""
@@ -781,6 +786,93 @@ def day_name(iso_date: str) -> str:
 def parse_iso_minutes(ts: str) -> int:
     return int(dt.datetime.fromisoformat(ts).timestamp() // 60)
 
+REST_GAP_MINUTES = 12 * 60
+_MINUTE_EPOCH = dt.datetime(1, 1, 1)
+
+def _wallclock_minutes(ts: str) -> int:
+    """Minutes since 0001-01-01 for an ISO timestamp.
+
+    'Z' / '+hh:mm' suffixes are stripped (the rest rule compares wall-clock times),
+    and unlike parse_iso_minutes() the result does not depend on the local timezone.
+    """
+    t = dt.datetime.fromisoformat(ts.replace('Z', '').split('+')[0])
+    if t.tzinfo is not None:
+        t = t.replace(tzinfo=None) - t.utcoffset()
+    return (t - _MINUTE_EPOCH) // dt.timedelta(minutes=1)
+
+def _rest_conflict_cliques(shifts: List[Dict[str,Any]], gap_minutes: int = REST_GAP_MINUTES) -> List[List[int]]:
+    """Maximal groups of shift indices that pairwise violate the 12h rest rule.
+
+    Two shifts a, b with start_a <= start_b conflict iff start_b < end_a + gap, i.e. iff
+    the later start falls inside the earlier half-open window [start, end + gap). That
+    is an interval graph, so one sweep over the sorted window endpoints yields all of its
+    maximal cliques; an AtMostOne per clique is equivalent to one per conflicting pair.
+    """
+    events = []
+    for s, sh in enumerate(shifts):
+        st = _wallclock_minutes(sh['start'])
+        en = _wallclock_minutes(sh['end'])
+        events.append((st, 1, s))
+        events.append((max(en + gap_minutes, st + 1), 0, s))
+    events.sort()  # at equal times, window ends (0) close before starts (1) open
+
+    cliques = []
+    active = set()
+    grew = False
+    for _, is_start, s in events:
+        if is_start:
+            active.add(s)
+            grew = True
+        else:
+            if grew and len(active) > 1:
+                cliques.append(sorted(active))
+            grew = False
+            active.discard(s)
+    return cliques
+
+def _provider_symmetry_classes(providers: List[Dict[str,Any]]) -> List[List[int]]:
+    """Groups (size >= 2) of provider indices that build_model cannot tell apart.
+
+    Two providers are interchangeable iff everything the model reads from them is
+    equal: type, min/max totals, max_consecutive_days, the hard/soft OFF and ON
+    requests and the carry_in state of a rolling window. Names and unused fields
+    (weekday_pref, type_pref, ...) are ignored.
+    """
+    def _sig(p):
+        lim = p.get('limits', {}) or {}
+        def _on(m):
+            return tuple(sorted((d, tuple(sorted(t or []))) for d, t in (m or {}).items()))
+        return (
+            p.get('type', 'MD'),
+            lim.get('min_total', 0), lim.get('max_total'),
+            p.get('max_consecutive_days', 0) or 0,
+            frozenset(p.get('forbidden_days_hard', []) or []),
+            frozenset(p.get('forbidden_days_soft', []) or []),
+            _on(p.get('preferred_days_hard')),
+            _on(p.get('preferred_days_soft')),
+            json.dumps(p.get('carry_in') or {}, sort_keys=True, default=str),
+        )
+    groups = defaultdict(list)
+    for j, p in enumerate(providers):
+        groups[_sig(p)].append(j)
+    return sorted(g for g in groups.values() if len(g) > 1)
+
+def _shift_scarcity(shifts, providers, shift_provs, rest_cliques):
+    """Per-shift (eligible providers, 12h-rest conflict degree); lowest sort key = scarcest.
+
+    eligible counts the providers that may take the shift (shift_provs) and are not
+    hard-off on its date; the conflict degree is the number of other shifts sharing a
+    rest clique with it. Few candidates and many conflicts both make a shift hard to
+    cover late in the search.
+    """
+    neighbours = [set() for _ in shifts]
+    for clique in rest_cliques:
+        for s in clique:
+            neighbours[s].update(clique)
+    forbidden_hard = [set(p.get('forbidden_days_hard', []) or []) for p in providers]
+    return [(sum(1 for j in shift_provs[s] if shifts[s]['date'] not in forbidden_hard[j]),
+             max(0, len(neighbours[s]) - 1)) for s in range(len(shifts))]
+
 def safe_get(d, *keys, default=None):
     cur = d
     for k in keys:
@@ -1009,6 +1101,101 @@ def load_inputs(constants_path: str, case_path: str):
     case['calendar'].setdefault('weekend_days', consts.get('calendar', {}).get('weekend_days', ['Saturday','Sunday']))
     return consts, case
 
+# Default lexicographic order follows the dominance of the weighted objective:
+# ultimate_const * very_heavy outweighs any coverage gain, coverage (1e11 per shift)
+# outweighs every soft term, and the soft terms keep trading off by their weights.
+LEX_DEFAULT_LEVELS = [["very_heavy"], ["coverage"]]
+COVERAGE_REWARD = 100_000_000_000  # per covered shift in the weighted phase-2 objective
+
+def _lexicographic_levels(consts, objective_terms):
+    """Group (name, weight, expr) objective terms into levels for solve_two_phase.
+
+    Levels come from constants.solver.lexicographic_levels (lists of term names);
+    terms not named there form one final level. Within a level the weights
+    are divided by their gcd, so a single-term level is just +/- its expression.
+    Returns [(names, expr)] to be minimised in order.
+    """
+    import math
+    names = [n for n, _, _ in objective_terms]
+    cfg = (consts.get('solver') or {}).get('lexicographic_levels') or LEX_DEFAULT_LEVELS
+    levels, used = [], set()
+    for lvl in cfg:
+        lvl = [lvl] if isinstance(lvl, str) else list(lvl)
+        unknown = [n for n in lvl if n not in names or n in used]
+        if unknown:
+            raise ValueError(f"lexicographic_levels: unknown or repeated objective terms {unknown}; known: {names}")
+        used.update(lvl)
+        levels.append(lvl)
+    rest = [n for n in names if n not in used]
+    if rest:
+        levels.append(rest)
+
+    by_name = {n: (w, e) for n, w, e in objective_terms}
+    out = []
+    for lvl in levels:
+        g = 0
+        for n in lvl:
+            g = math.gcd(g, by_name[n][0])
+        g = g or 1
+        out.append((lvl, sum((by_name[n][0] // g) * by_name[n][1] for n in lvl)))
+    return out
+
+# Phase-2 helper families that build_phase2_objective can encode linearly instead of with
+# CP-SAT's max/abs/division/multiplication constraints (constants.solver.linearize).
+LINEARIZE_FAMILIES = ("weekend", "square", "abs", "average", "minmax")
+
+def _linearize_families(consts) -> set:
+    """Families to linearize: solver.linearize is true/"all" (default), false/"none",
+    or a list (or comma-separated string) of LINEARIZE_FAMILIES names."""
+    val = (consts.get('solver') or {}).get('linearize', True)
+    if isinstance(val, str):
+        if val.strip().lower() in ('all', 'true', 'on'):
+            return set(LINEARIZE_FAMILIES)
+        if val.strip().lower() in ('none', 'false', 'off', ''):
+            return set()
+        val = [v.strip() for v in val.split(',') if v.strip()]
+    if isinstance(val, (list, tuple, set)):
+        unknown = sorted(set(val) - set(LINEARIZE_FAMILIES))
+        if unknown:
+            raise ValueError(f"solver.linearize: unknown families {unknown}; known: {list(LINEARIZE_FAMILIES)}")
+        return set(val)
+    return set(LINEARIZE_FAMILIES) if val else set()
+
+INT64_MAX = 2**63 - 1
+
+def _var_ub(v) -> int:
+    """Upper end of an IntVar's domain."""
+    return v.Proto().domain[-1]
+
+def _check_int64_objective(what, lo, hi):
+    """Raise if an objective whose terms range over [lo, hi] could overflow int64."""
+    if lo < -INT64_MAX or hi > INT64_MAX:
+        raise ValueError(f"{what} can reach [{lo}, {hi}], outside int64; lower the weights in constants.weights")
+
+def _add_abs(model, a, expr, linear, name):
+    """a = |expr|. Linear mode: a >= +-expr, and a sign literal caps a at the side it picks."""
+    if not linear:
+        model.AddAbsEquality(a, expr)
+        return
+    pos = model.NewBoolVar(name)
+    model.Add(a >= expr)
+    model.Add(a >= -expr)
+    model.Add(a <= expr).OnlyEnforceIf(pos)
+    model.Add(a <= -expr).OnlyEnforceIf(pos.Not())
+
+def _add_square(model, sq, v, cap, linear):
+    """sq = v*v for an IntVar v in [0, cap].
+
+    Linear mode adds the tangent cuts sq >= (2k+1)*v - k*(k+1), k < cap, whose maximum
+    is exactly v*v at every integer v. They only bound sq from below, which is all a
+    square that is minimised (directly or through a >= chain) needs.
+    """
+    if not linear:
+        model.AddMultiplicationEquality(sq, [v, v])
+        return
+    for k in range(cap):
+        model.Add(sq >= (2 * k + 1) * v - k * (k + 1))
+
 from ortools.sat.python import cp_model
 
 def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
@@ -1046,10 +1233,42 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
 
     model = cp_model.CpModel()
 
-    x = {(i, j): model.NewBoolVar(f"x_{i}_{j}") for i in S for j in P}
-    slack_unfilled = [model.NewBoolVar(f"slack_{i}_unfilled") for i in S]
+    # Decision variables. In sparse mode (default) x[s,j] only exists where provider j
+    # may take shift s: type-ineligible pairs are never created, and neither are pairs
+    # on hard-forbidden days when slack_cant_work is weighted as effectively infinite.
+    # Every consumer below must therefore treat a missing key as a fixed 0.
+    c_slack_cant_work = int(get_num(consts, 'weights', 'hard', 'slack_cant_work', default=1))
+    sparse = bool((consts.get('solver') or {}).get('sparse_vars', True))
+    drop_forbidden = sparse and c_slack_cant_work >= HARD_INF_WEIGHT
+    forbidden_hard = [set(providers[j].get('forbidden_days_hard', [])) for j in P]
+    # carry_in (set by solve_rolling_horizon) holds a provider's state from the days before
+    # the calendar: "streak" worked days ending the day before days[0], and
+    # "blocked_shifts", ids of shifts that would break the rest after their last shift.
+    carry = [providers[j].get('carry_in') or {} for j in P]
+    carry_streak = [int(c.get('streak', 0) or 0) for c in carry]
+    blocked = [set(c.get('blocked_shifts') or ()) for c in carry]
+
+    def _type_ok(s, j):
+        return (providers[j].get('type') in shifts[s]["allowed_provider_types"]
+                and shifts[s].get('id') not in blocked[j])
+
+    if sparse:
+        x = {(i, j): model.NewBoolVar(f"x_{i}_{j}") for i in S for j in P
+             if _type_ok(i, j) and not (drop_forbidden and shifts[i]['date'] in forbidden_hard[j])}
+    else:
+        x = {(i, j): model.NewBoolVar(f"x_{i}_{j}") for i in S for j in P}
+    shift_provs = {i: [j for j in P if (i, j) in x] for i in S}
+    prov_shifts = {j: [i for i in S if (i, j) in x] for j in P}
+    logger.info("Decision vars x: %d of %d shift x provider pairs (sparse=%s, drop_forbidden=%s)",
+                len(x), len(S) * len(P), sparse, drop_forbidden)
+
+    # A slot class from _compress_identical_shifts stands for "demand" parallel copies of
+    # one shift; x[i,j] then says j takes one of them.
+    shift_demand = [int(shifts[i].get('demand', 1) or 1) for i in S]
+    slack_unfilled = [model.NewBoolVar(f"slack_{i}_unfilled") if shift_demand[i] == 1
+                      else model.NewIntVar(0, shift_demand[i], f"slack_{i}_unfilled") for i in S]
     for i in S:
-        model.Add(sum(x[i, j] for j in P) + slack_unfilled[i] == 1)
+        model.Add(sum(x[i, j] for j in shift_provs[i]) + slack_unfilled[i] == shift_demand[i])
 
     # Max consective days
     max_consec = [providers[j].get('max_consecutive_days', 0) for j in P]
@@ -1068,7 +1287,7 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
         for d in D:
             yi = model.NewBoolVar(f"workday_{i}_{d}")
             y[(i, d)] = yi
-            Sd = day_to_shifts.get(d, [])
+            Sd = [s for s in day_to_shifts.get(d, []) if (s, i) in x]
             if not Sd:
                 model.Add(yi == 0)
             else:
@@ -1077,14 +1296,15 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
                     model.Add(x[(s, i)] <= yi)
                 model.Add(sum(x[(s, i)] for s in Sd) >= yi)
 
-    # run[d] = current consecutive streak length ending at day d
-    max_clusters = [model.NewIntVar(0, N, f"max_cluster_{i}") for i in P]
+    # run[d] = current consecutive streak length ending at day d (a carried-in streak
+    # continues on day 0)
+    max_clusters = [model.NewIntVar(0, N + carry_streak[i], f"max_cluster_{i}") for i in P]
     runs = {}  # store for reuse in cubes
     for i in P:
-        run = [model.NewIntVar(0, N, f"run_{i}_{d}") for d in D]
+        run = [model.NewIntVar(0, N + carry_streak[i], f"run_{i}_{d}") for d in D]
         runs[i] = run
         # Day 0
-        model.Add(run[0] == 1).OnlyEnforceIf(y[(i, 0)])
+        model.Add(run[0] == 1 + carry_streak[i]).OnlyEnforceIf(y[(i, 0)])
         model.Add(run[0] == 0).OnlyEnforceIf(y[(i, 0)].Not())
         # Days 1..N-1
         for d in range(1, N):
@@ -1095,109 +1315,106 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
         model.AddMaxEquality(max_clusters[i], run)
 
     # ----- Slack: slack_consec[i] = max(0, max_clusters[i] - max_consec[i]) -----
+    # A cap at or above the horizon (plus any carried-in streak) can never be overrun, and
+    # cluster_overrun lies in [-cap, N - cap] (a fixed [-N, N] made any cap > 2N infeasible).
     _zero = model.NewIntVar(0, 0, "zero_const")
-    slack_consec = [model.NewIntVar(0, N, f"cons_slack_{i}") for i in P]
+    horizon = [N + carry_streak[i] for i in P]
+    slack_consec = [model.NewIntVar(0, max(0, horizon[i] - max_consec[i]) if max_consec[i] > 0 else 0,
+                                    f"cons_slack_{i}") for i in P]
     for i in P:
-        if max_consec[i] > 0:
-            diff = model.NewIntVar(-N, N, f"cluster_overrun_{i}")
+        if max_consec[i] >= horizon[i]:
+            model.Add(slack_consec[i] == 0)
+        elif max_consec[i] > 0:
+            diff = model.NewIntVar(-max_consec[i], horizon[i] - max_consec[i], f"cluster_overrun_{i}")
             model.Add(diff == max_clusters[i] - max_consec[i])
             model.AddMaxEquality(slack_consec[i], [diff, _zero])
             model.Add(max_consec[i] - max_clusters[i] + slack_consec[i] >= 0)
         else:
             model.Add(slack_consec[i] == 0)
 
-    # ----- NEW: Cubic penalty of cluster lengths per provider (soft) -------------
-    # Detect cluster ends: end_d = 1 iff y[i,d]==1 and (d==N-1 or y[i,d+1]==0)
-    # Cluster length is runs[i][d_end]; we gate it into L_d and build L^3.
-    cluster_cubesums = [model.NewIntVar(0, N**3, f"cluster_cubesum_{i}") for i in P]
-
-    for i in P:
-        cube_terms = []
-        for d in D:
-            end_d = model.NewBoolVar(f"cluster_end_{i}_{d}")
-            if d < N - 1:
-                # Linearization of end_d == (y_d == 1 and y_{d+1} == 0)
-                model.Add(end_d >= y[(i, d)] - y[(i, d + 1)])
-                model.Add(end_d <= y[(i, d)])
-                model.Add(end_d <= 1 - y[(i, d + 1)])
-            else:
-                # Last day: end iff working that day
-                model.Add(end_d == y[(i, d)])
-
-            # L_d = run[d] if end_d else 0
-            Ld = model.NewIntVar(0, N, f"cluster_len_{i}_{d}")
-            model.Add(Ld == runs[i][d]).OnlyEnforceIf(end_d)
-            model.Add(Ld == 0).OnlyEnforceIf(end_d.Not())
-
-            # L^2 and L^3
-            L2 = model.NewIntVar(0, N * N, f"cluster_len_sq_{i}_{d}")
-            model.AddMultiplicationEquality(L2, [Ld, Ld])
-            L3 = model.NewIntVar(0, N * N * N, f"cluster_len_cube_{i}_{d}")
-            model.AddMultiplicationEquality(L3, [L2, Ld])
-
-            cube_terms.append(L3)
-
-        if cube_terms:
-            model.Add(cluster_cubesums[i] == sum(cube_terms))
-        else:
-            model.Add(cluster_cubesums[i] == 0)
-    # ---------------------------------------------------------------------------
-
-    # 12 hrs apart
-    for iter1 in S:
-        for iter2 in S:
-            if shifts[iter1]["id"] == shifts[iter2]["id"]:
+    # 12 hrs apart: one AtMostOne per maximal conflicting window (clique) per provider
+    rest_cliques = _rest_conflict_cliques(shifts)
+    logger.info("12h-rest conflict cliques: %d (largest=%d)",
+                len(rest_cliques), max((len(c) for c in rest_cliques), default=0))
+    for clique in rest_cliques:
+        for j in P:
+            lits = [x[s, j] for s in clique if (s, j) in x]
+            if len(lits) > 1:
+                model.AddAtMostOne(lits)
+    # Scarce shifts first (solver.scarcity_strategy, default off): without a strategy
+    # CP-SAT branches on x in creation order, so shifts with few candidates or many rest
+    # conflicts are decided last and backtracked into. The strategy assigns each shift in
+    # scarcity order to its first candidate that still fits.
+    shift_scarcity = _shift_scarcity(shifts, providers, shift_provs, rest_cliques)
+    if bool((consts.get('solver') or {}).get('scarcity_strategy', False)):
+        order = sorted(S, key=lambda s: (shift_scarcity[s][0], -shift_scarcity[s][1], shift_day[s], s))
+        model.AddDecisionStrategy([x[s, j] for s in order for j in shift_provs[s]],
+                                  cp_model.CHOOSE_FIRST, cp_model.SELECT_MAX_VALUE)
+        logger.info("Scarcity decision strategy: scarcest shift %s (eligible=%d, rest conflicts=%d)",
+                    shifts[order[0]].get('id', order[0]) if order else None,
+                    *(shift_scarcity[order[0]] if order else (0, 0)))
+    # Symmetry breaking between interchangeable providers (solver.symmetry_breaking):
+    # "count" (default) orders the shift totals within each class, "lex" orders the
+    # class's x columns lexicographically over the shifts (removes every permutation,
+    # but its prefix chains slow the search down), "off" leaves the permutations in.
+    symmetry_mode = str((consts.get('solver') or {}).get('symmetry_breaking', 'count')).lower()
+    provider_classes = _provider_symmetry_classes(providers) if symmetry_mode != 'off' else []
+    logger.info("Interchangeable provider classes: %d %s (symmetry_breaking=%s)",
+                len(provider_classes), provider_classes, symmetry_mode)
+    for cls in provider_classes:
+        for a, b in zip(cls, cls[1:]):
+            if prov_shifts[a] != prov_shifts[b]:
+                continue  # cannot happen for equal signatures; be safe in dense mode
+            if symmetry_mode == 'count':
+                model.Add(sum(x[s, a] for s in prov_shifts[a]) >= sum(x[s, b] for s in prov_shifts[b]))
                 continue
+            # x[.,a] >=lex x[.,b]: while the prefixes are equal (eq), a takes every shift b takes
+            eq = None
+            for k, s in enumerate(prov_shifts[a]):
+                if eq is None:
+                    model.Add(x[s, a] >= x[s, b])
+                else:
+                    model.Add(x[s, a] >= x[s, b]).OnlyEnforceIf(eq)
+                if k == len(prov_shifts[a]) - 1:
+                    break
+                nxt = model.NewBoolVar(f"sym_eq_{a}_{b}_{k}")
+                if eq is None:
+                    model.Add(nxt >= 1 - x[s, a] + x[s, b])
+                else:
+                    model.Add(nxt >= 1 - x[s, a] + x[s, b]).OnlyEnforceIf(eq)
+                    model.AddImplication(nxt, eq)
+                eq = nxt
 
-            # Remove timezone info for safe comparison
-            s1_str = shifts[iter1]["start"].replace('Z', '').split('+')[0]
-            s2_str = shifts[iter2]["start"].replace('Z', '').split('+')[0]
-            e1_str = shifts[iter1]["end"].replace('Z', '').split('+')[0]
-            
-            s1 = dt.datetime.fromisoformat(s1_str)
-            s2 = dt.datetime.fromisoformat(s2_str)
-            e1 = dt.datetime.fromisoformat(e1_str)
-
-            if s1 > s2:
-                continue
-            
-            # Check if shifts overlap or are less than 12 hours apart
-            is_too_close = False
-            if s2 < e1:  # Direct overlap
-                is_too_close = True
-            else:
-                diff = s2 - e1
-                if diff.total_seconds() < 12 * 3600:
-                    is_too_close = True
-
-            if is_too_close:
-                for j in P:
-                    model.AddAtMostOne([x[iter1, j], x[iter2, j]])
-    # cant because type
-    for s in S:
-        for p in P:
-            if providers[p].get('type') not in shifts[s]["allowed_provider_types"]:
-                model.Add(x[s, p] == 0)
+    # cant because type (only needed when x is dense)
+    if not sparse:
+        for s in S:
+            for p in P:
+                if not _type_ok(s, p):
+                    model.Add(x[s, p] == 0)
 
     # provider hard limits, we are trying to minimize slacks
-    slack_shift_less = [model.NewIntVar(0, 1000, f"shifts_{j}") for j in P]
-    slack_shift_more = [model.NewIntVar(0, 1000, f"shifts_{j}") for j in P]
+    # Domains come from the instance: a provider can fall short by at most min_total and
+    # overshoot by at most the open shifts beyond max_total.
+    min_totals = [int((providers[j].get('limits', {}) or {}).get('min_total', 0)) for j in P]
+    max_totals = [int((providers[j].get('limits', {}) or {}).get('max_total', len(S))) for j in P]
+    slack_shift_less = [model.NewIntVar(0, max(0, min_totals[j]), f"shifts_{j}") for j in P]
+    slack_shift_more = [model.NewIntVar(0, max(0, len(prov_shifts[j]) - max(0, max_totals[j])), f"shifts_{j}")
+                        for j in P]
 
     slack_hard_yes = [model.NewIntVar(0, 1000, f"shifts_{j}") for j in P]
 
     for j in P:
         print(j)
-        lim = providers[j].get('limits', {}) or {}
-        min_total = int(lim.get('min_total', 0))
-        max_total = int(lim.get('max_total', len(S)))
-        model.Add(sum(x[i, j] for i in S) + slack_shift_less[j] >= min_total)
-        model.Add(sum(x[i, j] for i in S) - slack_shift_more[j] <= max_total)
+        min_total = min_totals[j]
+        max_total = max_totals[j]
+        model.Add(sum(x[i, j] for i in prov_shifts[j]) + slack_shift_less[j] >= min_total)
+        model.Add(sum(x[i, j] for i in prov_shifts[j]) - slack_shift_more[j] <= max_total)
 
     #respect days that a provider cant
-    slack_cant_work = [model.NewIntVar(0, len(S), f"cantwork_{j}") for j in P]
+    forb_shifts = [[s for s in prov_shifts[j] if shifts[s]['date'] in forbidden_hard[j]] for j in P]
+    slack_cant_work = [model.NewIntVar(0, len(forb_shifts[j]), f"cantwork_{j}") for j in P]
     for j in P:
-        forb = set(providers[j].get('forbidden_days_hard', []))
-        terms = [x[s, j] for s in S if shifts[s]['date'] in forb]
+        terms = [x[s, j] for s in forb_shifts[j]]
         if terms:
             model.Add(slack_cant_work[j] == sum(terms))
         else:
@@ -1206,8 +1423,11 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
 
     # -------- HARD "ON" (date -> specific shift types) slack --------
     # Uses same coefficient as hard OFF in the hard objective.
-    slack_hard_on = [model.NewIntVar(0, 1000, f"hardon_{j}") for j in P]
+    hard_on_days = [sum(1 for d_str, tlist in (providers[j].get('preferred_days_hard') or {}).items()
+                        if d_str in date_to_idx and tlist) for j in P]
+    slack_hard_on = [model.NewIntVar(0, hard_on_days[j], f"hardon_{j}") for j in P]
     ANY = "ANY"
+    forced_hard_on_miss = 0
     for j in P:
         terms = []
         hard_on_map = (providers[j].get('preferred_days_hard') or {})
@@ -1223,12 +1443,15 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
                 miss = model.NewBoolVar(f"hard_on_miss_{j}_{d}")
                 model.Add(miss == 1)
                 terms.append(miss)
+                forced_hard_on_miss += 1
                 continue
             R = Sh if (ANY in tlist) else [s for s in Sh if shift_type[s] in set(tlist)]
+            R = [s for s in R if (s, j) in x]
             if not R:
                 miss = model.NewBoolVar(f"hard_on_miss_{j}_{d}")
                 model.Add(miss == 1)
                 terms.append(miss)
+                forced_hard_on_miss += 1
                 continue
             sel = model.NewBoolVar(f"hard_on_sel_{j}_{d}")
             for s in R:
@@ -1246,10 +1469,15 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
     c_slack_unfilled = int(get_num(consts, 'weights', 'hard', 'slack_unfilled', default=1))
     c_slack_shift_less = int(get_num(consts, 'weights', 'hard', 'slack_shift_less', default=1))
     c_slack_shift_more = int(get_num(consts, 'weights', 'hard', 'slack_shift_more', default=1))
-    c_slack_cant_work = int(get_num(consts, 'weights', 'hard', 'slack_cant_work', default=1))
     c_slack_consec = int(get_num(consts, 'weights', 'hard', 'slack_consec', default=1))
 
-    U = model.NewIntVar(0, 10**18, "U")
+    U_ub = (c_slack_shift_less * sum(_var_ub(v) for v in slack_shift_less)
+            + c_slack_shift_more * sum(_var_ub(v) for v in slack_shift_more)
+            + c_slack_cant_work * sum(_var_ub(v) for v in slack_cant_work)
+            + c_slack_consec * sum(_var_ub(v) for v in slack_consec)
+            + c_slack_cant_work * sum(hard_on_days))
+    _check_int64_objective("phase-1 objective U", 0, U_ub)
+    U = model.NewIntVar(0, U_ub, "U")
     model.Add(U == 
               # c_slack_unfilled * sum(slack_unfilled) 
               c_slack_shift_less * sum(slack_shift_less) 
@@ -1259,32 +1487,139 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
               + c_slack_cant_work * sum(slack_hard_on))  # NEW: hard ON slack weighted like hard OFF
     model.Minimize(U)
 
-    # Phase-1 solve (hard slacks) — VERBOSE + callback into logger
-    solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = float(120)
-    solver.parameters.num_search_workers = 8
-    solver.parameters.log_search_progress = True
-    solver.parameters.log_to_stdout = False
-    try:
-        solver.log_callback = lambda line: logging.getLogger("scheduler").info("[phase1] %s", line.rstrip())
-    except Exception:
-        pass
-    logger.info("Phase-1 solve: time=%ss workers=%s", solver.parameters.max_time_in_seconds, solver.parameters.num_search_workers)
+    # Instance lower bound on U: providers with fewer open shifts than min_total must
+    # fall short, and hard-ON requests without an open shift are always missed.
+    # solve_phase1 stops as soon as an incumbent reaches it.
+    U_lb = c_slack_cant_work * forced_hard_on_miss
+    for j in P:
+        lim = providers[j].get('limits', {}) or {}
+        U_lb += c_slack_shift_less * max(0, int(lim.get('min_total', 0)) - len(prov_shifts[j]))
+    model.Add(U >= U_lb)
+    logger.info("Phase-1 objective lower bound U>=%d", U_lb)
 
-    st1 = solver.Solve(model)
-    obj1 = solver.ObjectiveValue() if st1 in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None
-    logger.info("Phase-1 status=%s objective(U)=%s", solver.StatusName(st1), obj1)
-    # Optional: this goes through the logger anyway
-    print(solver.ObjectiveValue() if obj1 is not None else "No objective")
+    # Phase 1 is solved by solve_phase1; build_phase2_objective adds the soft layer on top
+    # once the hard slacks are known.
+    return dict(
+        model=model,
+        x=x,
+        U=U,
+        U_lb=U_lb,
+        Weighted=None,
+        objective_levels=None,
+        hard_slacks=dict(
+            slack_shift_less=slack_shift_less,
+            slack_shift_more=slack_shift_more,
+            slack_cant_work=slack_cant_work,
+            slack_consec=slack_consec,
+            slack_hard_on=slack_hard_on,
+        ),
+        days=days,
+        providers=providers,
+        shifts=shifts,
+        S=S, P=P, D=D,
+        weekend_idx=weekend_idx,
+        shift_day=shift_day,
+        shift_type=shift_type,
+        shift_demand=shift_demand,
+        types=types,
+        type_to_idx=type_to_idx,
+        day_to_shifts=day_to_shifts,
+        date_to_idx=date_to_idx,
+        prov_shifts=prov_shifts,
+        rest_cliques=rest_cliques,
+        shift_scarcity=shift_scarcity,
+        provider_classes=provider_classes,
+        y=y,
+        runs=runs,
+    )
 
+def build_phase2_objective(consts: Dict[str,Any], ctx: Dict[str,Any], hard: Dict[str,List[int]]) -> Dict[str,Any]:
+    """Pin the phase-1 hard slacks and add the soft (phase-2) layer to ctx['model'].
+
+    hard maps each ctx['hard_slacks'] family to its phase-1 values. Sets the phase-2
+    objective (or ctx['objective_levels'] in lexicographic mode) and returns ctx.
+    """
+    logger = logging.getLogger("scheduler")
+    model = ctx['model']
+    x, y, runs = ctx['x'], ctx['y'], ctx['runs']
+    days, providers = ctx['days'], ctx['providers']
+    S, P, D = ctx['S'], ctx['P'], ctx['D']
+    N = len(D)
+    shift_day, shift_type = ctx['shift_day'], ctx['shift_type']
+    types, type_to_idx = ctx['types'], ctx['type_to_idx']
+    day_to_shifts, date_to_idx = ctx['day_to_shifts'], ctx['date_to_idx']
+    prov_shifts = ctx['prov_shifts']
+    linearize = _linearize_families(consts)
+    logger.info("Linearized phase-2 helper families: %s", sorted(linearize))
 
     # slacks enforced
     # now we solve for soft constraints
-    for i in (slack_shift_less + slack_shift_more + slack_cant_work + slack_consec + slack_hard_on):
-        model.Add(i == solver.Value(i))
+    for name, vars_ in ctx['hard_slacks'].items():
+        for v, val in zip(vars_, hard[name]):
+            model.Add(v == int(val))
+
+    # ----- NEW: Cubic penalty of cluster lengths per provider (soft) -------------
+    # Only the phase-2 objective reads the cubes, so they are built after phase 1.
+    # Detect cluster ends: end_d = 1 iff y[i,d]==1 and (d==N-1 or y[i,d+1]==0)
+    # Cluster length is runs[i][d_end]; we gate it into L_d and look up L^3.
+    #
+    # cube_encoding "table" (default): a cluster ending on day d is at most as long as the
+    # streak of days up to d on which provider i has any open shift, so L_d has a small
+    # domain and L^3 comes from one AddElement over a precomputed table of cubes; days
+    # without an open shift cannot end a cluster and get no variables at all.
+    # "product" keeps the original L2 = L*L, L3 = L2*L multiplication chain.
+    cube_encoding = str((consts.get('solver') or {}).get('cube_encoding', 'table')).lower()
+    streak_cap = {}
+    for i in P:
+        streak = int((providers[i].get('carry_in') or {}).get('streak', 0) or 0)
+        for d in D:
+            streak = streak + 1 if any((s, i) in x for s in day_to_shifts[d]) else 0
+            streak_cap[(i, d)] = streak
+    # Cubes are superadditive, so the cube sum peaks when every maximal open streak is
+    # worked as one cluster.
+    cubesum_cap = [sum(streak_cap[(i, d)] ** 3 for d in D
+                       if streak_cap[(i, d)] and (d == N - 1 or not streak_cap[(i, d + 1)]))
+                   for i in P]
+    cluster_cubesums = [model.NewIntVar(0, cubesum_cap[i], f"cluster_cubesum_{i}") for i in P]
+
+    for i in P:
+        cube_terms = []
+        for d in D:
+            cap = streak_cap[(i, d)] if cube_encoding != 'product' else _var_ub(runs[i][d])
+            if cap == 0:
+                continue  # y[i,d] == 0
+            end_d = model.NewBoolVar(f"cluster_end_{i}_{d}")
+            if d < N - 1:
+                # Linearization of end_d == (y_d == 1 and y_{d+1} == 0)
+                model.Add(end_d >= y[(i, d)] - y[(i, d + 1)])
+                model.Add(end_d <= y[(i, d)])
+                model.Add(end_d <= 1 - y[(i, d + 1)])
+            else:
+                # Last day: end iff working that day
+                model.Add(end_d == y[(i, d)])
+
+            # L_d = run[d] if end_d else 0
+            Ld = model.NewIntVar(0, cap, f"cluster_len_{i}_{d}")
+            model.Add(Ld == runs[i][d]).OnlyEnforceIf(end_d)
+            model.Add(Ld == 0).OnlyEnforceIf(end_d.Not())
+
+            if cube_encoding == 'table':
+                L3 = model.NewIntVar(0, cap ** 3, f"cluster_len_cube_{i}_{d}")
+                model.AddElement(Ld, [k ** 3 for k in range(cap + 1)], L3)
+            else:
+                # L^2 and L^3
+                L2 = model.NewIntVar(0, cap * cap, f"cluster_len_sq_{i}_{d}")
+                model.AddMultiplicationEquality(L2, [Ld, Ld])
+                L3 = model.NewIntVar(0, cap ** 3, f"cluster_len_cube_{i}_{d}")
+                model.AddMultiplicationEquality(L3, [L2, Ld])
+
+            cube_terms.append(L3)
 
-    # soft penalty 
-    Weighted = model.NewIntVar(-1000000000000000000, 1000000000000000000, "Weighted")
+        if cube_terms:
+            model.Add(cluster_cubesums[i] == sum(cube_terms))
+        else:
+            model.Add(cluster_cubesums[i] == 0)
+    # ---------------------------------------------------------------------------
 
     shifts_by_type = {t: [s for s in S if shift_type[s] == t] for t in types}
     for t in shifts_by_type:
@@ -1301,28 +1636,39 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
             if not seq:
                 continue
 
+            # Missing x keys are fixed 0: a start can only happen on an existing x, and
+            # a missing predecessor behaves like "not taken".
+            if not any((s, j) in x for s in seq):
+                continue
+
             # first of each type starts a cluster if taken
             s0 = seq[0]
-            cluster_start[(j, t, 0)] = model.NewBoolVar(f"cluster_start_{j}_{type_to_idx[t]}_0")
-            model.Add(cluster_start[(j, t, 0)] == x[s0, j])
+            if (s0, j) in x:
+                cluster_start[(j, t, 0)] = model.NewBoolVar(f"cluster_start_{j}_{type_to_idx[t]}_0")
+                model.Add(cluster_start[(j, t, 0)] == x[s0, j])
 
             # new cluster when previous not taken and current taken: 0 -> 1 transition
             for k in range(1, len(seq)):
                 sp, sc = seq[k - 1], seq[k]
+                if (sc, j) not in x:
+                    continue
                 vk = model.NewBoolVar(f"cluster_start_{j}_{type_to_idx[t]}_{k}")
                 cluster_start[(j, t, k)] = vk
-                model.Add(vk >= x[sc, j] - x[sp, j])
-                model.Add(vk <= x[sc, j])
-                model.Add(vk <= 1 - x[sp, j])
+                if (sp, j) in x:
+                    model.Add(vk >= x[sc, j] - x[sp, j])
+                    model.Add(vk <= x[sc, j])
+                    model.Add(vk <= 1 - x[sp, j])
+                else:
+                    model.Add(vk == x[sc, j])
 
             # total clusters for (j, t)
             cc_jt = model.NewIntVar(0, len(seq), f"cluster_count_{j}_{type_to_idx[t]}")
-            model.Add(cc_jt == sum(cluster_start[(j, t, k)] for k in range(len(seq))))
+            model.Add(cc_jt == sum(cluster_start[(j, t, k)] for k in range(len(seq)) if (j, t, k) in cluster_start))
             cluster_count[(j, t)] = cc_jt
 
     # === Provider-level cluster counts ===
     max_clusters_per_provider = sum(len(shifts_by_type[t]) for t in types)
-    cc = [model.NewIntVar(0, max_clusters_per_provider, f"cc_{j}") for j in P]
+    cc = [model.NewIntVar(0, min(max_clusters_per_provider, len(prov_shifts[j])), f"cc_{j}") for j in P]
     for j in P:
         model.Add(cc[j] == sum(cluster_count[(j, t)] for t in types if (j, t) in cluster_count))
 
@@ -1330,39 +1676,39 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
     # - number of clusters (any type)
     # - Violations of soft requirements
 
-    days_per_provider = [model.NewIntVar(0, 40, f"days_per_provider_{i}") for i in P]
+    days_per_provider = [model.NewIntVar(0, len(prov_shifts[i]), f"days_per_provider_{i}") for i in P]
     for i in P:
-        model.Add(days_per_provider[i] == sum([x[j, i] for j in S]))
-    clusters_per_provider = [model.NewIntVar(0, 10**15, f"personal_penalty_{j}") for j in P]
+        model.Add(days_per_provider[i] == sum([x[j, i] for j in prov_shifts[i]]))
+    clusters_per_provider = [model.NewIntVar(0, _var_ub(cc[j]), f"personal_penalty_{j}") for j in P]
     for p in P:
         model.Add(clusters_per_provider[p] == cc[p])
-    cluster_square = [model.NewIntVar(0, 10**5, f"cluster_square_{j}") for j in P]
+    cluster_square = [model.NewIntVar(0, _var_ub(cc[j]) ** 2, f"cluster_square_{j}") for j in P]
     for p in P:
-        model.AddMultiplicationEquality(cluster_square[p], [clusters_per_provider[p], clusters_per_provider[p]])
-    nshifts = len(S)
+        _add_square(model, cluster_square[p], clusters_per_provider[p], _var_ub(cc[p]), 'square' in linearize)
+    nshifts = sum(ctx['shift_demand'])
     nproviders = len(P)
     avg = nshifts // nproviders
 
-    nshifts = len(S)
 
     # slacks (use distinct names!)
-    slack_less = [model.NewIntVar(0, nshifts, f"less_shifts_s_{i}") for i in P]
-    slack_more = [model.NewIntVar(0, nshifts, f"more_shifts_s_{i}") for i in P]
+    # taken shifts lie in [0, len(prov_shifts[i])], which bounds both slacks
+    slack_less = [model.NewIntVar(0, avg, f"less_shifts_s_{i}") for i in P]
+    slack_more = [model.NewIntVar(0, max(0, len(prov_shifts[i]) - avg), f"more_shifts_s_{i}") for i in P]
 
     # tie slacks to deviation from avg
     for i in P:
-        model.Add(sum(x[s, i] for s in S) + slack_less[i] >= avg)
-        model.Add(sum(x[s, i] for s in S) - slack_more[i] <= avg)
+        model.Add(sum(x[s, i] for s in prov_shifts[i]) + slack_less[i] >= avg)
+        model.Add(sum(x[s, i] for s in prov_shifts[i]) - slack_more[i] <= avg)
 
     # square the slacks via auxiliary vars
-    less_sq = [model.NewIntVar(0, 2 *nshifts * nshifts, f"less_sq_{i}") for i in P]
-    more_sq = [model.NewIntVar(0, 2 * nshifts * nshifts, f"more_sq_{i}") for i in P]
+    less_sq = [model.NewIntVar(0, _var_ub(slack_less[i]) ** 2, f"less_sq_{i}") for i in P]
+    more_sq = [model.NewIntVar(0, _var_ub(slack_more[i]) ** 2, f"more_sq_{i}") for i in P]
     for i in P:
-        model.AddMultiplicationEquality(less_sq[i], [slack_less[i], slack_less[i]])
-        model.AddMultiplicationEquality(more_sq[i], [slack_more[i], slack_more[i]])
+        _add_square(model, less_sq[i], slack_less[i], _var_ub(slack_less[i]), 'square' in linearize)
+        _add_square(model, more_sq[i], slack_more[i], _var_ub(slack_more[i]), 'square' in linearize)
 
     # deviation[i] = less_sq[i] + more_sq[i]
-    deviation = [model.NewIntVar(0, 2 * nshifts * nshifts, f"deviation_{i}") for i in P]
+    deviation = [model.NewIntVar(0, _var_ub(less_sq[i]) + _var_ub(more_sq[i]), f"deviation_{i}") for i in P]
     cclusters = int(get_num(consts, 'weights', 'soft', 'cluster', default=500))
     cunfair = int(get_num(consts, 'weights', 'soft', 'unfair_number', default=10))
     cweekend_not_clustered = int(get_num(consts, 'weights', 'soft', 'cluster_weekend_start', default=50000))
@@ -1375,7 +1721,6 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
     for i in P:
         model.Add(deviation[i] == less_sq[i] + more_sq[i])    
     # Weekend penalty (works Sat, not Sun)
-    second_weekend = max(weekend_idx)
     count_horrible = [model.NewIntVar(0, nshifts, f'weekend_unclustered_{i}') for i in P]
 
     import datetime as _dt
@@ -1387,23 +1732,20 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
 
     weekend_pairs = [(d, d+1) for d in range(len(days)-1) if _wd(d) == 5 and _wd(d+1) == 6]
 
-    y = {}  # (i,d) -> BoolVar
-    for i in P:
-        for d in D:
-            yi = model.NewBoolVar(f"works_day_{i}_{d}")
-            y[(i, d)] = yi
-            S_d = day_to_shifts[d]
-            if not S_d:
-                model.Add(yi == 0)
-            else:
-                for s in S_d:
-                    model.Add(x[s, i] <= yi)
-                model.Add(sum(x[s, i] for s in S_d) >= yi)
-
+    # Weekend pairs and soft-OFF violations reuse the shared workday layer
+    # y[(i,d)] built above for the consecutive-days / cluster-cube logic.
     count_horrible = [model.NewIntVar(0, len(weekend_pairs), f"wk_pen_count_{i}") for i in P]
     for i in P:
         terms = []
         for d1, d2 in weekend_pairs:
+            if 'weekend' in linearize:
+                # pen == y1 AND NOT y2, the same linearization as cluster_end above
+                pen = model.NewBoolVar("wk_pen_%d_%d_%d" % (i, d1, d2))
+                model.Add(pen >= y[(i, d1)] - y[(i, d2)])
+                model.Add(pen <= y[(i, d1)])
+                model.Add(pen <= 1 - y[(i, d2)])
+                terms.append(pen)
+                continue
             diff = model.NewIntVar(-1, 1, f"wk_diff_%d_%d_%d" % (i, d1, d2))
             pen  = model.NewIntVar(0, 1,  f"wk_pen_%d_%d_%d"  % (i, d1, d2))
             model.Add(diff == y[(i, d1)] - y[(i, d2)])
@@ -1424,15 +1766,10 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
             if d_str not in date_to_idx:
                 continue
             d = date_to_idx[d_str]
-            Sh = day_to_shifts.get(d, [])
-            if not Sh:
+            if not any((s, i) in x for s in day_to_shifts.get(d, [])):
                 continue  # nothing to avoid that day
-            viol = model.NewBoolVar(f"soft_off_viol_{i}_{d}")
-            # viol == 1 iff provider i works any shift that day
-            for s in Sh:
-                model.Add(x[s, i] <= viol)
-            model.Add(sum(x[s, i] for s in Sh) >= viol)
-            off_terms.append(viol)
+            # violated iff provider i works any shift that day, i.e. the workday indicator
+            off_terms.append(y[(i, d)])
         model.Add(soft_off_i[i] == (sum(off_terms) if off_terms else 0))
 
         # --- SOFT ON (unchanged, already correct) ---
@@ -1448,6 +1785,10 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
             R = Sh if (ANY in tlist) else [s for s in Sh if shift_type[s] in set(tlist)]
             if not R:
                 continue
+            R = [s for s in R if (s, i) in x]
+            if not R:
+                on_miss_terms.append(1)  # requested shifts exist but none is open to i
+                continue
             sel  = model.NewBoolVar(f"soft_on_sel_{i}_{d}")
             for s in R:
                 model.Add(x[s, i] <= sel)
@@ -1457,50 +1798,131 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
             on_miss_terms.append(miss)
         model.Add(soft_on_i[i] == (sum(on_miss_terms) if on_miss_terms else 0))
 
-    s = model.NewIntVar(0, nshifts + 5, "taken_shifts")
-    model.Add(s == sum(x[i, j] for i in S for j in P))
-    av_target = model.NewIntVar(0, 40, "avg_target")
-    deviations = model.NewIntVar(0, 5000, "deviation")
+    # Fairness domains follow from the instance: at most nshifts are taken in total, and
+    # with the phase-1 slacks pinned provider j takes between lo_j = min_total - less and
+    # hi_j = max_total + more of its len(prov_shifts[j]) open shifts (max_total defaults
+    # to the open shifts, as in build_model); personal_target clamps av_target into
+    # [lo_j, max_total + more] with the historical default max_total of 31. (Fixed caps
+    # of 40/50/1000/5000 used to cut real solutions off.)
+    s = model.NewIntVar(0, nshifts, "taken_shifts")
+    model.Add(s == sum(x.values()))
+    av_hi = (nshifts + len(P) - 1) // len(P)
+    av_target = model.NewIntVar(0, av_hi, "avg_target")
+    lo_hi = []
+    for j in P:
+        lim = providers[j].get('limits', {}) or {}
+        lo_hi.append((lim.get("min_total", 0) - int(hard['slack_shift_less'][j]),
+                      lim.get("max_total", 31) + int(hard['slack_shift_more'][j])))
+    target_rng = [(min(max(lo, 0), hi), min(max(lo, av_hi), hi)) for lo, hi in lo_hi]
+    taken_rng = []
+    for j, (lo, _) in enumerate(lo_hi):
+        lim, n_open = providers[j].get('limits', {}) or {}, len(prov_shifts[j])
+        hi = min(int(lim.get('max_total', n_open)), n_open) + int(hard['slack_shift_more'][j])
+        taken_rng.append((max(lo, 0), max(min(hi, n_open), 0)))
+    absv_cap = [max(0, target_rng[j][1] - taken_rng[j][0], taken_rng[j][1] - target_rng[j][0]) for j in P]
+    abst_cap = [max(0, target_rng[j][1], av_hi - target_rng[j][0]) for j in P]
+    deviations = model.NewIntVar(0, max((c * c for c in absv_cap), default=0), "deviation")
     #model.Add(av_target * len(P) <= s)
     #model.Add((av_target + 1) * len(P) >= s)
-    total_taken = model.NewIntVar(0, nshifts + 5, "total_taken")
-    model.Add(total_taken == sum(x[i, j] for i in range(len(S)) for j in range(len(P))))
-    model.AddDivisionEquality(av_target, total_taken + len(P) - 1, len(P))
-    personal_target = [model.NewIntVar(0, 40, "personal_target_%d" % j) for j in P]
-    provider_taken = [model.NewIntVar(0, 40, "provider_taken_%d" % i) for i in P]
+    total_taken = model.NewIntVar(0, nshifts, "total_taken")
+    model.Add(total_taken == sum(x.values()))
+    if 'average' in linearize:
+        # av_target = ceil(total_taken / |P|) as two linear inequalities
+        model.Add(len(P) * av_target >= total_taken)
+        model.Add(len(P) * av_target <= total_taken + len(P) - 1)
+    else:
+        model.AddDivisionEquality(av_target, total_taken + len(P) - 1, len(P))
+    personal_target = [model.NewIntVar(*target_rng[j], "personal_target_%d" % j) for j in P]
+    provider_taken = [model.NewIntVar(*taken_rng[i], "provider_taken_%d" % i) for i in P]
     for i in P:
-        model.Add(provider_taken[i] == sum([x[s, i] for s in S]))
+        model.Add(provider_taken[i] == sum([x[s, i] for s in prov_shifts[i]]))
     constant_absolutely_horrible = 1000000000000000
-    absv = [model.NewIntVar(0, 40, "absv%d" % j) for j in P]
-    abst = [model.NewIntVar(0, 40, "abst%d" % j) for j in P]
-    absvsq = [model.NewIntVar(0, 1600, "absvsq%d" % j) for j in P]
-    los = [model.NewIntVar(0, 50, "los%d" % j) for j in P]
+    absv = [model.NewIntVar(0, absv_cap[j], "absv%d" % j) for j in P]
+    abst = [model.NewIntVar(0, abst_cap[j], "abst%d" % j) for j in P]
+    absvsq = [model.NewIntVar(0, absv_cap[j] ** 2, "absvsq%d" % j) for j in P]
     for j in P:
-        lim = providers[j].get('limits', {}) or {}
-        mn = lim.get("min_total", 0)
-        mx = lim.get("max_total", 31)
-        model.AddAbsEquality(absv[j], personal_target[j] - provider_taken[j])
-        model.AddAbsEquality(abst[j], personal_target[j] - av_target)
-        model.AddMaxEquality(los[j] , [mn - solver.Value(slack_shift_less[j]), av_target])
-        model.AddMinEquality(personal_target[j], [los[j], mx + solver.Value(slack_shift_more[j])])
-        model.AddMultiplicationEquality(absvsq[j], [absv[j], absv[j]])
+        _add_abs(model, absv[j], personal_target[j] - provider_taken[j], 'abs' in linearize, f"absv_pos_{j}")
+        _add_abs(model, abst[j], personal_target[j] - av_target, 'abs' in linearize, f"abst_pos_{j}")
+        lo, hi = lo_hi[j]
+        if 'minmax' in linearize:
+            # personal_target = min(max(lo, av_target), hi) with lo, hi constants: two
+            # booleans say whether av_target sits at/below lo or at/above hi.
+            if lo >= hi:
+                model.Add(personal_target[j] == hi)
+            else:
+                below = model.NewBoolVar(f"target_at_min_{j}")
+                above = model.NewBoolVar(f"target_at_max_{j}")
+                model.Add(av_target <= lo).OnlyEnforceIf(below)
+                model.Add(av_target >= lo + 1).OnlyEnforceIf(below.Not())
+                model.Add(av_target >= hi).OnlyEnforceIf(above)
+                model.Add(av_target <= hi - 1).OnlyEnforceIf(above.Not())
+                model.Add(personal_target[j] == lo).OnlyEnforceIf(below)
+                model.Add(personal_target[j] == hi).OnlyEnforceIf(above)
+                model.Add(personal_target[j] == av_target).OnlyEnforceIf([below.Not(), above.Not()])
+        else:
+            los = model.NewIntVar(max(lo, 0), max(lo, av_hi), "los%d" % j)
+            model.AddMaxEquality(los, [lo, av_target])
+            model.AddMinEquality(personal_target[j], [los, hi])
+        _add_square(model, absvsq[j], absv[j], absv_cap[j], 'square' in linearize)
         model.Add(deviations >= absvsq[j])
     #model.Add(deviations < 100000)
     ultimate_const = (int) (5.6 * 10 ** 14)
-    very_heavy_cost = model.NewIntVar(0, 50, "above_3")
-    model.AddMaxEquality(very_heavy_cost, [0, deviations - 9])
-    within_diff = model.NewIntVar(0, 1000, "within_diff")
+    # very_heavy can reach deviations - 9, but the search does far better with it held at
+    # solver.fairness_cap (default 50, null for none). The cap is a cut, not a limit: if
+    # phase 2 proves it infeasible, solve_two_phase widens the domain and solves again.
+    vh_bound = max(0, _var_ub(deviations) - 9)
+    fairness_cap = (consts.get('solver') or {}).get('fairness_cap', 50)
+    vh_ub = vh_bound if fairness_cap is None else min(vh_bound, int(fairness_cap))
+    very_heavy_cost = model.NewIntVar(0, vh_ub, "above_3")
+    if 'minmax' in linearize:
+        # deviations is itself only bounded from below, so the lower side is the whole max
+        model.Add(very_heavy_cost >= deviations - 9)
+    else:
+        model.AddMaxEquality(very_heavy_cost, [0, deviations - 9])
+    within_diff = model.NewIntVar(0, sum(_var_ub(v) for v in absvsq), "within_diff")
     model.Add(within_diff == sum(absvsq))
-    model.Add(Weighted ==   ultimate_const * very_heavy_cost + 
-                            cclusters * sum(cluster_square) +
-                            c_cluster_size * sum(cluster_cubesums) +   
-                            cweekend_not_clustered * sum(count_horrible) + 
-                            c_soft_on * sum(soft_on_i) + 
-                            c_soft_off * sum(soft_off_i) - 
-                            100000000000 * total_taken + 
-                            ((c_soft_on + c_soft_off + 10) // 10  + 1 )* within_diff)
     print(count_horrible)
-    model.Minimize(Weighted)
+
+    # Soft objective terms as (name, weight, expression), most important first.
+    # "weighted" folds them into the single Weighted sum; "lexicographic" groups them
+    # into levels that solve_two_phase optimises one after another.
+    objective_terms = [
+        ("very_heavy", ultimate_const, very_heavy_cost),
+        ("coverage", -COVERAGE_REWARD, total_taken),
+        ("cluster", cclusters, sum(cluster_square)),
+        ("cluster_size", c_cluster_size, sum(cluster_cubesums)),
+        ("weekend", cweekend_not_clustered, sum(count_horrible)),
+        ("soft_on", c_soft_on, sum(soft_on_i)),
+        ("soft_off", c_soft_off, sum(soft_off_i)),
+        ("fairness", (c_soft_on + c_soft_off + 10) // 10 + 1, within_diff),
+    ]
+    # Every term is a non-negative sum of variables, so its range is [0, sum of upper ends];
+    # the weighted sum (which also bounds each lexicographic level) must fit in int64.
+    term_ub = {
+        "very_heavy": vh_bound,
+        "coverage": _var_ub(total_taken),
+        "cluster": sum(_var_ub(v) for v in cluster_square),
+        "cluster_size": sum(_var_ub(v) for v in cluster_cubesums),
+        "weekend": sum(_var_ub(v) for v in count_horrible),
+        "soft_on": sum(_var_ub(v) for v in soft_on_i),
+        "soft_off": sum(_var_ub(v) for v in soft_off_i),
+        "fairness": _var_ub(within_diff),
+    }
+    w_lo = sum(min(0, w * term_ub[n]) for n, w, _ in objective_terms)
+    w_hi = sum(max(0, w * term_ub[n]) for n, w, _ in objective_terms)
+    _check_int64_objective("phase-2 objective Weighted", w_lo, w_hi)
+    logger.info("Phase-2 objective range [%d, %d]", w_lo, w_hi)
+    objective_mode = str((consts.get('solver') or {}).get('objective_mode', 'weighted')).lower()
+    Weighted = None
+    objective_levels = None
+    if objective_mode == 'lexicographic':
+        objective_levels = _lexicographic_levels(consts, objective_terms)
+        logger.info("Lexicographic objective levels: %s", [names for names, _ in objective_levels])
+    else:
+        # soft penalty
+        Weighted = model.NewIntVar(w_lo, w_hi, "Weighted")
+        model.Add(Weighted == sum(w * e for _, w, e in objective_terms))
+        model.Minimize(Weighted)
     global trashcan
     for i in P:
         trashcan.add(personal_target[i])
@@ -1509,22 +1931,211 @@ def build_model(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
     trashcan.add(deviations)
 
     # (Phase-2 solver is created in solve_two_phase)
-    return dict(
+    ctx.update(Weighted=Weighted, objective_levels=objective_levels,
+               fairness_cap=dict(var=very_heavy_cost, cap=vh_ub, bound=vh_bound) if vh_ub < vh_bound else None)
+    return ctx
+
+# ---------- Compiled-model cache ----------
+# build_model output and the phase-1 incumbent, keyed by a hash of everything that shapes
+# the model (calendar, shifts, providers, constants minus pure run-time solver settings,
+# this file's source and the OR-Tools version). A re-run that only changes run.k, run.L,
+# the seed or the time budget loads the CpModelProto instead of rebuilding it and skips
+# phase 1. Entries live in constants.solver.model_cache_dir (default: $SCHEDULER_MODEL_CACHE
+# or <tmp>/scheduler_model_cache-<uid>, i.e. /tmp on a warm Lambda) and are evicted
+# least-recently-used once the directory exceeds solver.model_cache_max_mb (default 512).
+# Entries are pickles, so the directory is created 0700 and the cache is bypassed unless
+# the directory and the entry are owned by the current user and not group/world-writable.
+MODEL_CACHE_RUNTIME_KEYS = {
+    "max_time_in_seconds", "phase1_fraction", "relative_gap", "num_threads",
+    "phase1_num_threads", "repair_hint", "phase2_warm_start", "hint_completion_seconds",
+    "lexicographic_time_fractions", "model_cache", "model_cache_dir", "model_cache_max_mb",
+    "decompose", "capacity_precheck", "lns_fraction", "lns_step_seconds", "lns_neighbourhoods",
+    "rolling_horizon", "rolling_window_days", "rolling_step_days", "diversity_strategy",
+    "pool_limit", "pool_min_distance", "diversity_fraction", "diversity_max_degradation",
+    "diversity_processes", "diversity_threads", "portfolio", "portfolio_threads", "portfolio_variants",
+    "stall_seconds", "improvement_window_seconds", "min_improvement",
+}
+_MODEL_CACHE_VAR_KEYS = ("x", "y", "runs", "U", "hard_slacks")
+_MODEL_CACHE_CASE_KEYS = ("days", "providers", "shifts")
+_source_digest = None
+
+def _model_cache_key(consts, case):
+    import hashlib
+    global _source_digest
+    if _source_digest is None:
+        try:
+            with open(__file__, 'rb') as f:
+                _source_digest = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            _source_digest = ""
+    try:
+        from ortools import __version__ as ortools_version
+    except ImportError:
+        ortools_version = ""
+    solver = {k: v for k, v in (consts.get('solver') or {}).items() if k not in MODEL_CACHE_RUNTIME_KEYS}
+    payload = {
+        "source": _source_digest,
+        "ortools": ortools_version,
+        "constants": dict(consts, solver=solver),
+        "calendar": case.get('calendar'),
+        "shifts": case.get('shifts'),
+        "providers": case.get('providers'),
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+def _model_cache_dir(consts):
+    import tempfile
+    sp = consts.get('solver') or {}
+    if not sp.get('model_cache', True) or os.environ.get('SCHEDULER_MODEL_CACHE', '').lower() in ('0', 'off', 'false'):
+        return None
+    user = os.getuid() if hasattr(os, 'getuid') else os.environ.get('USERNAME', 'user')
+    return (sp.get('model_cache_dir') or os.environ.get('SCHEDULER_MODEL_CACHE')
+            or os.path.join(tempfile.gettempdir(), f'scheduler_model_cache-{user}'))
+
+def _model_cache_trusted(path, is_dir):
+    """True if path is a real directory/file owned by this user and not group/world-writable.
+
+    Cache entries are unpickled, so anyone else able to write them could run code here.
+    """
+    import stat
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    if not (stat.S_ISDIR(st.st_mode) if is_dir else stat.S_ISREG(st.st_mode)):
+        return False
+    if hasattr(os, 'getuid') and (st.st_uid != os.getuid() or st.st_mode & 0o022):
+        return False
+    return True
+
+def _model_cache_evict(cache_dir, max_bytes):
+    """Drop least-recently-used entries until the cache fits in max_bytes."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.pkl'):
+            path = os.path.join(cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def _model_cache_store(consts, ctx):
+    """Write ctx['model'] (still the phase-1 model), its variable maps and the phase-1 result."""
+    import pickle
+    info = ctx.get('model_cache') or {}
+    cache_dir = info.get('dir')
+    if not cache_dir:
+        return
+    logger = logging.getLogger("scheduler")
+    idx = lambda v: v.Index()
+    entry = {
+        "proto": ctx['model'].Proto().SerializeToString(),
+        "vars": {
+            "x": {k: idx(v) for k, v in ctx['x'].items()},
+            "y": {k: idx(v) for k, v in ctx['y'].items()},
+            "runs": {i: [idx(v) for v in run] for i, run in ctx['runs'].items()},
+            "U": idx(ctx['U']),
+            "hard_slacks": {n: [idx(v) for v in vs] for n, vs in ctx['hard_slacks'].items()},
+        },
+        "ctx": {k: v for k, v in ctx.items()
+                if k not in _MODEL_CACHE_VAR_KEYS + _MODEL_CACHE_CASE_KEYS + ("model", "model_cache")},
+    }
+    try:
+        if not _model_cache_trusted(cache_dir, True):
+            return
+        path = os.path.join(cache_dir, info['key'] + '.pkl')
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        max_mb = float((consts.get('solver') or {}).get('model_cache_max_mb', 512))
+        _model_cache_evict(cache_dir, int(max_mb * 1024 * 1024))
+        logger.info("Model cache: stored %s (%.1f KB, phase1=%s)", info['key'][:12],
+                    os.path.getsize(path) / 1024 if os.path.exists(path) else 0.0,
+                    'phase1_meta' in entry['ctx'])
+    except OSError as e:
+        logger.warning("Model cache: could not store %s: %s", info['key'][:12], e)
+
+def _model_cache_load(path, case):
+    import pickle
+    if not _model_cache_trusted(path, False):
+        raise OSError("not owned by this user or writable by others")
+    with open(path, 'rb') as f:
+        entry = pickle.load(f)
+    model = cp_model.CpModel()
+    model.Proto().ParseFromString(entry['proto'])
+    var = model.GetIntVarFromProtoIndex
+    vi = entry['vars']
+    ctx = dict(entry['ctx'])
+    ctx.update(
         model=model,
-        x=x,
-        U=U,
-        Weighted=Weighted,
-        days=days,
-        providers=providers,
-        shifts=shifts,
-        S=S, P=P, D=D,
-        weekend_idx=weekend_idx,
-        shift_day=shift_day,
-        shift_type=shift_type,
-        types=types,
-        type_to_idx=type_to_idx,
-        day_to_shifts=day_to_shifts,
+        x={k: var(i) for k, i in vi['x'].items()},
+        y={k: var(i) for k, i in vi['y'].items()},
+        runs={i: [var(k) for k in ks] for i, ks in vi['runs'].items()},
+        U=var(vi['U']),
+        hard_slacks={n: [var(k) for k in ks] for n, ks in vi['hard_slacks'].items()},
+        days=case['calendar']['days'],
+        providers=case['providers'],
+        shifts=case['shifts'],
     )
+    return ctx
+
+def build_model_cached(consts: Dict[str,Any], case: Dict[str,Any]) -> Dict[str,Any]:
+    """build_model through the compiled-model cache (see MODEL_CACHE_RUNTIME_KEYS).
+
+    On a hit the returned ctx also carries the cached phase-1 result, which
+    solve_two_phase reuses instead of solving phase 1 again.
+    """
+    logger = logging.getLogger("scheduler")
+    cache_dir = _model_cache_dir(consts)
+    if not cache_dir:
+        return build_model(consts, case)
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    except OSError:
+        pass
+    if not _model_cache_trusted(cache_dir, True):
+        logger.warning("Model cache: disabled, %s is not a directory owned by this user "
+                       "and closed to others", cache_dir)
+        return build_model(consts, case)
+    key = _model_cache_key(consts, case)
+    path = os.path.join(cache_dir, key + '.pkl')
+    if os.path.exists(path):
+        try:
+            ctx = _model_cache_load(path, case)
+            os.utime(path)  # LRU: mtime is the last use
+            ctx['model_cache'] = {"dir": cache_dir, "key": key, "hit": True}
+            logger.info("Model cache: hit %s (phase1 cached=%s)", key[:12], 'phase1_meta' in ctx)
+            return ctx
+        except Exception as e:
+            logger.warning("Model cache: ignoring unreadable entry %s: %s", key[:12], e)
+    ctx = build_model(consts, case)
+    ctx['model_cache'] = {"dir": cache_dir, "key": key, "hit": False}
+    logger.info("Model cache: miss %s", key[:12])
+    return ctx
+
+def _var_index(vars_):
+    """Proto indices of vars_ as an int array, the registry _bulk_values reads through."""
+    return np.fromiter((v.Index() for v in vars_), dtype=np.int64, count=len(vars_))
+
+def _bulk_values(cb, index):
+    """Values of the variables at index in the callback's current solution, in one fetch.
+
+    Reads the whole response solution once instead of one Value() call per variable, which
+    dominates the callback on large models.
+    """
+    return np.asarray(cb.Response().solution, dtype=np.int64)[index]
 
 class KeepTopK(cp_model.CpSolverSolutionCallback):
     def __init__(self, x, K, days, providers, shifts):
@@ -1532,10 +2143,21 @@ class KeepTopK(cp_model.CpSolverSolutionCallback):
         self.x = x; self.K=max(1,int(K))
         self.days=days; self.providers=providers; self.shifts=shifts
         self.pool=[]; self.seen=set()
+        # Iterate only over existing decision vars (s,j) in sparse x
+        self.keys = list(x); self._index = _var_index([x[k] for k in self.keys])
+        self.callbacks = 0; self.callback_time_s = 0.0
 
     def on_solution_callback(self):
-        # Iterate only over existing decision vars (s,j) in sparse x
-        assign = [ (s,j) for (s,j), var in self.x.items() if self.Value(var) == 1 ]
+        t0 = _time.perf_counter()
+        try:
+            self._collect()
+        finally:
+            self.callbacks += 1
+            self.callback_time_s += _time.perf_counter() - t0
+
+    def _collect(self):
+        vals = _bulk_values(self, self._index)
+        assign = [self.keys[k] for k in np.flatnonzero(vals == 1)]
         key = tuple(sorted(assign))
         if key in self.seen: 
             return
@@ -1556,8 +2178,22 @@ class KeepTopK(cp_model.CpSolverSolutionCallback):
             self.pool.pop()
 
 class AssignmentPoolCollector(cp_model.CpSolverSolutionCallback):
-    """Collect many assignment solutions (and their flattened 0/1 vectors) in a single run."""
-    def __init__(self, x, S, P, days, providers, shifts, *, sense='min', obj_slack=None, pool_limit=20000, dedup=True):
+    """Collect many assignment solutions in a single run.
+
+    Each solution is kept as a packed bitset over the existing x keys in sorted (s, j)
+    order (pool_vecs, bytes, one bit per x) and deduplicated through a 128-bit hash of
+    it (a re-found assignment keeps the better objective); table(k) unpacks pool entry k into an output table. Values are read in one bulk
+    fetch per solution through the proto index of every x; callbacks and callback_time_s
+    count the solutions seen and the wall time spent handling them.
+
+    The pool stays diverse online: with min_distance > 0 no two entries are closer than
+    min_distance (Hamming). A solution that near entries is admitted only if it beats all
+    of them, and then replaces them; otherwise it may go to a reserve of the reserve_size
+    best such near-duplicates, which absorb_reserve() adds back when fewer than K entries
+    are left. Once pool_limit is reached the worst objective is evicted through a lazy heap.
+    """
+    def __init__(self, x, S, P, days, providers, shifts, *, sense='min', obj_slack=None, pool_limit=20000,
+                 dedup=True, min_distance=0, reserve_size=0):
         super().__init__()
         self.x = x                          # dict[(s,j)] -> BoolVar (sparse!)
         self.S = list(S)
@@ -1569,31 +2205,125 @@ class AssignmentPoolCollector(cp_model.CpSolverSolutionCallback):
         self.obj_slack = obj_slack
         self.pool_limit = pool_limit
         self.dedup = dedup
-        self.pool = []        # [(obj, table, meta)]
-        self.pool_vecs = []   # [tuple of 0/1]
-        self._seen_vecs = set()
+        self.min_distance = max(0, int(min_distance or 0))
+        self.reserve_size = max(0, int(reserve_size or 0))
+        self.keys = sorted(x)               # bit k of a packed vector is x[keys[k]]
+        self._index = _var_index([x[k] for k in self.keys])
+        self.pool = []        # [(obj, meta)]
+        self.pool_vecs = []   # [packed bitset (bytes)]
+        self.reserve = []     # [(obj, meta, vec, digest)] near-duplicates turned away
+        self._seen_vecs = {}                # 16-byte digest of a pooled vector -> its slot
+        self._digests = []                  # per pool entry, to forget it on eviction
+        self._rows = np.zeros((0, 0), dtype=np.uint64)  # pool_vecs as uint64 rows (spare capacity)
+        self._heap = []                     # (-rank, seq, slot); stale once _seq[slot] != seq
+        self._seq = []
+        self._next_seq = 0
         self._best = None
+        self.callbacks = 0
+        self.callback_time_s = 0.0
+        self.stop_policy = None             # _Phase2StopPolicy fed with every solution
+
+    def _current_bits(self):
+        """0/1 values of the x keys in the current solution (missing x[(s,j)] are simply not stored)."""
+        return _bulk_values(self, self._index).astype(np.uint8)
+
+    def unpack(self, vec):
+        """The (s, j) pairs set in a packed vector."""
+        bits = np.unpackbits(np.frombuffer(vec, dtype=np.uint8), count=len(self.keys))
+        return tuple(self.keys[k] for k in np.flatnonzero(bits))
+
+    def table(self, k):
+        return {"assignment": self.unpack(self.pool_vecs[k]), "days": self.days,
+                "providers": self.providers, "shifts": self.shifts}
+
+    def _rank(self, obj):
+        """Lower is better, whatever the sense."""
+        return obj if self.sense == 'min' else -obj
+
+    def _push(self, slot):
+        self._next_seq += 1
+        self._seq[slot] = self._next_seq
+        heapq.heappush(self._heap, (-self._rank(self.pool[slot][0]), self._next_seq, slot))
+
+    def _worst(self):
+        """Slot of the worst pooled objective (drops stale heap entries on the way)."""
+        heap = self._heap
+        while heap[0][2] >= len(self.pool) or self._seq[heap[0][2]] != heap[0][1]:
+            heapq.heappop(heap)
+        return heap[0][2]
+
+    def _add(self, obj, meta, vec, row, digest):
+        n = len(self.pool)
+        if n == len(self._rows):
+            grown = np.zeros((max(16, 2 * n), len(row)), dtype=np.uint64)
+            if n:
+                grown[:n] = self._rows[:n]
+            self._rows = grown
+        self._rows[n] = row
+        self.pool.append((obj, meta))
+        self.pool_vecs.append(vec)
+        self._digests.append(digest)
+        self._seq.append(0)
+        self._push(n)
+        if digest is not None:
+            self._seen_vecs[digest] = n
+        if len(self._heap) > 2 * len(self.pool) + 64:
+            self._heap = [(-self._rank(self.pool[k][0]), self._seq[k], k) for k in range(len(self.pool))]
+            heapq.heapify(self._heap)
+
+    def _remove(self, slot):
+        """Drop pool entry slot in O(log n): the last entry moves into its place."""
+        self._seen_vecs.pop(self._digests[slot], None)
+        last = len(self.pool) - 1
+        if slot != last:
+            self.pool[slot] = self.pool[last]
+            self.pool_vecs[slot] = self.pool_vecs[last]
+            self._digests[slot] = self._digests[last]
+            if self._digests[slot] is not None:
+                self._seen_vecs[self._digests[slot]] = slot
+            self._rows[slot] = self._rows[last]
+            self._push(slot)
+        for column in (self.pool, self.pool_vecs, self._digests, self._seq):
+            column.pop()
+
+    def _hold(self, obj, meta, vec, digest):
+        """Keep a turned-away near-duplicate if it is among the reserve_size best."""
+        if not self.reserve_size or (digest is not None and any(r[3] == digest for r in self.reserve)):
+            return
+        if len(self.reserve) >= self.reserve_size:
+            worst = max(range(len(self.reserve)), key=lambda k: self._rank(self.reserve[k][0]))
+            if self._rank(obj) >= self._rank(self.reserve[worst][0]):
+                return
+            del self.reserve[worst]
+        self.reserve.append((obj, meta, vec, digest))
 
-    def _pack_vec(self):
-        """Dense (S x P) bitvector; missing x[(s,j)] are treated as 0 without calling Value()."""
-        vec = []
-        get = self.x.get
-        for s in self.S:
-            for j in self.P:
-                var = get((s, j))
-                if var is None:
-                    vec.append(0)
-                else:
-                    vec.append(1 if self.Value(var) == 1 else 0)
-        return tuple(vec)
+    def absorb_reserve(self):
+        """Move the reserve into the pool, as material for a relaxed diversity threshold."""
+        for obj, meta, vec, digest in self.reserve:
+            if digest is None or digest not in self._seen_vecs:
+                self._add(obj, meta, vec, _pool_matrix([vec])[0], digest)
+        self.reserve = []
 
     def on_solution_callback(self):
+        t0 = _time.perf_counter()
+        try:
+            self._collect()
+        finally:
+            self.callbacks += 1
+            self.callback_time_s += _time.perf_counter() - t0
+
+    def _collect(self):
         obj = self.ObjectiveValue()
+        if self.stop_policy is not None:
+            self.stop_policy.observe(obj, self.BestObjectiveBound())
         if self._best is None:
             self._best = obj
+            if self.sense == 'min': _portfolio_publish(obj)
         else:
             if self.sense == 'min':
-                if obj < self._best: self._best = obj
+                if obj < self._best:
+                    self._best = obj
+                    _portfolio_publish(obj)
             else:
                 if obj > self._best: self._best = obj
 
@@ -1603,66 +2333,756 @@ class AssignmentPoolCollector(cp_model.CpSolverSolutionCallback):
             if self.sense == 'max' and obj < self._best - self.obj_slack:
                 return
 
-        vec = self._pack_vec()
-        if self.dedup and vec in self._seen_vecs:
-            return
+        bits = self._current_bits()
+        vec = np.packbits(bits).tobytes()
+        digest = None
+        if self.dedup:
+            digest = hashlib.blake2b(vec, digest_size=16).digest()
+            slot = self._seen_vecs.get(digest)
+            if slot is not None:
+                # same assignment with better auxiliary values: keep the better objective
+                if self._rank(obj) < self._rank(self.pool[slot][0]):
+                    self.pool[slot] = (obj, dict(self.pool[slot][1], objective=obj))
+                    self._push(slot)
+                return
 
-        # Build assignment list only over existing (s,j) keys
-        assign = [(s,j) for (s,j), var in self.x.items() if self.Value(var) == 1]
-        key = tuple(sorted(assign))
         meta = {
             "objective": obj,
             "best_bound": self.BestObjectiveBound(),
             "conflicts": self.NumConflicts(),
             "branches": self.NumBranches(),
             "wall_time_s": self.WallTime(),
-            "assignments": len(assign),
+            "assignments": int(bits.sum(dtype=np.int64)),
         }
-        table = {"assignment": key, "days": self.days, "providers": self.providers, "shifts": self.shifts}
 
-        # Pool management
-        if self.pool_limit is not None and len(self.pool) >= self.pool_limit:
-            if self.sense == 'min':
-                worst_idx = max(range(len(self.pool)), key=lambda k: self.pool[k][0])
-                if obj >= self.pool[worst_idx][0]:
-                    return
+        # Pool management: replace the near entries if better than all of them, else
+        # evict the worst objective once full
+        rank = self._rank(obj)
+        row = _pool_matrix([vec])[0]
+        near = ()
+        if self.min_distance > (1 if self.dedup else 0) and self.pool:  # dedup already rules out distance 0
+            near = np.flatnonzero(_hamming_to(self._rows[:len(self.pool)], row) < self.min_distance)
+            if len(near) and rank >= min(self._rank(self.pool[k][0]) for k in near):
+                self._hold(obj, meta, vec, digest)
+                return
+        if len(near):
+            for k in sorted(near.tolist(), reverse=True):
+                self._remove(k)
+        elif self.pool_limit is not None and len(self.pool) >= self.pool_limit:
+            worst = self._worst()
+            if rank >= self._rank(self.pool[worst][0]):
+                return
+            self._remove(worst)
+        self._add(obj, meta, vec, row, digest)
+
+def _hamming(a: bytes, b: bytes) -> int:
+    """Hamming distance of two packed bitsets: popcount of their XOR."""
+    return (int.from_bytes(a, 'big') ^ int.from_bytes(b, 'big')).bit_count()
+
+_POP_M1, _POP_M2, _POP_M4, _POP_H01 = (np.uint64(0x5555555555555555), np.uint64(0x3333333333333333),
+                                       np.uint64(0x0F0F0F0F0F0F0F0F), np.uint64(0x0101010101010101))
+
+def _popcount64(a):
+    """Per-element popcount of a uint64 array (np.bitwise_count on numpy >= 2, else SWAR)."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(a)
+    a = a - ((a >> np.uint64(1)) & _POP_M1)
+    a = (a & _POP_M2) + ((a >> np.uint64(2)) & _POP_M2)
+    a = (a + (a >> np.uint64(4))) & _POP_M4
+    return (a * _POP_H01) >> np.uint64(56)
+
+def _pool_matrix(vecs):
+    """Packed bitsets (equal-length bytes) as an N x W uint64 matrix (rows zero-padded)."""
+    if not vecs:
+        return np.zeros((0, 0), dtype=np.uint64)
+    width = -(-len(vecs[0]) // 8) * 8
+    buf = np.zeros((len(vecs), width), dtype=np.uint8)
+    buf[:, :len(vecs[0])] = np.frombuffer(b"".join(vecs), dtype=np.uint8).reshape(len(vecs), -1)
+    return buf.view(np.uint64)
+
+def _hamming_to(mat, row):
+    """Hamming distances of every row of mat to row (batch popcount of the XOR)."""
+    return _popcount64(np.bitwise_xor(mat, row)).sum(axis=1, dtype=np.int64)
+
+_DIVERSE_BLOCK = 512
+
+def _select_diverse_k(cb_pool, cb_vecs, K: int, L: int, *, sense='min', relax_to: int = 0, strategy='objective'):
+    """Pick up to K pool entries that are good and far apart; returns their indices.
+
+    "objective" (default): best-first by objective, keeping a solution only if its
+    Hamming distance to every kept one is at least L; when the pool runs out the
+    threshold drops straight to the largest distance still available (never below
+    relax_to). "maxmin": farthest-point selection, starting from the best solution and
+    adding the one farthest from the kept set each time (ties go to the better
+    objective); L is not used.
+
+    Candidates are handled in blocks of _DIVERSE_BLOCK in objective order: a block's
+    bitset matrix is built, and its minimum distances to the kept set brought up to
+    date in one batch, only once the sweep reaches it.
+    """
+    n = len(cb_pool)
+    if n == 0 or K <= 0:
+        return []
+    if strategy not in ('objective', 'maxmin'):
+        raise ValueError(f"diversity strategy must be 'objective' or 'maxmin', got {strategy!r}")
+    objs = np.array([e[0] for e in cb_pool], dtype=float)
+    order = np.argsort(objs if sense == 'min' else -objs, kind='stable')
+    n_blocks = -(-n // _DIVERSE_BLOCK)
+    blocks = {}                                  # block -> uint64 matrix of its rows
+    folded = [0] * n_blocks                      # kept solutions folded into the block's min_dist
+    min_dist = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)   # indexed by order position
+    selected = []
+
+    def _block(b):
+        lo, hi = b * _DIVERSE_BLOCK, min(n, (b + 1) * _DIVERSE_BLOCK)
+        if b not in blocks:
+            blocks[b] = _pool_matrix([cb_vecs[k] for k in order[lo:hi]])
+        mat = blocks[b]
+        for t in range(folded[b], len(selected)):
+            row = _pool_matrix([cb_vecs[selected[t]]])[0]
+            np.minimum(min_dist[lo:hi], _hamming_to(mat, row), out=min_dist[lo:hi])
+        folded[b] = len(selected)
+        return min_dist[lo:hi]
+
+    def _take(p):
+        selected.append(int(order[p]))
+        min_dist[p] = -1
+
+    if strategy == 'maxmin':
+        _take(0)
+        while len(selected) < min(K, n):
+            md = np.concatenate([_block(b) for b in range(n_blocks)])
+            _take(int(np.argmax(md)))            # first maximum = better objective on ties
+        return selected
+
+    thr = int(L or 0)
+    pos = 0                 # order positions before pos were rejected at the current threshold
+    while len(selected) < K:
+        b = pos // _DIVERSE_BLOCK
+        if b < n_blocks:
+            md = _block(b)
+            ok = np.flatnonzero(md[pos - b * _DIVERSE_BLOCK:] >= thr)
+            if ok.size:
+                _take(pos + int(ok[0]))
+                pos += int(ok[0]) + 1
             else:
-                worst_idx = min(range(len(self.pool)), key=lambda k: self.pool[k][0])
-                if obj <= self.pool[worst_idx][0]:
-                    return
-            del self.pool[worst_idx]
-            del self.pool_vecs[worst_idx]
+                pos = (b + 1) * _DIVERSE_BLOCK
+            continue
+        best = max(int(_block(bb).max()) for bb in range(n_blocks))
+        if best < 0 or thr <= relax_to:
+            break
+        thr = max(min(best, thr - 1), relax_to)
+        pos = 0
+    return selected
+# ------------------------------------------------------------------------------------
 
-        self.pool.append((obj, table, meta))
-        self.pool_vecs.append(vec)
-        if self.dedup:
-            self._seen_vecs.add(vec)
+def _phase2_solver(sp, time_s, seed, tag="phase2"):
+    solver2 = cp_model.CpSolver()
+    if 'num_threads' in sp: 
+        try: solver2.parameters.num_search_workers=int(sp['num_threads'])
+        except: pass
+    solver2.parameters.max_time_in_seconds = float(time_s)
+    try: solver2.parameters.relative_gap_limit = 0.0
+    except: pass
+    solver2.parameters.log_search_progress = True
+    solver2.parameters.log_to_stdout = False    # Capture solver progress into unified log
+    try:
+        solver2.log_callback = lambda line: logging.getLogger("scheduler").info("[%s] %s", tag, line.rstrip())
+    except Exception:
+        pass
+    if seed is not None: solver2.parameters.random_seed = int(seed)
+    if sp.get('repair_hint'):
+        solver2.parameters.repair_hint = True
+    return solver2
 
-def _hamming(a: tuple, b: tuple) -> int:
-    return sum(1 for u, v in zip(a, b) if u != v)
+class _StopAtBound(cp_model.CpSolverSolutionCallback):
+    """Stop the search once an incumbent reaches a known lower bound of the objective."""
+    def __init__(self, bound):
+        super().__init__()
+        self.bound = bound
+        self.hit = False
 
-def _select_diverse_k(cb_pool, cb_vecs, K: int, L: int, *, sense='min', relax_to: int = 0):
-    """Greedy best-first by objective; keep solutions whose Hamming distance to all kept ≥ L."""
-    idxs = list(range(len(cb_pool)))
-    if sense == 'min':
-        idxs.sort(key=lambda k: cb_pool[k][0])  # obj asc
-    else:
-        idxs.sort(key=lambda k: -cb_pool[k][0]) # obj desc
+    def on_solution_callback(self):
+        if self.ObjectiveValue() <= self.bound:
+            self.hit = True
+            self.StopSearch()
+
+class _Phase2StopPolicy:
+    """Stagnation stop for phase 2 (the main solve and the LNS steps).
+
+    Stops once the incumbent has not improved for solver.stall_seconds (default 0: off),
+    improved by less than the fraction solver.min_improvement (default 0:
+    off) over the last solver.improvement_window_seconds (default 300), or lies within
+    solver.relative_gap of the best bound of the main solve (default 0: off). The pool
+    collector reports every solution through observe(); while a solve runs under
+    watch(), a thread re-checks the clock between solutions and stops it, so history is
+    guarded by a lock. reason and stopped_at (seconds since the policy was created)
+    record the stop.
+    """
+    def __init__(self, sp):
+        self.stall_s = float(sp.get('stall_seconds', 0) or 0.0)
+        self.window_s = float(sp.get('improvement_window_seconds', 300) or 0.0)
+        self.min_improvement = float(sp.get('min_improvement', 0) or 0.0)
+        self.gap = float(sp.get('relative_gap', 0) or 0.0)
+        self.enabled = self.stall_s > 0 or (self.min_improvement > 0 and self.window_s > 0) or self.gap > 0
+        self.tick = min(1.0, self.stall_s / 20) if self.stall_s > 0 else 1.0
+        self.t0 = _time.monotonic()
+        self.history = []     # (seconds, objective) at every improvement
+        self._lock = threading.Lock()
+        self.reason = None
+        self.stopped_at = None
+        self.solver = None
+        self.use_bound = False
+
+    def elapsed(self):
+        return _time.monotonic() - self.t0
+
+    def observe(self, objective, bound):
+        with self._lock:
+            if not self.history or objective < self.history[-1][1]:
+                self.history.append((self.elapsed(), objective))
+            if (self.gap > 0 and self.use_bound and self.reason is None
+                    and abs(objective - bound) <= self.gap * max(1.0, abs(objective))):
+                self._stop("relative_gap")
+        return self.check()
+
+    def check(self):
+        """The stop reason, deciding it first if the clock says so (None to go on)."""
+        with self._lock:
+            if self.reason is not None or not self.history:
+                return self.reason
+            now = self.elapsed()
+            last_t, best = self.history[-1]
+            if self.stall_s > 0 and now - last_t >= self.stall_s:
+                self._stop("stall")
+            elif self.min_improvement > 0 and self.window_s > 0 and now - self.history[0][0] >= self.window_s:
+                ref = next(o for t, o in reversed(self.history) if t <= now - self.window_s) \
+                    if self.history[0][0] <= now - self.window_s else self.history[0][1]
+                if ref - best < self.min_improvement * max(1.0, abs(ref)):
+                    self._stop("slow_progress")
+            return self.reason
+
+    def _stop(self, reason):
+        self.reason, self.stopped_at = reason, self.elapsed()
+        solver = self.solver
+        if solver is not None:
+            solver.StopSearch()
+
+    @contextlib.contextmanager
+    def watch(self, solver, use_bound=False):
+        """Let the policy stop solver while the block runs."""
+        self.solver, self.use_bound = solver, use_bound
+        done = threading.Event()
+
+        def run():
+            while not done.wait(self.tick):
+                if self.check():
+                    break
+
+        thread = threading.Thread(target=run, daemon=True) if self.enabled else None
+        if thread is not None:
+            thread.start()
+        try:
+            yield self
+        finally:
+            done.set()
+            if thread is not None:
+                thread.join()
+            self.solver, self.use_bound = None, False
+
+def greedy_assignment(ctx) -> set:
+    """Constructive schedule for a build_model ctx, used to hint phase 1.
+
+    Hard-ON requests are served first, then the remaining shifts in order of scarcity
+    (fewest candidate providers first). A shift (each copy of a slot class) goes to the
+    candidate furthest below min_total, then the least loaded one, among those it keeps
+    within type eligibility, hard-off days, 12h rest, max_total and max_consecutive_days.
+    Returns the chosen (shift, provider) pairs.
+    """
+    x, providers, shifts = ctx['x'], ctx['providers'], ctx['shifts']
+    S, P, N = ctx['S'], ctx['P'], len(ctx['D'])
+    shift_day, date_to_idx = ctx['shift_day'], ctx['date_to_idx']
+    shift_provs = {s: [] for s in S}
+    for (s, j) in x:
+        if shifts[s]['date'] not in set(providers[j].get('forbidden_days_hard', []) or []):
+            shift_provs[s].append(j)
+    cliques_of = {s: [] for s in S}
+    for c, clique in enumerate(ctx['rest_cliques']):
+        for s in clique:
+            cliques_of[s].append(c)
+    lim = [providers[j].get('limits', {}) or {} for j in P]
+    min_total = [int(l.get('min_total', 0)) for l in lim]
+    max_total = [int(l.get('max_total', len(S))) for l in lim]
+    max_consec = [int(providers[j].get('max_consecutive_days', 0) or 0) for j in P]
+    count = [0] * len(P)
+    worked = [[False] * N for _ in P]
+    busy = set()          # (clique, provider) already holding a shift
+    demand = ctx['shift_demand']
+    taken = [0] * len(S)  # providers on each shift (a slot class takes up to its demand)
+    filled, chosen = set(), set()
+
+    def fits(s, j):
+        if count[j] >= max_total[j] or any((c, j) in busy for c in cliques_of[s]):
+            return False
+        d = shift_day[s]
+        if max_consec[j] and not worked[j][d]:
+            lo = d
+            while lo > 0 and worked[j][lo - 1]:
+                lo -= 1
+            hi = d
+            while hi < N - 1 and worked[j][hi + 1]:
+                hi += 1
+            if hi - lo + 1 > max_consec[j]:
+                return False
+        return True
 
-    selected = []
-    thr = int(L or 0)
+    def take(s, j):
+        chosen.add((s, j))
+        taken[s] += 1
+        if taken[s] >= demand[s]:
+            filled.add(s)
+        count[j] += 1
+        worked[j][shift_day[s]] = True
+        busy.update((c, j) for c in cliques_of[s])
+
+    for j in P:
+        for d_str, tlist in (providers[j].get('preferred_days_hard') or {}).items():
+            if not tlist or d_str not in date_to_idx:
+                continue
+            for s in S:
+                if (s not in filled and (s, j) not in chosen and shifts[s]['date'] == d_str and j in shift_provs[s]
+                        and ('ANY' in tlist or shifts[s]['type'] in tlist) and fits(s, j)):
+                    take(s, j)
+                    break
+
+    for s in sorted(S, key=lambda s: (len(shift_provs[s]), shift_day[s], s)):
+        while s not in filled:
+            cands = [j for j in shift_provs[s] if (s, j) not in chosen and fits(s, j)]
+            if not cands:
+                break
+            take(s, min(cands, key=lambda j: (-(min_total[j] - count[j]), count[j] / max(1, max_total[j]), j)))
+    return chosen
+
+def _greedy_hint(model, ctx):
+    """Hint x and the workday layer y with greedy_assignment(ctx); returns its size."""
+    chosen = greedy_assignment(ctx)
+    model.ClearHints()
+    for key, var in ctx['x'].items():
+        model.AddHint(var, 1 if key in chosen else 0)
+    days_worked = {(j, ctx['shift_day'][s]) for s, j in chosen}
+    for key, var in ctx['y'].items():
+        model.AddHint(var, 1 if key in days_worked else 0)
+    return len(chosen)
+
+def solve_phase1(consts, ctx, time_s, seed=None):
+    """Minimise the hard slacks U of a build_model ctx within time_s seconds.
+
+    Workers come from constants.solver.phase1_num_threads (default: num_threads).
+    The search stops early once U reaches ctx['U_lb']. Returns (values, meta), where
+    values maps each ctx['hard_slacks'] family to its solution values, or None if no
+    solution was found in time.
+    """
+    logger = logging.getLogger("scheduler")
+    sp = consts.get('solver', {}) or {}
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = float(time_s)
+    try: solver.parameters.num_search_workers = int(sp.get('phase1_num_threads', sp.get('num_threads', 8)))
+    except: solver.parameters.num_search_workers = 8
+    solver.parameters.log_search_progress = True
+    solver.parameters.log_to_stdout = False
+    try:
+        solver.log_callback = lambda line: logging.getLogger("scheduler").info("[phase1] %s", line.rstrip())
+    except Exception:
+        pass
+    if seed is not None: solver.parameters.random_seed = int(seed)
+    logger.info("Phase-1 solve: time=%.2fs workers=%s lower bound U>=%s",
+                solver.parameters.max_time_in_seconds, solver.parameters.num_search_workers, ctx.get('U_lb'))
+
+    model = ctx['model']
+    model.Minimize(ctx['U'])
+    greedy_size, t_hint = None, 0.0
+    if ctx.get('phase1_solution'):
+        # e.g. a not-yet-optimal incumbent from the model cache
+        model.ClearHints()
+        for idx, v in enumerate(ctx['phase1_solution']):
+            model.AddHint(model.GetIntVarFromProtoIndex(idx), v)
+    elif sp.get('greedy_hint', True):
+        # Constructive schedule, completed into a full solution so that phase 1 starts
+        # from it; the completion time comes out of the phase-1 budget.
+        t0 = _time.perf_counter()
+        greedy_size = _greedy_hint(model, ctx)
+        t_greedy = _time.perf_counter() - t0
+        used, completed, status = _complete_hint(model, sp, min(float(sp.get('hint_completion_seconds', 10.0)),
+                                                                0.1 * time_s), seed, tag="phase1-hint")
+        t_hint = t_greedy + used
+        solver.parameters.max_time_in_seconds = max(1.0, float(time_s) - t_hint)
+        logger.info("Phase-1 greedy hint: %d of %d shifts in %.1f ms, completion status=%s (%.2fs)",
+                    greedy_size, len(ctx['S']), t_greedy * 1000.0, status, used)
+    cb = _StopAtBound(ctx.get('U_lb', 0))
+    st1 = solver.Solve(model, cb)
+    ok = st1 in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    obj1 = solver.ObjectiveValue() if ok else None
+    logger.info("Phase-1 status=%s objective(U)=%s time=%.2fs stopped_at_bound=%s",
+                solver.StatusName(st1), obj1, solver.WallTime(), cb.hit)
+
+    meta = {
+        "status": int(st1),
+        "status_name": solver.StatusName(st1),
+        "objective": obj1,
+        "best_bound": solver.BestObjectiveBound() if ok else None,
+        "lower_bound": ctx.get('U_lb'),
+        "stopped_at_bound": cb.hit,
+        "wall_time_s": solver.WallTime() + t_hint,
+        "time_budget_s": float(time_s),
+        "workers": solver.parameters.num_search_workers,
+    }
+    if greedy_size is not None:
+        meta["greedy_hint_assigned"] = greedy_size
+        meta["greedy_hint_s"] = t_hint
+    if not ok:
+        return None, meta
+    values = {name: [int(solver.Value(v)) for v in vars_] for name, vars_ in ctx['hard_slacks'].items()}
+    # Full incumbent (x, y, runs, slacks) by proto index; phase 2 is warm-started from it
+    ctx['phase1_solution'] = list(solver.ResponseProto().solution)
+    return values, meta
+
+def _hint_from_solver(model, solver):
+    """Replace the model's hints with the solver's last solution (all variables)."""
+    model.ClearHints()
+    for idx, v in enumerate(solver.ResponseProto().solution):
+        model.AddHint(model.GetIntVarFromProtoIndex(idx), v)
+
+def _hinted_solution(model):
+    """The model's hint as a full solution vector, or None if it leaves variables out."""
+    proto = model.Proto()
+    hint = proto.solution_hint
+    if len(hint.vars) != len(proto.variables):
+        return None
+    sol = [0] * len(proto.variables)
+    for idx, v in zip(hint.vars, hint.values):
+        sol[idx] = v
+    return sol
+
+def _warm_start_phase2(model, phase1_solution, sp, time_s, seed, callback=None):
+    """Hint phase 2 with the phase-1 incumbent and complete the hint if possible.
+
+    The phase-1 variables keep their proto indices in the phase-2 model, so the
+    incumbent is hinted as is. A short solve with those variables fixed then fills in
+    the phase-2 variables, turning the hint into a full feasible solution that phase 2
+    (and its pool) picks up immediately. If the incumbent violates a phase-2 bound the
+    partial hint stays (constants.solver.repair_hint lets phase 2 repair it).
+    callback (e.g. the phase-2 pool) sees the completed solution. Returns (seconds used,
+    completed).
+    """
+    logger = logging.getLogger("scheduler")
+    model.ClearHints()
+    for idx, v in enumerate(phase1_solution):
+        model.AddHint(model.GetIntVarFromProtoIndex(idx), v)
+    used, completed, status = _complete_hint(model, sp, time_s, seed, callback=callback)
+    logger.info("Phase-2 warm start: %d hinted vars, completion status=%s (%.2fs)",
+                len(phase1_solution), status, used)
+    return used, completed
+
+def _complete_hint(model, sp, time_s, seed, tag="hint", callback=None):
+    """Solve with the hinted variables fixed and, on success, hint the full solution.
+
+    Returns (seconds used, completed, status name).
+    """
+    if time_s <= 0:
+        return 0.0, False, "SKIPPED"
+    solver = _phase2_solver(sp, time_s, seed, tag=tag)
+    solver.parameters.fix_variables_to_their_hinted_value = True
+    st = solver.Solve(model, callback) if callback is not None else solver.Solve(model)
+    completed = st in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    if completed:
+        _hint_from_solver(model, solver)
+    return solver.WallTime(), completed, solver.StatusName(st)
+
+def _solve_lexicographic_levels(model, levels, sp, time_s, seed):
+    """Minimise each (names, expr) level in turn and pin it before the next one.
+
+    An optimal level is fixed with expr == value, a merely feasible one with
+    expr <= value; every solve hints the next with its full solution. Each level gets
+    its share of the budget from constants.solver.lexicographic_time_fractions
+    (default: equal over all levels incl. the final one), and time a level does not
+    use rolls over. Returns (seconds used, per-level meta).
+    """
+    logger = logging.getLogger("scheduler")
+    fracs = [float(f) for f in (sp.get('lexicographic_time_fractions') or [])]
+    n_all = len(levels) + 1  # + the final level solved by the caller
+    fracs = (fracs + [1.0] * n_all)[:n_all] if fracs else [1.0] * n_all
+    used, out = 0.0, []
+    for k, (names, expr) in enumerate(levels):
+        remaining = max(0.0, time_s - used)
+        budget = max(1.0, remaining * fracs[k] / (sum(fracs[k:]) or 1.0))
+        model.Minimize(expr)
+        solver = _phase2_solver(sp, budget, seed, tag=f"lex{k}")
+        logger.info("Lexicographic level %d %s: time=%.2fs", k, names, budget)
+        st = solver.Solve(model)
+        used += solver.WallTime()
+        info = {"level": k, "terms": names, "status_name": solver.StatusName(st),
+                "time_s": solver.WallTime(), "time_budget_s": budget}
+        if st in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            val = int(solver.Value(expr))
+            if st == cp_model.OPTIMAL:
+                model.Add(expr == val)
+            else:
+                model.Add(expr <= val)
+            _hint_from_solver(model, solver)
+            info.update(value=val, best_bound=solver.BestObjectiveBound())
+        logger.info("Lexicographic level %d status=%s value=%s (%.2fs)",
+                    k, info["status_name"], info.get("value"), info["time_s"])
+        out.append(info)
+    return used, out
+
+LNS_NEIGHBOURHOODS = ("week", "providers", "shift_type", "weekend")
+
+def _lns_neighbourhood(ctx, kind, rng, scale):
+    """The (shift, provider) keys of x that stay free in one LNS step (the rest is pinned).
+
+    week: a window of 7*scale days; providers: the shifts of a random quarter of the
+    providers (times scale), which can only trade among themselves; shift_type: all
+    shifts of one or more types; weekend: Friday to Monday around one Saturday/Sunday pair.
+    """
+    D, P = ctx['D'], ctx['P']
+    shift_day, shift_type = ctx['shift_day'], ctx['shift_type']
+    N = len(D)
+    if kind == 'providers':
+        k = min(len(P), max(2, int(round(len(P) / 4 * scale))))
+        chosen = set(rng.sample(list(P), k))
+        return {(s, j) for s, j in ctx['x'] if j in chosen}
+    if kind == 'shift_type':
+        k = min(len(ctx['types']), max(1, int(round(scale))))
+        chosen = set(rng.sample(list(ctx['types']), k))
+        return {(s, j) for s, j in ctx['x'] if shift_type[s] in chosen}
+    if kind == 'weekend':
+        sats = [d for d in sorted(ctx['weekend_idx']) if d + 1 in ctx['weekend_idx']]
+        if sats:
+            d0 = rng.choice(sats)
+            return {(s, j) for s, j in ctx['x'] if d0 - 1 <= shift_day[s] <= d0 + 2}
+    width = min(N, max(1, int(round(7 * scale))))
+    d0 = rng.randrange(0, N - width + 1)
+    return {(s, j) for s, j in ctx['x'] if d0 <= shift_day[s] < d0 + width}
+
+def _cap_objective(proto, cap):
+    """Restrict proto to solutions whose objective is <= cap (through the objective domain).
+
+    Returns the previous domain so the caller can restore it.
+    """
+    import math
+    obj = proto.objective
+    old = list(obj.domain)
+    hi = math.floor(cap / (obj.scaling_factor or 1.0) - obj.offset + 1e-9)
+    obj.domain[:] = [old[0] if old else cp_model.INT_MIN, min(old[-1], hi) if old else hi]
+    return old
+
+def lns_improve(ctx, solution, objective, sp, time_s, seed=None, callback=None, stop=None):
+    """Improve a full solution of ctx['model'] with schedule-aware large-neighbourhood search.
+
+    Each step pins x outside one neighbourhood (see _lns_neighbourhood; constants
+    solver.lns_neighbourhoods picks the kinds) to the incumbent, hints the incumbent and
+    re-solves for at most solver.lns_step_seconds (default 5). Steps that close their
+    neighbourhood quickly widen the next ones, steps that time out without a gain narrow
+    them. callback (e.g. the phase-2 pool) sees every solution; a _Phase2StopPolicy in
+    stop ends the search early. Returns (best solution, best objective, meta).
+    """
+    logger = logging.getLogger("scheduler")
+    model, x = ctx['model'], ctx['x']
+    kinds = list(sp.get('lns_neighbourhoods') or LNS_NEIGHBOURHOODS)
+    unknown = [k for k in kinds if k not in LNS_NEIGHBOURHOODS]
+    if unknown:
+        raise ValueError(f"solver.lns_neighbourhoods: unknown {unknown}; known: {list(LNS_NEIGHBOURHOODS)}")
+    step_s = float(sp.get('lns_step_seconds', 5.0))
+    rng = random.Random(seed)
+    best, best_obj = list(solution), objective
+    scale = {k: 1.0 for k in kinds}
+    steps, t0 = [], _time.perf_counter()
     while True:
-        for k in idxs:
-            vec = cb_vecs[k]
-            if all(_hamming(vec, cb_vecs[j]) >= thr for j in selected):
-                selected.append(k)
-                if len(selected) == K:
-                    return selected
-        if thr > relax_to:
-            thr -= 1
-        else:
-            return selected
-# ------------------------------------------------------------------------------------
+        remaining = float(time_s) - (_time.perf_counter() - t0)
+        if remaining < 0.5 or (stop is not None and stop.check()):
+            break
+        kind = kinds[len(steps) % len(kinds)]
+        free = _lns_neighbourhood(ctx, kind, rng, scale[kind])
+        model.ClearHints()
+        for idx, v in enumerate(best):
+            model.AddHint(model.GetIntVarFromProtoIndex(idx), v)
+        pinned = []
+        for key, var in x.items():
+            if key not in free:
+                dom = var.Proto().domain
+                pinned.append((dom, list(dom)))
+                v = best[var.Index()]
+                dom[:] = [v, v]
+        # inside a portfolio a step only pays off if it beats every member's incumbent
+        cutoff = _portfolio_cutoff()
+        domain = _cap_objective(model.Proto(), cutoff) if cutoff is not None else None
+        try:
+            solver = _phase2_solver(sp, min(step_s, remaining), None if seed is None else seed + len(steps),
+                                    tag="lns")
+            with stop.watch(solver) if stop is not None else contextlib.nullcontext():
+                st = solver.Solve(model, callback) if callback is not None else solver.Solve(model)
+        finally:
+            for dom, orig in pinned:
+                dom[:] = orig
+            if domain is not None:
+                model.Proto().objective.domain[:] = domain
+        ok = st in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        improved = ok and (best_obj is None or solver.ObjectiveValue() < best_obj)
+        if improved:
+            best, best_obj = list(solver.ResponseProto().solution), solver.ObjectiveValue()
+        if st == cp_model.OPTIMAL:
+            scale[kind] = min(scale[kind] * 1.5, 8.0)
+        elif not improved:
+            scale[kind] = max(scale[kind] / 1.5, 0.5)
+        steps.append({"kind": kind, "free_x": len(free), "status_name": solver.StatusName(st),
+                      "objective": solver.ObjectiveValue() if ok else None, "improved": improved,
+                      "time_s": solver.WallTime()})
+        logger.info("LNS step %d %s: %d free x, status=%s objective=%s best=%s (%.2fs)",
+                    len(steps), kind, len(free), solver.StatusName(st), steps[-1]["objective"], best_obj,
+                    solver.WallTime())
+    model.ClearHints()
+    for idx, v in enumerate(best):
+        model.AddHint(model.GetIntVarFromProtoIndex(idx), v)
+    meta = {"steps": len(steps), "improvements": sum(1 for s in steps if s["improved"]),
+            "start_objective": objective, "best_objective": best_obj,
+            "time_s": _time.perf_counter() - t0, "history": steps}
+    return best, best_obj, meta
+
+# ---------- Diversity stage ----------
+def _diverse_resolve(model_bytes, hint, x_index, base, avoid, region, L, obj_cap, min_taken, sp, time_s, seed):
+    """One re-solve of _diversity_stage, run in a worker process (or in-process).
+
+    Finds the best solution whose x lie at Hamming distance >= L from every vector in
+    avoid and that sets at least min_taken x (covers as many shifts as the best table),
+    with the objective's linear sum capped so the objective stays <= obj_cap. With
+    a region (positions into x_index) every other x is pinned to base and at least L of
+    the region's x must differ from it. Hinted with the full solution hint. Returns
+    (status name, objective or None, x values or None, wall time).
+    """
+    model = cp_model.CpModel()
+    proto = model.Proto()
+    proto.ParseFromString(model_bytes)
+    xs = [model.GetIntVarFromProtoIndex(int(i)) for i in x_index]
+
+    def distance_at_least(vec, positions):
+        # sum over positions of (x_k if vec_k == 0 else 1 - x_k) >= L
+        coeffs = [-1 if vec[k] else 1 for k in positions]
+        model.Add(cp_model.LinearExpr.WeightedSum([xs[k] for k in positions], coeffs)
+                  >= L - sum(int(vec[k]) for k in positions))
+
+    if region is not None:
+        inside = set(region)
+        for k, i in enumerate(x_index):
+            if k not in inside:
+                proto.variables[int(i)].domain[:] = [int(base[k]), int(base[k])]
+        distance_at_least(base, region)
+    everything = range(len(xs))
+    for vec in avoid:
+        distance_at_least(vec, everything)
+    model.Add(sum(xs) >= int(min_taken))
+
+    _cap_objective(proto, obj_cap)
+
+    proto.ClearField('solution_hint')
+    proto.solution_hint.vars.extend(range(len(hint)))
+    proto.solution_hint.values.extend(int(v) for v in hint)
+
+    solver = _phase2_solver(sp, time_s, seed, tag="diversity")
+    st = solver.Solve(model)
+    if st not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return solver.StatusName(st), None, None, solver.WallTime()
+    return solver.StatusName(st), solver.ObjectiveValue(), [solver.Value(v) for v in xs], solver.WallTime()
+
+def _diversity_cap(ctx2, best_obj, taken, sp):
+    """Worst objective a diverse alternative covering taken shifts may have.
+
+    solver.diversity_max_degradation (default 0.05) is a fraction of the penalty part of
+    the best objective: in weighted mode the coverage reward (COVERAGE_REWARD per shift)
+    dominates |best_obj|, so a cap relative to it would admit tables that drop shifts.
+    Coverage itself is held at the best table's (see _diverse_resolve and covering in solve_two_phase).
+    """
+    penalty = best_obj + (COVERAGE_REWARD * taken if ctx2.get('Weighted') is not None else 0)
+    return best_obj + float(sp.get('diversity_max_degradation', 0.05) or 0.0) * abs(penalty)
+
+def _diversity_stage(ctx2, cb, best_sol, best_obj, chosen, K, L, sp, time_s, seed):
+    """Re-solve for the K - len(chosen) tables the pool could not supply at distance >= L.
+
+    chosen holds the pool entries already selected at L (packed vectors), the best one
+    first. Every table covers at least as many shifts as the best one, and the objective
+    may degrade by at most the cap of _diversity_cap. A first round splits the calendar into max(missing, 2) blocks
+    of consecutive days and runs one re-solve per block in parallel processes
+    (solver.diversity_processes), each changing only its own block by >= L against the
+    best solution, so tables from different blocks are >= 2L apart; the best ones are
+    kept. Every process runs solver.diversity_threads workers (default num_threads: a
+    smaller portfolio often finds nothing). A second, in-process round fills any slot still missing with a re-solve over
+    the whole schedule against everything chosen so far. Returns ([(objective, packed
+    vector)], meta).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    import multiprocessing
+    logger = logging.getLogger("scheduler")
+    t0 = _time.perf_counter()
+    need = K - len(chosen)
+    n = len(cb.keys)
+    base = np.asarray(best_sol, dtype=np.int64)[cb._index]
+    avoid = [np.unpackbits(np.frombuffer(v, dtype=np.uint8), count=n) for v in chosen]
+    taken = int(base.sum())
+    obj_cap = _diversity_cap(ctx2, best_obj, taken, sp)
+    threads = max(1, int(sp.get('num_threads', 8) or 8))
+    model_bytes = ctx2['model'].Proto().SerializeToString()
+    index = cb._index.tolist()
+    found, rounds = [], []
+
+    days = [ctx2['shift_day'][s] for s, _ in cb.keys]
+    n_days = max(days, default=-1) + 1
+    n_blocks = min(max(need, 2), n_days)
+    if n_blocks > 1:
+        blocks = [[k for k, d in enumerate(days) if b * n_days // n_blocks <= d < (b + 1) * n_days // n_blocks]
+                  for b in range(n_blocks)]
+        sub_sp = dict(sp, num_threads=max(1, int(sp.get('diversity_threads', threads) or threads)))
+        t_round = 0.6 * time_s
+        jobs = [(model_bytes, best_sol, index, base, avoid, block, L, obj_cap, taken, sub_sp, t_round,
+                 None if seed is None else seed + b) for b, block in enumerate(blocks)]
+        results = None
+        if sp.get('diversity_processes', True):
+            try:
+                with ProcessPoolExecutor(max_workers=len(jobs), mp_context=multiprocessing.get_context('spawn')) as ex:
+                    results = [f.result() for f in [ex.submit(_diverse_resolve, *job) for job in jobs]]
+            except (OSError, NotImplementedError, ImportError, BrokenProcessPool) as e:
+                logger.warning("Diversity processes unavailable (%s); re-solving in-process", e)
+        if results is None:
+            per_job = t_round / len(jobs)
+            results = [_diverse_resolve(*job[:9], sp, per_job, job[11]) for job in jobs]
+        for status, objective, bits, wall in results:
+            rounds.append({"round": "blocks", "status_name": status, "objective": objective, "time_s": wall})
+            if bits is not None:
+                found.append((objective, np.asarray(bits, dtype=np.uint8)))
+        found = sorted(found, key=lambda f: f[0])[:need]
+
+    while len(found) < need:
+        remaining = time_s - (_time.perf_counter() - t0)
+        if remaining < 1.0:
+            break
+        hint = best_sol
+        if found:
+            # hint from the previous solution: the best one with the last table's x
+            hint = list(best_sol)
+            for i, v in zip(index, found[-1][1]):
+                hint[i] = int(v)
+        status, objective, bits, wall = _diverse_resolve(
+            model_bytes, hint, index, base, avoid + [b for _, b in found], None, L, obj_cap, taken, sp,
+            remaining / (need - len(found)), seed)
+        rounds.append({"round": "whole", "status_name": status, "objective": objective, "time_s": wall})
+        if bits is None:
+            break
+        found.append((objective, np.asarray(bits, dtype=np.uint8)))
+
+    extra = [(objective, np.packbits(bits).tobytes()) for objective, bits in found]
+    meta = {"missing": need, "found": len(extra), "objective_cap": obj_cap, "min_taken": taken,
+            "time_s": _time.perf_counter() - t0, "rounds": rounds}
+    logger.info("Diversity stage: %d of %d missing tables at L=%d in %.2fs", len(extra), need, L, meta["time_s"])
+    return extra, meta
 
 def solve_two_phase(consts, case, ctx, K, seed=None):
     logger = logging.getLogger("scheduler")
@@ -1673,50 +3093,179 @@ def solve_two_phase(consts, case, ctx, K, seed=None):
     t2 = max(5.0, total_time - t1)
     logger.info("Time budget total=%.2fs split: phase1=%.2fs phase2=%.2fs", total_time, t1, t2)
 
+    # Phase 1: hard slacks; whatever it leaves of t1 rolls over to phase 2. A cached
+    # incumbent that reached its bound is reused as is.
+    cached1 = ctx.get('phase1_meta')
+    if cached1 and (cached1.get('status_name') == 'OPTIMAL' or cached1.get('stopped_at_bound')):
+        hard = ctx['phase1_values']
+        meta1 = dict(cached1, wall_time_s=0.0, cached=True)
+        logger.info("Phase-1 reused from model cache: objective(U)=%s", cached1.get('objective'))
+    else:
+        hard, meta1 = solve_phase1(consts, ctx, t1, seed=seed)
+        if hard is not None:
+            ctx['phase1_values'] = hard
+            ctx['phase1_meta'] = meta1
+        _model_cache_store(consts, ctx)
+    t2 = max(5.0, total_time - meta1["wall_time_s"])
+    logger.info("Phase-1 used %.2fs of %.2fs; phase-2 budget=%.2fs", meta1["wall_time_s"], t1, t2)
+    if hard is None:
+        logger.error("Phase-1 found no solution (status=%s); skipping phase 2", meta1["status_name"])
+        return [], {"phase1": meta1, "phase2": None, "phase1_stage": meta1}
+
     # Phase-2 directly on ctx['model'] with soft objective (existing pipeline)
-    ctx2 = ctx
+    ctx2 = build_phase2_objective(consts, ctx, hard)
     model2 = ctx2['model']
 
     sp = consts.get('solver', {})
-    solver2 = cp_model.CpSolver()
-    if 'num_threads' in sp: 
-        try: solver2.parameters.num_search_workers=int(sp['num_threads'])
-        except: pass
-    solver2.parameters.max_time_in_seconds = float(t2)
-    try: solver2.parameters.relative_gap_limit = 0.0
-    except: pass
-    solver2.parameters.log_search_progress = True
-    solver2.parameters.log_to_stdout = False    # Capture solver progress into unified log
-    try:
-        solver2.log_callback = lambda line: logging.getLogger("scheduler").info("[phase2] %s", line.rstrip())
-    except Exception:
-        pass
-    if seed is not None: solver2.parameters.random_seed = int(seed)
-    logger.info("Phase-2 solve: time=%ss workers=%s rgap=%s seed=%s",
-                solver2.parameters.max_time_in_seconds,
-                getattr(solver2.parameters, "num_search_workers", None),
-                getattr(solver2.parameters, "relative_gap_limit", None),
-                seed)
+    levels = ctx2.get('objective_levels')
 
     # Diverse pool collection
     run_cfg = case.get("run", {}) or {}
     L = int(run_cfg.get("L", 0) or 0)
     logger.info("Diversity threshold L=%d, K=%s", L, K)
 
+    # The pool keeps entries solver.pool_min_distance (default L) apart, which lets a much
+    # smaller bound still hold K tables at distance >= L
+    min_distance = int(sp.get('pool_min_distance', L))
     cb = AssignmentPoolCollector(
         ctx2['x'], ctx2['S'], ctx2['P'],
         ctx2['days'], ctx2['providers'], ctx2['shifts'],
-        sense='min', obj_slack=None, pool_limit=20000, dedup=True
+        sense='min', obj_slack=None, pool_limit=int(sp.get('pool_limit', 2000 if min_distance > 1 else 20000)),
+        dedup=True, min_distance=min_distance, reserve_size=K
     )
-    st2 = solver2.Solve(model2, cb)
+
+    # Warm start: hint phase 2 with the phase-1 incumbent (solver.phase2_warm_start). In
+    # weighted mode the completed incumbent also enters the pool.
+    warm_meta = None
+    t_hint = min(float(sp.get('hint_completion_seconds', 10.0)), 0.1 * t2)
+    if sp.get('phase2_warm_start', True) and ctx2.get('phase1_solution'):
+        if levels:
+            model2.Minimize(levels[0][1])
+        used_hint, completed = _warm_start_phase2(model2, ctx2['phase1_solution'], sp, t_hint, seed,
+                                                  callback=None if levels else cb)
+        t2 = max(5.0, t2 - used_hint)
+        warm_meta = {"hinted_vars": len(ctx2['phase1_solution']), "completed": completed,
+                     "time_s": used_hint}
+
+    # Lexicographic mode: settle every level but the last one first, then collect the
+    # pool on the last level with the earlier ones pinned.
+    lex_meta = None
+    if levels:
+        lex_used, lex_meta = _solve_lexicographic_levels(model2, levels[:-1], sp, t2, seed)
+        model2.Minimize(levels[-1][1])
+        t2 = max(1.0, t2 - lex_used)
+
+    # solver.diversity_fraction of the phase-2 budget is held back for _diversity_stage
+    # when K > 1 tables must lie L apart; solver.lns_fraction of the rest goes to
+    # lns_improve after the main solve
+    div_frac = min(max(float(sp.get('diversity_fraction', 0.2) or 0.0), 0.0), 0.5) if K > 1 and L > 0 else 0.0
+    t_div = t2 * div_frac
+    t2 -= t_div
+    lns_frac = min(max(float(sp.get('lns_fraction', 0.5) or 0.0), 0.0), 0.95)
+    solver2 = _phase2_solver(sp, t2 * (1.0 - lns_frac), seed)
+    logger.info("Phase-2 solve: time=%ss workers=%s rgap=%s seed=%s",
+                solver2.parameters.max_time_in_seconds,
+                getattr(solver2.parameters, "num_search_workers", None),
+                getattr(solver2.parameters, "relative_gap_limit", None),
+                seed)
+    # Stagnation stop over the main solve and LNS (solver.stall_seconds, min_improvement,
+    # relative_gap)
+    stop = _Phase2StopPolicy(sp)
+    cb.stop_policy = stop if stop.enabled else None
+    with stop.watch(solver2, use_bound=True):
+        st2 = solver2.Solve(model2, cb)
+    used2 = solver2.WallTime()
+    cap_meta = ctx2.get('fairness_cap')
+    if cap_meta is not None:
+        cap_meta = {"cap": cap_meta['cap'], "bound": cap_meta['bound'], "dropped": False}
+        if st2 in (cp_model.INFEASIBLE, cp_model.UNKNOWN):
+            # The cut can cost feasibility (e.g. a rolling-horizon window with tight carried
+            # totals): widen it and complete the phase-1 incumbent again.
+            logger.warning("Phase 2 found no solution with very_heavy <= %d (solver.fairness_cap, status=%s); "
+                           "widening it to its instance bound %d", cap_meta['cap'], solver2.StatusName(st2),
+                           cap_meta['bound'])
+            ctx2['fairness_cap']['var'].Proto().domain[:] = [0, cap_meta['bound']]
+            cap_meta["dropped"] = True
+            if warm_meta is not None and not warm_meta["completed"]:
+                used_hint, warm_meta["completed"] = _warm_start_phase2(
+                    model2, ctx2['phase1_solution'], sp, t_hint, seed, callback=None if levels else cb)
+                used2 += used_hint
+    found = st2 in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    best2 = solver2.ObjectiveValue() if found else None
+    # Without a solution of its own the search can still start LNS from a complete hint
+    # (the presolve of a full phase-2 solve can eat most of a short budget).
+    start = list(solver2.ResponseProto().solution) if found else _hinted_solution(model2)
+    dropped = bool((cap_meta or {}).get("dropped"))
+    if not found and ((dropped and (lns_frac == 0 or start is None))
+                      or (lns_frac > 0 and start is None and st2 == cp_model.UNKNOWN)):
+        logger.warning("Phase 2 found no solution in %.2fs; searching again without LNS", used2)
+        solver2 = _phase2_solver(sp, max(5.0 if dropped else 1.0, t2 - used2), seed)
+        st2 = solver2.Solve(model2, cb)
+        used2 += solver2.WallTime()
+        found = st2 in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        best2 = solver2.ObjectiveValue() if found else None
+        lns_frac = 0.0
+    strategy = str(sp.get('diversity_strategy', 'objective')).lower()
+
+    def covering(best_obj, best_sol, capped=True):
+        # pool entries covering as many shifts as the best table and, if capped, within the
+        # diversity stage's objective cap
+        taken = int(np.asarray(best_sol, dtype=np.int64)[cb._index].sum())
+        cap = _diversity_cap(ctx2, best_obj, taken, sp) if capped else float('inf')
+        return [k for k, (o, m) in enumerate(cb.pool) if o <= cap and m["assignments"] >= taken]
+
+    def select_among(within, relax_to):
+        return [within[k] for k in _select_diverse_k([cb.pool[k] for k in within], [cb.pool_vecs[k] for k in within],
+                                                     K, L, sense='min', relax_to=relax_to, strategy=strategy)]
+
+    best_sol = list(solver2.ResponseProto().solution) if found else None
+    if t_div and best2 is not None and best_sol is not None and len(select_among(covering(best2, best_sol), L)) >= K:
+        t2 += t_div  # the pool already holds K tables L apart
+        t_div = 0.0
+    lns_meta = None
+    if lns_frac > 0 and start is not None and st2 != cp_model.OPTIMAL:
+        if best2 is None and cb.pool:
+            best2 = min(o for o, _ in cb.pool)
+        best_sol, best2, lns_meta = lns_improve(ctx2, start, best2, sp, t2 - used2, seed, callback=cb,
+                                                stop=stop if stop.enabled else None)
+        logger.info("LNS: %d steps, %d improvements, objective %s -> %s", lns_meta["steps"],
+                    lns_meta["improvements"], lns_meta["start_objective"], best2)
+    cb.stop_policy = None
+    early_stop = None
+    if stop.reason is not None:
+        early_stop = {"reason": stop.reason, "at_s": round(stop.stopped_at, 2),
+                      "saved_s": round(max(0.0, t2 - stop.elapsed()), 2)}
+        logger.info("Phase 2 stopped early (%s) after %.1fs, %.1fs of its budget unused", stop.reason,
+                    stop.stopped_at, early_stop["saved_s"])
     logger.info("Phase-2 status=%s", solver2.StatusName())
     logger.info("Phase-2 best objective=%s best bound=%s", solver2.ObjectiveValue(), solver2.BestObjectiveBound())
+    cb.absorb_reserve()
+    ctx['phase2_pool'] = cb
     logger.info("Pool collected=%d", len(cb.pool))
 
-    # Choose K diverse-best by Hamming ≥ L (with relaxation)
-    selected_idx = _select_diverse_k(cb.pool, cb.pool_vecs, K, L, sense='min', relax_to=0)
-    tables = [cb.pool[k][1] for k in selected_idx]
-    per_meta = [cb.pool[k][2] for k in selected_idx]
+    # Choose K diverse-best by Hamming ≥ L (with relaxation); solver.diversity_strategy
+    # "maxmin" picks farthest points instead. With a diversity stage budget left, tables
+    # the pool cannot supply at L come from re-solves, relaxation only fills what remains.
+    extra, div_meta = [], None
+    if t_div and best_sol is not None and best2 is not None:
+        selected_idx = select_among(covering(best2, best_sol), L)
+        if len(selected_idx) < K:
+            extra, div_meta = _diversity_stage(ctx2, cb, best_sol, best2, [cb.pool_vecs[k] for k in selected_idx],
+                                               K, L, sp, t_div, seed)
+        # relaxation fills from the whole pool, still never below the best table's coverage
+        for k in select_among(covering(best2, best_sol, capped=False), 0):
+            if len(selected_idx) + len(extra) >= K:
+                break
+            if k not in selected_idx:
+                selected_idx.append(k)
+    else:
+        selected_idx = _select_diverse_k(cb.pool, cb.pool_vecs, K, L, sense='min', relax_to=0, strategy=strategy)
+    tables = [cb.table(k) for k in selected_idx]
+    per_meta = [cb.pool[k][1] for k in selected_idx]
+    for objective, vec in extra:
+        tables.append({"assignment": cb.unpack(vec), "days": cb.days, "providers": cb.providers, "shifts": cb.shifts})
+        per_meta.append({"objective": objective, "assignments": len(tables[-1]["assignment"]),
+                         "diversity_stage": True})
 
     logger.info("Selected tables=%d (requested K=%d)", len(tables), K)
     if per_meta:
@@ -1728,14 +3277,460 @@ def solve_two_phase(consts, case, ctx, K, seed=None):
         "response": solver2.ResponseStats(),
         "solutions_collected": len(cb.pool),
         "solutions_selected": len(tables),
-        "best_objective": solver2.ObjectiveValue() if st2 in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None,
+        "callbacks": cb.callbacks,
+        "callback_time_s": round(cb.callback_time_s, 4),
+        "best_objective": best2,
         "best_bound": solver2.BestObjectiveBound() if st2 in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None,
         "per_table": per_meta,
-        "L": L
+        "L": L,
+        "provider_classes": ctx2.get('provider_classes', []),
     }
-    meta={"phase1": meta2, "phase2": meta2}
+    if warm_meta is not None:
+        meta2["warm_start"] = warm_meta
+    if cap_meta is not None:
+        meta2["fairness_cap"] = cap_meta
+    if lns_meta is not None:
+        meta2["lns"] = {k: v for k, v in lns_meta.items() if k != "history"}
+    if div_meta is not None:
+        meta2["diversity_stage"] = div_meta
+    if early_stop is not None:
+        meta2["early_stop"] = early_stop
+    if lex_meta is not None:
+        meta2["lexicographic"] = lex_meta + [{"level": len(lex_meta), "terms": levels[-1][0],
+                                              "status_name": solver2.StatusName(),
+                                              "value": meta2["best_objective"]}]
+    meta={"phase1": meta2, "phase2": meta2, "phase1_stage": meta1}
     return tables, meta
 
+# ---------- Independent-component decomposition ----------
+def _compress_identical_shifts(case: Dict[str,Any]) -> tuple:
+    """Merge interchangeable parallel shifts into slot classes with an integer demand.
+
+    Shifts are interchangeable iff they agree on everything but their id (date, type,
+    start/end, allowed_provider_types, ...). Their windows overlap, so the 12h rest
+    already lets a provider take at most one of them: a single representative with
+    "demand": k keeps every per-provider term of the model and drops the k!
+    permutations of who takes which copy. (The per-type cluster term walks a type's
+    shifts in order; on the uncompressed list it also depended on which copy was taken,
+    on the slot classes it follows the days.) Returns (compressed case, classes), where
+    classes[c] lists the original shift indices of shift c (in order), or (case, None)
+    when no two shifts are identical.
+    """
+    shifts = case.get('shifts', [])
+    groups = {}
+    for s, sh in enumerate(shifts):
+        key = json.dumps({k: v for k, v in sh.items() if k != 'id'}, sort_keys=True, default=str)
+        groups.setdefault(key, []).append(s)
+    if len(groups) == len(shifts):
+        return case, None
+    classes = sorted(groups.values())
+    compressed = [dict(shifts[c[0]], demand=len(c)) if len(c) > 1 else shifts[c[0]] for c in classes]
+    return dict(case, shifts=compressed), classes
+
+def _expand_compressed_tables(tables, case, classes):
+    """Map tables solved on _compress_identical_shifts(case) back to case['shifts'].
+
+    The providers on a slot class take its member shifts in provider-index order.
+    """
+    out = []
+    for table in tables:
+        on = defaultdict(list)
+        for s, j in table['assignment']:
+            on[s].append(j)
+        assign = [(classes[s][n], j) for s, js in on.items() for n, j in enumerate(sorted(js))]
+        out.append(dict(table, assignment=tuple(sorted(assign)), shifts=case['shifts']))
+    return out
+
+def _eligibility_components(case: Dict[str,Any]) -> List[tuple]:
+    """Connected components of the provider-shift eligibility graph.
+
+    Shifts link the provider types in their allowed_provider_types, so a component is a
+    set of types plus every shift open to them. Returns [(shift indices, provider
+    indices)], largest first. Shifts no provider may take, and providers no shift is
+    open to, belong to no component.
+    """
+    providers = case.get('providers', [])
+    shifts = case.get('shifts', [])
+    parent = {}
+    def find(t):
+        while parent[t] != t:
+            parent[t] = parent[parent[t]]
+            t = parent[t]
+        return t
+    for p in providers:
+        parent.setdefault(p.get('type', 'MD'), p.get('type', 'MD'))
+    for sh in shifts:
+        ts = [t for t in sh.get('allowed_provider_types', []) if t in parent]
+        for t in ts[1:]:
+            parent[find(t)] = find(ts[0])
+    comps = defaultdict(lambda: ([], []))
+    for j, p in enumerate(providers):
+        comps[find(p.get('type', 'MD'))][1].append(j)
+    for s, sh in enumerate(shifts):
+        ts = [t for t in sh.get('allowed_provider_types', []) if t in parent]
+        if ts:
+            comps[find(ts[0])][0].append(s)
+    return sorted((c for c in comps.values() if c[0]), key=lambda c: (-len(c[0]), c[1]))
+
+def _solve_component(consts, case, K, seed):
+    """Worker entry point of solve_decomposed: the usual pipeline on one component."""
+    ctx = build_model_cached(consts, case)
+    return solve_two_phase(consts, case, ctx, K, seed=seed)
+
+def solve_decomposed(consts, case, components, K, seed=None):
+    """Solve each eligibility component in its own process and merge the tables.
+
+    Components share no shift and no provider, so coverage, limits, rest and every
+    per-provider term separate exactly; the average-based fairness target (av_target)
+    and the very_heavy deviation are taken per component. Each process gets a share of
+    solver.num_threads proportional to its shift count and the full time budget. The
+    k-th merged table joins the k-th table of every component (a component with fewer
+    tables repeats its last one). Falls back to solving in-process when processes
+    are unavailable (e.g. on Lambda), one component after the other with the time
+    budget split by shift count; if the pool breaks, the components already solved
+    are kept and only the rest are re-solved in the time left.
+    """
+    import copy
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    import multiprocessing
+    logger = logging.getLogger("scheduler")
+    sp = consts.get('solver', {}) or {}
+    threads = max(1, int(sp.get('num_threads', 8) or 8))
+    n_shifts = max(1, sum(len(c[0]) for c in components))
+
+    jobs = []
+    for shift_ids, prov_ids in components:
+        sub_consts = copy.deepcopy(consts)
+        share = max(1, round(threads * len(shift_ids) / n_shifts))
+        sub_consts.setdefault('solver', {})['num_threads'] = share
+        sub_case = dict(case,
+                        shifts=[case['shifts'][s] for s in shift_ids],
+                        providers=[case['providers'][j] for j in prov_ids])
+        jobs.append((sub_consts, sub_case))
+        logger.info("Component: %d shifts, %d providers, types=%s, workers=%d",
+                    len(shift_ids), len(prov_ids),
+                    sorted({case['providers'][j].get('type', 'MD') for j in prov_ids}), share)
+
+    t0 = _time.perf_counter()
+    results, futures = [None] * len(jobs), []
+    try:
+        with ProcessPoolExecutor(max_workers=len(jobs), mp_context=multiprocessing.get_context('spawn')) as ex:
+            futures = [ex.submit(_solve_component, c, k, K, seed) for c, k in jobs]
+            for i, f in enumerate(futures):
+                results[i] = f.result()
+    except (OSError, NotImplementedError, ImportError, BrokenProcessPool) as e:
+        if isinstance(e, BrokenProcessPool):
+            for i, f in enumerate(futures):
+                if results[i] is None and f.done() and not f.cancelled() and f.exception() is None:
+                    results[i] = f.result()
+        missing = [i for i, r in enumerate(results) if r is None]
+        logger.warning("Component processes unavailable (%s); solving %d of %d components in-process",
+                       e, len(missing), len(jobs))
+        # one after the other, so the time left is split by shift count
+        total_time = float(get_num(consts, 'solver', 'max_time_in_seconds', default=120))
+        remaining = max(1.0, total_time - (_time.perf_counter() - t0))
+        n_missing = max(1, sum(len(components[i][0]) for i in missing))
+        for i in missing:
+            sub_consts, sub_case = jobs[i]
+            sub_consts['solver']['max_time_in_seconds'] = max(1.0, remaining * len(components[i][0]) / n_missing)
+            results[i] = _solve_component(sub_consts, sub_case, K, seed)
+
+    n_tables = max((len(t) for t, _ in results), default=0)
+    if any(not t for t, _ in results):
+        logger.warning("Some components produced no table; their shifts stay unfilled")
+    tables, per_meta = [], []
+    for k in range(n_tables):
+        assign, objective = [], 0
+        for (shift_ids, prov_ids), (ctables, cmeta) in zip(components, results):
+            if not ctables:
+                continue
+            kk = min(k, len(ctables) - 1)
+            assign.extend((shift_ids[s], prov_ids[j]) for s, j in ctables[kk]['assignment'])
+            objective += cmeta['phase2']['per_table'][kk]['objective']
+        tables.append({"assignment": tuple(sorted(assign)), "days": case['calendar']['days'],
+                       "providers": case['providers'], "shifts": case['shifts']})
+        per_meta.append({"objective": objective, "assignments": len(assign)})
+
+    comp_meta = [{"shifts": len(c[0]), "providers": len(c[1]),
+                  "status_name": (m.get('phase2') or {}).get('status_name'),
+                  "best_objective": (m.get('phase2') or {}).get('best_objective'),
+                  "tables": len(t)} for c, (t, m) in zip(components, results)]
+    logger.info("Decomposed solve: %d components, merged tables=%d", len(components), len(tables))
+    meta2 = {
+        "status_name": "DECOMPOSED",
+        "solutions_selected": len(tables),
+        "best_objective": per_meta[0]["objective"] if per_meta else None,
+        "per_table": per_meta,
+        "components": comp_meta,
+    }
+    return tables, {"phase1": meta2, "phase2": meta2,
+                    "components": [m for _, m in results]}
+
+# ---------- Multi-seed portfolio ----------
+# Default member settings of solve_portfolio, cycled over the members on top of the
+# case's solver constants (solver.portfolio_variants overrides them)
+PORTFOLIO_VARIANTS = (
+    {},
+    {"lns_fraction": 0.3},
+    {"lns_fraction": 0.7, "lns_step_seconds": 3},
+    {"phase2_warm_start": False},
+)
+_portfolio_incumbent = None  # multiprocessing Value('d') shared by the members of one portfolio
+
+def _portfolio_init(incumbent):
+    """Process initializer of solve_portfolio members: attach the shared incumbent."""
+    global _portfolio_incumbent
+    _portfolio_incumbent = incumbent
+
+def _portfolio_publish(objective):
+    """Lower the shared incumbent to objective (no-op outside a portfolio)."""
+    incumbent = _portfolio_incumbent
+    if incumbent is None:
+        return
+    with incumbent.get_lock():
+        if objective < incumbent.value:
+            incumbent.value = objective
+
+def _portfolio_cutoff():
+    """Best phase-2 objective any portfolio member has found so far, or None."""
+    incumbent = _portfolio_incumbent
+    if incumbent is None or incumbent.value == float('inf'):
+        return None
+    return incumbent.value
+
+def _portfolio_member(consts, case, K, seed):
+    """Worker entry point of solve_portfolio: the usual pipeline, plus its phase-2 pool."""
+    ctx = build_model_cached(consts, case)
+    tables, meta = solve_two_phase(consts, case, ctx, K, seed=seed)
+    cb = ctx.get('phase2_pool')
+    return tables, meta, (None if cb is None else (cb.keys, cb.pool, cb.pool_vecs))
+
+def solve_portfolio(consts, case, K, seed=None):
+    """Run solver.portfolio copies of the pipeline in parallel processes and merge their pools.
+
+    Member i runs with seed + i, the settings of solver.portfolio_variants (default
+    PORTFOLIO_VARIANTS) taken in turn, solver.portfolio_threads workers (default
+    num_threads // members) and the full time budget. Every member publishes its best
+    phase-2 objective to a shared value, which the others' LNS steps take as an
+    objective cutoff. The pools and the members' tables are merged (one entry per
+    schedule, best objective kept) and K tables picked with _select_diverse_k as usual.
+    Falls back to a single in-process member when processes are unavailable.
+    """
+    import copy
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    import multiprocessing
+    logger = logging.getLogger("scheduler")
+    sp = consts.get('solver', {}) or {}
+    n = int(sp.get('portfolio', 0) or 0)
+    threads = max(1, int(sp.get('num_threads', 8) or 8))
+    per = max(1, int(sp.get('portfolio_threads', threads // n) or 1))
+    variants = list(sp.get('portfolio_variants') or PORTFOLIO_VARIANTS)
+    base_seed = 0 if seed is None else int(seed)
+
+    jobs = []
+    for i in range(n):
+        sub_consts = copy.deepcopy(consts)
+        sub_sp = sub_consts.setdefault('solver', {})
+        sub_sp.update(variants[i % len(variants)])
+        sub_sp.update(num_threads=per, portfolio=0)
+        jobs.append((sub_consts, case, K, base_seed + i))
+    logger.info("Portfolio: %d members x %d workers, variants=%s", n, per,
+                [variants[i % len(variants)] for i in range(n)])
+
+    mp = multiprocessing.get_context('spawn')
+    try:
+        with ProcessPoolExecutor(max_workers=n, mp_context=mp, initializer=_portfolio_init,
+                                 initargs=(mp.Value('d', float('inf')),)) as ex:
+            futures = [ex.submit(_portfolio_member, *job) for job in jobs]
+            results = [f.result() for f in futures]
+    except (OSError, NotImplementedError, ImportError, BrokenProcessPool) as e:
+        logger.warning("Portfolio processes unavailable (%s); solving in-process", e)
+        jobs = jobs[:1]
+        jobs[0][0]['solver']['num_threads'] = threads
+        results = [_portfolio_member(*jobs[0])]
+
+    keys = next((pool[0] for _, _, pool in results if pool is not None), None)
+    merged = {}   # packed vector -> (objective, meta)
+
+    def offer(vec, objective, meta):
+        if vec not in merged or objective < merged[vec][0]:
+            merged[vec] = (objective, meta)
+
+    position = {key: k for k, key in enumerate(keys or ())}
+    members = []
+    for i, ((_, _, _, member_seed), (tables, meta, pool)) in enumerate(zip(jobs, results)):
+        m2 = meta.get('phase2') or {}
+        members.append({"member": i, "seed": member_seed, "variant": variants[i % len(variants)],
+                        "status_name": m2.get('status_name'), "best_objective": m2.get('best_objective'),
+                        "solutions_collected": m2.get('solutions_collected'), "tables": len(tables)})
+        if keys is None:
+            continue
+        if pool is not None:
+            for (objective, pmeta), vec in zip(pool[1], pool[2]):
+                offer(vec, objective, dict(pmeta, member=i))
+        # the members' own tables (e.g. from the diversity stage) compete as well
+        for table, tmeta in zip(tables, m2.get('per_table') or []):
+            bits = np.zeros(len(keys), dtype=np.uint8)
+            bits[[position[key] for key in table['assignment']]] = 1
+            offer(np.packbits(bits).tobytes(), tmeta['objective'], dict(tmeta, member=i))
+
+    L = int((case.get("run", {}) or {}).get("L", 0) or 0)
+    vecs = list(merged)
+    pool = [merged[v] for v in vecs]
+    selected = _select_diverse_k(pool, vecs, K, L, sense='min', relax_to=0,
+                                 strategy=str(sp.get('diversity_strategy', 'objective')).lower())
+    tables = []
+    for k in selected:
+        bits = np.unpackbits(np.frombuffer(vecs[k], dtype=np.uint8), count=len(keys))
+        tables.append({"assignment": tuple(keys[b] for b in np.flatnonzero(bits)),
+                       "days": case['calendar']['days'], "providers": case['providers'], "shifts": case['shifts']})
+    per_meta = [pool[k][1] for k in selected]
+    best = min((o for o, _ in pool), default=None)
+    logger.info("Portfolio: best objectives per member %s; merged pool=%d, selected=%d",
+                [m["best_objective"] for m in members], len(pool), len(tables))
+    meta2 = {
+        "status_name": "PORTFOLIO",
+        "solutions_collected": len(pool),
+        "solutions_selected": len(tables),
+        "best_objective": best,
+        "per_table": per_meta,
+        "L": L,
+        "members": members,
+    }
+    return tables, {"phase1": meta2, "phase2": meta2,
+                    "members": [m for _, m, _ in results]}
+
+# ---------- Rolling horizon ----------
+def _rolling_windows(n_days, window, step):
+    """[(first day, end day, commit end day)] of overlapping windows over n_days days.
+
+    Every window but the last commits its first step days; the last one runs to the end
+    of the calendar (absorbing a tail no longer than the overlap) and commits all of it.
+    """
+    if not 0 < step <= window:
+        raise ValueError(f"rolling horizon needs 0 < rolling_step_days <= rolling_window_days, got {step}, {window}")
+    out, d0 = [], 0
+    while True:
+        end = min(n_days, d0 + window)
+        if n_days - end <= window - step:
+            out.append((d0, n_days, n_days))
+            return out
+        out.append((d0, end, d0 + step))
+        d0 += step
+
+def solve_rolling_horizon(consts, case, K, seed=None):
+    """Solve a long calendar as overlapping windows and stitch the committed days.
+
+    Windows span solver.rolling_window_days (default 35) and advance by
+    solver.rolling_step_days (default 28). Each window is an ordinary case solved by
+    solve_two_phase on its own days and shifts, so only one window's model is alive at a
+    time. Providers carry their state across the boundary: the min/max totals still
+    open are spread over the remaining days (the last window gets exactly what is left),
+    and carry_in holds the worked streak, the totals and weekends so far and the shifts
+    the rest rule closes after their last committed shift. The time budget is split by
+    shift count up front (a window that overruns does not starve the later ones). Earlier windows commit their best table; the k-th stitched table ends
+    with the k-th table of the last window.
+    """
+    import copy
+    import math
+    logger = logging.getLogger("scheduler")
+    sp = consts.get('solver', {}) or {}
+    days, shifts, providers = case['calendar']['days'], case['shifts'], case['providers']
+    weekend_names = case['calendar'].get('weekend_days', ['Saturday', 'Sunday'])
+    windows = _rolling_windows(len(days), int(sp.get('rolling_window_days', 35)),
+                               int(sp.get('rolling_step_days', 28)))
+    date_to_idx = {d: i for i, d in enumerate(days)}
+    shift_day = [date_to_idx[sh['date']] for sh in shifts]
+    conflicts = defaultdict(set)
+    for clique in _rest_conflict_cliques(shifts):
+        for a in clique:
+            conflicts[a].update(clique)
+    total_time = float(get_num(consts, 'solver', 'max_time_in_seconds', default=120))
+    logger.info("Rolling horizon: %d days in %d windows %s", len(days), len(windows),
+                [(days[a], days[b - 1]) for a, b, _ in windows])
+
+    P = range(len(providers))
+    streak, totals, weekends = [0] * len(providers), [0] * len(providers), [set() for _ in P]
+    last_shifts = [[] for _ in P]    # committed shifts of the last two committed days
+    committed, win_meta, objective = [], [], 0
+    last_tables, last_per_table = [], []
+    win_shifts = [[s for s in range(len(shifts)) if d0 <= shift_day[s] < d1] for d0, d1, _ in windows]
+    n_win_shifts = max(1, sum(len(w) for w in win_shifts))
+    for w, (d0, d1, dc) in enumerate(windows):
+        last = w == len(windows) - 1
+        win = win_shifts[w]
+        share = total_time * len(win) / n_win_shifts
+        share_days = (d1 - d0) / (len(days) - d0)
+        win_set = set(win)
+        sub_providers = []
+        for j, p in enumerate(providers):
+            lim = dict(p.get('limits') or {})
+            mn = int(lim.get('min_total', 0)) - totals[j]
+            mx = int(lim.get('max_total', len(shifts))) - totals[j]
+            lim['min_total'] = max(0, mn if last else int(round(mn * share_days)))
+            lim['max_total'] = max(0, mx if last else int(math.ceil(mx * share_days)))
+            closed = sorted({shifts[t].get('id') for c in last_shifts[j] for t in conflicts[c] if t in win_set})
+            sub_providers.append(dict(p, limits=lim, carry_in={
+                "streak": streak[j], "total": totals[j], "weekends": len(weekends[j]),
+                "blocked_shifts": closed}))
+        sub_case = dict(case, calendar=dict(case['calendar'], days=days[d0:d1]),
+                        shifts=[shifts[s] for s in win], providers=sub_providers)
+        sub_consts = copy.deepcopy(consts)
+        sub_consts.setdefault('solver', {})['max_time_in_seconds'] = share
+        logger.info("Rolling window %d/%d: %s..%s (%d shifts), committing through %s, %.1fs",
+                    w + 1, len(windows), days[d0], days[d1 - 1], len(win), days[dc - 1], share)
+        t0 = _time.perf_counter()
+        ctx = build_model_cached(sub_consts, sub_case)
+        tables, meta = solve_two_phase(sub_consts, sub_case, ctx, K if last else 1, seed=seed)
+        del ctx
+        m2 = meta.get('phase2') or {}
+        win_meta.append({"days": [days[d0], days[d1 - 1]], "committed_through": days[dc - 1],
+                         "shifts": len(win), "status_name": m2.get('status_name'),
+                         "best_objective": m2.get('best_objective'), "tables": len(tables),
+                         "time_s": _time.perf_counter() - t0})
+        if not tables:
+            logger.warning("Rolling window %d produced no table; its committed shifts stay unfilled", w + 1)
+        if last:
+            last_tables = [[(win[s], j) for s, j in t['assignment']] for t in tables]
+            last_per_table = [pm['objective'] for pm in m2.get('per_table', [])]
+            break
+        objective += m2['per_table'][0]['objective'] if tables else 0
+        done = [(win[s], j) for s, j in (tables[0]['assignment'] if tables else ()) if shift_day[win[s]] < dc]
+        committed.extend(done)
+        worked = [set() for _ in P]
+        for s, j in done:
+            worked[j].add(shift_day[s])
+            totals[j] += 1
+            if day_name(days[shift_day[s]]) in weekend_names:
+                weekends[j].add(_to_date(days[shift_day[s]]).isocalendar()[:2])
+        for j in P:
+            run = 0
+            while run < dc - d0 and (dc - 1 - run) in worked[j]:
+                run += 1
+            streak[j] = streak[j] + run if run == dc - d0 else run
+            last_shifts[j] = [s for s, jj in done if jj == j and shift_day[s] >= dc - 2]
+
+    if not last_tables and committed:
+        # the last window produced no table: its shifts stay unfilled, as in earlier windows
+        last_tables = [[]]
+    tables, per_meta = [], []
+    for k, tail in enumerate(last_tables):
+        assign = tuple(sorted(committed + tail))
+        tables.append({"assignment": assign, "days": days, "providers": providers, "shifts": shifts})
+        per_meta.append({"objective": objective + (last_per_table[k] if k < len(last_per_table) else 0),
+                         "assignments": len(assign)})
+    logger.info("Rolling horizon: %d windows, stitched tables=%d", len(windows), len(tables))
+    meta2 = {
+        "status_name": "ROLLING_HORIZON",
+        "solutions_selected": len(tables),
+        "best_objective": per_meta[0]["objective"] if per_meta else None,
+        "per_table": per_meta,
+        "windows": win_meta,
+    }
+    return tables, {"phase1": meta2, "phase2": meta2}
+
 def write_excel_grid_multi(path, tables):
     wb=Workbook(); wb.remove(wb.active)
     for idx, table in enumerate(tables, start=1):
@@ -1763,10 +3758,12 @@ def write_excel_hospital_multi(path, tables):
         days=table['days']; providers=table['providers']; shifts=table['shifts']; assign=set(table['assignment'])
         ws=wb.create_sheet(f"Hospital_{idx}")
         ws.append(['Date','Role','Code','Start','End','Provider','ID'])
+        first_assignee={}
+        for (s, i) in sorted(assign): first_assignee.setdefault(s, i)
         for s,sh in enumerate(shifts):
             assignee='UNFILLED'
-            for i in range(len(providers)):
-                if (s, i) in assign: assignee=providers[i].get('name',f'Prov{i+1}'); break
+            if s in first_assignee:
+                i=first_assignee[s]; assignee=providers[i].get('name',f'Prov{i+1}')
             role,code=(sh['type'].split('_',1)+[''])[:2] if '_' in sh['type'] else ('', sh['type'])
             ws.append([sh['date'], role, code, sh['start'], sh['end'], assignee, sh.get('id', f'S{s:04d}')])
     if not tables:
@@ -1842,7 +3839,9 @@ def write_excel_calendar_multi(path, tables):
         days = table['days']
         providers = table['providers']
         shifts = table['shifts']
-        assign_pairs = set(table['assignment'])
+        assignees = defaultdict(list)  # shift index -> provider indices (assignment is sparse)
+        for (s_idx, i) in sorted(set(table['assignment'])):
+            assignees[s_idx].append(i)
 
         # Build per-day TYPE -> [names]
         per_day = {}
@@ -1850,10 +3849,7 @@ def write_excel_calendar_multi(path, tables):
             d = sh['date']
             t = sh['type']
             # find assignee(s)
-            names = []
-            for i in range(len(providers)):
-                if (s_idx, i) in assign_pairs:
-                    names.append(providers[i].get('name', f'Prov{i+1}'))
+            names = [providers[i].get('name', f'Prov{i+1}') for i in assignees.get(s_idx, [])]
             per_day.setdefault(d, {}).setdefault(t, [])
             per_day[d][t].extend(names)
 
@@ -1967,6 +3963,143 @@ def compute_capacity_diag(case: Dict[str,Any]) -> List[Dict[str,Any]]:
         })
     return out
 
+def _coverage_max_flow(day_caps, prov_cap, elig, providers_sel, shifts_sel) -> int:
+    """Max flow source -> provider -> (provider, day) -> shift -> sink over the selection.
+
+    day_caps[j][d] caps provider j on day d, prov_cap[j] over the horizon, and
+    elig[s] lists (provider, day) pairs that may take shift s.
+    """
+    from ortools.graph.python import max_flow
+    flow = max_flow.SimpleMaxFlow()
+    providers_sel, shifts_sel = set(providers_sel), list(shifts_sel)
+    src, sink = 0, 1
+    node = {}
+    def nid(key):
+        if key not in node:
+            node[key] = len(node) + 2
+        return node[key]
+    for j in providers_sel:
+        flow.add_arc_with_capacity(src, nid(('p', j)), prov_cap[j])
+        for d, c in day_caps[j].items():
+            flow.add_arc_with_capacity(nid(('p', j)), nid(('pd', j, d)), c)
+    arcs = 0
+    for s in shifts_sel:
+        for j, d in elig[s]:
+            if j in providers_sel:
+                flow.add_arc_with_capacity(nid(('pd', j, d)), nid(('s', s)), 1)
+                arcs += 1
+        flow.add_arc_with_capacity(nid(('s', s)), sink, 1)
+    if not arcs or flow.solve(src, sink) != flow.OPTIMAL:
+        return 0
+    return flow.optimal_flow()
+
+def capacity_precheck(case: Dict[str,Any]) -> Dict[str,Any]:
+    """Upper bounds on coverage from bipartite max-flow, before any solver time is spent.
+
+    Shifts flow to providers through (provider, day) nodes. Only type-eligible shifts
+    off a provider's hard-forbidden days are arcs; a day carries at most as many shifts
+    as fit with 12h rest between them; a provider carries at most max_total and at most
+    the shifts of the days max_consecutive_days leaves workable. Every bound therefore
+    holds for any schedule without hard slack. The flow is solved for the whole
+    horizon, per shift type, per provider type and per 7-day window; any window short
+    of its shifts or provider type short of its min_total sum is listed under "binding".
+    """
+    t0 = _time.perf_counter()
+    days = case['calendar']['days']
+    shifts = case['shifts']
+    providers = case['providers']
+    S, P, N = range(len(shifts)), range(len(providers)), len(days)
+    date_to_idx = {d: i for i, d in enumerate(days)}
+    day_shifts = defaultdict(list)
+    for s in S:
+        if shifts[s]['date'] in date_to_idx:
+            day_shifts[date_to_idx[shifts[s]['date']]].append(s)
+
+    elig = {s: [] for s in S}
+    day_caps = []
+    prov_cap, reach = [], []
+    for j, p in enumerate(providers):
+        forb = set(p.get('forbidden_days_hard', []) or [])
+        caps = {}
+        for d, ss in day_shifts.items():
+            if days[d] in forb:
+                continue
+            ok = [s for s in ss if p.get('type', 'MD') in shifts[s].get('allowed_provider_types', [])]
+            if not ok:
+                continue
+            for s in ok:
+                elig[s].append((j, d))
+            # most shifts of the day with >= 12h between them: greedy by rest-window end
+            wins = sorted((max(_wallclock_minutes(shifts[s]['end']) + REST_GAP_MINUTES,
+                               _wallclock_minutes(shifts[s]['start']) + 1),
+                           _wallclock_minutes(shifts[s]['start'])) for s in ok)
+            n, free_at = 0, None
+            for end, start in wins:
+                if free_at is None or start >= free_at:
+                    n, free_at = n + 1, end
+            caps[d] = n
+        day_caps.append(caps)
+        mc = int(p.get('max_consecutive_days', 0) or 0)
+        workable = N - N // (mc + 1) if 0 < mc < N else N
+        top = sum(sorted(caps.values(), reverse=True)[:workable])
+        lim = p.get('limits', {}) or {}
+        prov_cap.append(max(0, min(int(lim.get('max_total', top)), top)))
+        reach.append(top)
+
+    def bound(prov_sel, shift_sel):
+        return _coverage_max_flow(day_caps, prov_cap, elig, prov_sel, shift_sel)
+
+    binding = []
+    total = bound(P, S)
+    if total < len(shifts):
+        binding.append({"kind": "coverage", "shifts": len(shifts), "coverage_upper_bound": total})
+
+    by_shift_type = {}
+    for t in sorted({sh['type'] for sh in shifts}):
+        ss = [s for s in S if shifts[s]['type'] == t]
+        by_shift_type[t] = {"shifts": len(ss), "coverage_upper_bound": bound(P, ss)}
+        if by_shift_type[t]["coverage_upper_bound"] < len(ss):
+            binding.append(dict(kind="shift_type", type=t, **by_shift_type[t]))
+
+    by_week = []
+    for w0 in range(0, N, 7):
+        ss = [s for d in range(w0, min(N, w0 + 7)) for s in day_shifts[d]]
+        wk = {"start": days[w0], "end": days[min(N, w0 + 7) - 1], "shifts": len(ss),
+              "coverage_upper_bound": bound(P, ss) if ss else 0}
+        by_week.append(wk)
+        if wk["coverage_upper_bound"] < len(ss):
+            binding.append(dict(kind="week", **wk))
+
+    # Hall check on the minimums: with each provider capped at its own min_total the
+    # flow says how much of the min_total demand can be met at once.
+    mins = [int((providers[j].get('limits', {}) or {}).get('min_total', 0)) for j in P]
+    min_caps = [min(mins[j], reach[j]) for j in P]
+    by_provider_type = {}
+    for pt in sorted({p.get('type', 'MD') for p in providers}):
+        pj = [j for j in P if providers[j].get('type', 'MD') == pt]
+        need = sum(mins[j] for j in pj)
+        met = _coverage_max_flow(day_caps, min_caps, elig, pj, S) if need else 0
+        by_provider_type[pt] = {"providers": len(pj), "min_total_sum": need, "min_total_met": met}
+        if met < need:
+            binding.append(dict(kind="provider_type_min_total", type=pt, **by_provider_type[pt]))
+    for j in P:
+        if reach[j] < mins[j]:
+            binding.append({"kind": "provider_min_total", "provider": providers[j].get('name', f'Prov{j+1}'),
+                            "min_total": mins[j], "reachable": reach[j]})
+    min_shortfall = sum(mins) - (_coverage_max_flow(day_caps, min_caps, elig, P, S) if sum(mins) else 0)
+
+    return {
+        "shifts": len(shifts),
+        "coverage_upper_bound": total,
+        "unfilled_lower_bound": len(shifts) - total,
+        "min_total_shortfall_lower_bound": min_shortfall,
+        "by_shift_type": by_shift_type,
+        "by_provider_type": by_provider_type,
+        "by_week": by_week,
+        "binding": binding,
+        "elapsed_ms": round((_time.perf_counter() - t0) * 1000.0, 2),
+    }
+
 
 def Solve_test_case(case):
     # Pre-init timestamp so logs & files share the same run id
@@ -2023,10 +4156,69 @@ def Solve_test_case(case):
         json.dump(caps, f, indent=2)
     logger.info("Wrote capacity snapshot: %s", caps_path)
 
-    # Build & solve
-    ctx = build_model(consts, case)
-    logger.info("Model built: |S|=%d |P|=%d |D|=%d", len(ctx['S']), len(ctx['P']), len(ctx['D']))
-    tables, meta = solve_two_phase(consts, case, ctx, K, seed=seed if seed is None else int(seed))
+    # Max-flow capacity pre-check (solver.capacity_precheck): "flag" (default) logs and
+    # reports the binding windows, "reject" also skips the solve when coverage or the
+    # min totals are provably short, "off" skips the check.
+    precheck_mode = str((consts.get('solver') or {}).get('capacity_precheck', 'flag')).lower()
+    precheck = None
+    if precheck_mode != 'off':
+        precheck = capacity_precheck(case)
+        precheck_path = os.path.join(out_dir, 'capacity_precheck.json')
+        with open(precheck_path, 'w', encoding='utf-8') as f:
+            json.dump(precheck, f, indent=2)
+        logger.info("Capacity pre-check (%.1f ms): coverage<=%d of %d shifts, min_total shortfall>=%d",
+                    precheck['elapsed_ms'], precheck['coverage_upper_bound'], precheck['shifts'],
+                    precheck['min_total_shortfall_lower_bound'])
+        for b in precheck['binding']:
+            logger.warning("Capacity pre-check binding: %s", b)
+        short = precheck['unfilled_lower_bound'] > 0 or precheck['min_total_shortfall_lower_bound'] > 0
+        if short and precheck_mode == 'reject':
+            logger.error("Case rejected by the capacity pre-check (solver.capacity_precheck=reject); "
+                         "see %s", precheck_path)
+            return [], {"phase1": None, "phase2": None, "capacity_precheck": precheck,
+                        "rejected": "capacity_precheck"}
+
+    # Identical parallel shifts can be solved as one slot class with a demand
+    # (solver.compress_shifts, default off: the per-type cluster term then follows the
+    # days rather than the copies, so the objective may differ) and expanded back to
+    # their ids afterwards.
+    sp = consts.get('solver') or {}
+    full_case, classes = case, None
+    if sp.get('compress_shifts', False):
+        case, classes = _compress_identical_shifts(case)
+        if classes is not None:
+            logger.info("Shift compression: %d shifts in %d slot classes",
+                        len(full_case['shifts']), len(classes))
+
+    # Long calendars can be solved in overlapping windows (solver.rolling_horizon: false,
+    # the default; true; "auto" once the calendar outgrows one window and its step).
+    rolling = sp.get('rolling_horizon', False)
+    if str(rolling).lower() == 'auto':
+        n_days = len(case['calendar']['days'])
+        rolling = n_days > int(sp.get('rolling_window_days', 35)) + int(sp.get('rolling_step_days', 28))
+    # Independent eligibility components can be solved side by side (solver.decompose:
+    # false, the default; true). Fairness targets are then taken per component.
+    components = _eligibility_components(case)
+    logger.info("Eligibility components: %d %s", len(components),
+                [(len(c[0]), len(c[1])) for c in components])
+    if rolling:
+        tables, meta = solve_rolling_horizon(consts, case, K, seed=seed if seed is None else int(seed))
+    elif len(components) > 1 and sp.get('decompose', False):
+        tables, meta = solve_decomposed(consts, case, components, K, seed=seed if seed is None else int(seed))
+    elif int(sp.get('portfolio', 0) or 0) > 1:
+        # solver.portfolio: that many differently seeded solves side by side
+        tables, meta = solve_portfolio(consts, case, K, seed=seed if seed is None else int(seed))
+    else:
+        # Build & solve (through the compiled-model cache)
+        ctx = build_model_cached(consts, case)
+        logger.info("Model built: |S|=%d |P|=%d |D|=%d", len(ctx['S']), len(ctx['P']), len(ctx['D']))
+        tables, meta = solve_two_phase(consts, case, ctx, K, seed=seed if seed is None else int(seed))
+    if classes is not None:
+        tables = _expand_compressed_tables(tables, full_case, classes)
+        meta['shift_compression'] = {"shifts": len(full_case['shifts']), "slot_classes": len(classes)}
+        case = full_case
+    if precheck is not None:
+        meta['capacity_precheck'] = precheck
 
     # Outputs
     grid_path=os.path.join(out_dir, f'schedules.xlsx')
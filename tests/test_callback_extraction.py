@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+from ortools.sat.python import cp_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+
+def _model():
+    # extra integer vars interleaved with x so proto indices and key order differ
+    model = cp_model.CpModel()
+    x = {}
+    for s in range(3):
+        model.NewIntVar(0, 5, f"pad_{s}")
+        for j in (2, 0, 1):
+            x[s, j] = model.NewBoolVar(f"x_{s}_{j}")
+        model.AddExactlyOne(x[s, j] for j in range(3))
+    return model, x
+
+
+class _Check(cp_model.CpSolverSolutionCallback):
+    def __init__(self, x):
+        super().__init__()
+        self.keys = list(x)
+        self.index = tcg._var_index([x[k] for k in self.keys])
+        self.x, self.seen = x, 0
+
+    def on_solution_callback(self):
+        assert list(tcg._bulk_values(self, self.index)) == [self.Value(self.x[k]) for k in self.keys]
+        self.seen += 1
+
+
+def _enumerate(model, cb):
+    solver = cp_model.CpSolver()
+    solver.parameters.enumerate_all_solutions = True
+    solver.parameters.num_workers = 1
+    solver.Solve(model, cb)
+
+
+def test_bulk_values_match_value():
+    model, x = _model()
+    cb = _Check(x)
+    _enumerate(model, cb)
+    assert cb.seen == 27 * 6 ** 3
+
+
+def test_collectors_track_callback_time():
+    model, x = _model()
+    pool = tcg.AssignmentPoolCollector(x, range(3), range(3), [], [], [])
+    _enumerate(model, pool)
+    assert pool.callbacks == 27 * 6 ** 3 and len(pool.pool) == 27 and pool.callback_time_s > 0
+    for k in range(27):
+        assign = pool.table(k)["assignment"]
+        assert sorted(s for s, _ in assign) == [0, 1, 2] and pool.pool[k][1]["assignments"] == 3
+
+    top = tcg.KeepTopK(x, 4, [], [], [])
+    _enumerate(model, top)
+    assert top.callbacks == 27 * 6 ** 3 and len(top.pool) == 4 and top.callback_time_s > 0
+    assert all(sorted(s for s, _ in t["assignment"]) == [0, 1, 2] for _, t, _ in top.pool)
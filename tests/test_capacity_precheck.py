@@ -0,0 +1,53 @@
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+DAYS = [(date(2025, 10, 6) + timedelta(days=k)).isoformat() for k in range(10)]
+
+
+def _case(providers):
+    shifts = []
+    for d in DAYS:
+        # a 20:00-23:00 night leaves no 12h rest before that day's or the next day's 08:00
+        for t, (st, en) in (("MD_D", ("08:00", "16:00")), ("MD_N", ("20:00", "23:00"))):
+            shifts.append({"id": f"{t}_{d}", "date": d, "type": t, "allowed_provider_types": ["MD"],
+                           "start": f"{d}T{st}:00", "end": f"{d}T{en}:00"})
+    return {"calendar": {"days": DAYS, "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": shifts, "providers": providers}
+
+
+def _prov(name, mn, mx, **kw):
+    p = {"name": name, "type": "MD", "limits": {"min_total": mn, "max_total": mx}, "max_consecutive_days": 0}
+    p.update(kw)
+    return p
+
+
+def test_rest_days_and_limits_bound_coverage():
+    rep = tcg.capacity_precheck(_case([
+        _prov("A", 0, 20),                                         # one shift a day: 10
+        _prov("B", 0, 4),                                          # max_total: 4
+        _prov("C", 0, 20, forbidden_days_hard=DAYS[:8]),           # two open days: 2
+        _prov("D", 0, 20, type="RN"),                              # no eligible shift
+    ]))
+    assert rep["coverage_upper_bound"] == 16 and rep["unfilled_lower_bound"] == 4
+    assert rep["by_week"][0]["shifts"] == 14 and rep["by_week"][1]["shifts"] == 6
+    assert [b["kind"] for b in rep["binding"]][:1] == ["coverage"]
+    assert rep["min_total_shortfall_lower_bound"] == 0
+
+
+def test_min_totals_and_consecutive_caps():
+    rep = tcg.capacity_precheck(_case([
+        _prov("A", 9, 20, max_consecutive_days=2),  # at most 7 of 10 days
+        _prov("B", 6, 20, type="MD"),
+    ]))
+    assert {"kind": "provider_min_total", "provider": "A", "min_total": 9, "reachable": 7} in rep["binding"]
+    assert rep["min_total_shortfall_lower_bound"] == 2
+    assert rep["by_provider_type"]["MD"] == {"providers": 2, "min_total_sum": 15, "min_total_met": 13}
+
+
+def test_staffed_case_has_nothing_binding():
+    rep = tcg.capacity_precheck(_case([_prov(n, 3, 10) for n in "ABC"]))
+    assert rep["coverage_upper_bound"] == 20 and rep["binding"] == []
@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+
+from ortools.sat.python import cp_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+DAYS = ["2025-10-08", "2025-10-09", "2025-10-10", "2025-10-11", "2025-10-12", "2025-10-13", "2025-10-14"]
+
+
+def _case():
+    shifts = [{"id": f"MD_D_{d}", "date": d, "type": "MD_D", "allowed_provider_types": ["MD"],
+               "start": f"{d}T08:00:00", "end": f"{d}T16:00:00"} for d in DAYS]
+    # P0 cannot work the 4th day, which splits its open streaks into 3 + 3
+    providers = [{"name": f"P{i}", "type": "MD", "limits": {"min_total": 2, "max_total": 5},
+                  "max_consecutive_days": 4, "forbidden_days_hard": [DAYS[3]] if i == 0 else [],
+                  "forbidden_days_soft": [DAYS[-1 - i]]} for i in range(3)]
+    return {"calendar": {"days": DAYS, "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": shifts, "providers": providers}
+
+
+def _phase2(encoding):
+    consts = {"solver": {"cube_encoding": encoding, "num_threads": 1},
+              "weights": {"hard": {"slack_cant_work": tcg.HARD_INF_WEIGHT}}}
+    ctx = tcg.build_model(consts, _case())
+    hard, _ = tcg.solve_phase1(consts, ctx, 10, seed=1)
+    return tcg.build_phase2_objective(consts, ctx, hard)
+
+
+def _solve(model):
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = 1
+    solver.parameters.max_time_in_seconds = 30
+    assert solver.Solve(model) == cp_model.OPTIMAL
+    return solver
+
+
+def test_table_and_product_cubes_agree():
+    table, product = _phase2("table"), _phase2("product")
+    names = lambda ctx: {v.name for v in ctx["model"].Proto().variables}
+    # P0 gets no cube on its forbidden day under the table encoding
+    assert "cluster_len_cube_0_3" not in names(table) and "cluster_len_cube_0_3" in names(product)
+    assert _solve(table["model"]).ObjectiveValue() == _solve(product["model"]).ObjectiveValue()
+
+
+def test_cube_sum_of_a_fixed_schedule():
+    # P0: days 0-2 (27); P1: days 3-4 (8); P2: days 5-6 (8)
+    plan = {0: 0, 1: 0, 2: 0, 3: 1, 4: 1, 5: 2, 6: 2}
+    for encoding in ("table", "product"):
+        ctx = _phase2(encoding)
+        model = ctx["model"].Clone()
+        for (s, j), v in ctx["x"].items():
+            model.Add(model.GetIntVarFromProtoIndex(v.Index()) == int(plan[s] == j))
+        solver = _solve(model)
+        index = {v.name: k for k, v in enumerate(model.Proto().variables)}
+        cubes = [solver.Value(model.GetIntVarFromProtoIndex(index[f"cluster_cubesum_{i}"])) for i in range(3)]
+        assert cubes == [27, 8, 8], encoding
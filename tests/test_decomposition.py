@@ -0,0 +1,99 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+DAYS = ["2025-10-06", "2025-10-07", "2025-10-08"]
+
+
+def _shift(d, t, allowed):
+    return {"id": f"{t}_{d}", "date": d, "type": t, "allowed_provider_types": allowed,
+            "start": f"{d}T08:00:00", "end": f"{d}T16:00:00"}
+
+
+def _prov(name, ptype):
+    return {"name": name, "type": ptype, "limits": {"min_total": 0, "max_total": 3},
+            "max_consecutive_days": 3, "forbidden_days_hard": [], "preferred_days_hard": {},
+            "preferred_days_soft": {}}
+
+
+def _case(shifts, providers):
+    return {"calendar": {"days": DAYS, "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": shifts, "providers": providers}
+
+
+def test_components_follow_allowed_types():
+    shifts = [_shift(d, "MD_D", ["MD"]) for d in DAYS] + [_shift(d, "RN_D", ["RN"]) for d in DAYS[:2]]
+    shifts.append(_shift(DAYS[0], "PA_D", ["PA"]))  # nobody can take it
+    providers = [_prov("A", "MD"), _prov("B", "RN"), _prov("C", "MD"), _prov("D", "NP")]
+    assert tcg._eligibility_components(_case(shifts, providers)) == [([0, 1, 2], [0, 2]), ([3, 4], [1])]
+
+    # one shift open to both MD and RN joins the two departments
+    shifts.append(_shift(DAYS[2], "FLOAT", ["MD", "RN"]))
+    comps = tcg._eligibility_components(_case(shifts, providers))
+    assert comps == [([0, 1, 2, 3, 4, 6], [0, 1, 2])]
+
+
+def test_decomposed_tables_use_global_indices():
+    shifts = []
+    for d in DAYS:
+        shifts += [_shift(d, "RN_D", ["RN"]), _shift(d, "MD_D", ["MD"])]
+    providers = [_prov("R", "RN"), _prov("M", "MD")]
+    case = _case(shifts, providers)
+    consts = {"solver": {"max_time_in_seconds": 10, "num_threads": 2, "model_cache": False}}
+    comps = tcg._eligibility_components(case)
+    assert len(comps) == 2
+
+    tables, meta = tcg.solve_decomposed(consts, case, comps, 1, seed=1)
+    assert len(tables) == 1 and len(meta["phase2"]["components"]) == 2
+    assign = tables[0]["assignment"]
+    assert sorted(s for s, _ in assign) == list(range(len(shifts)))
+    for s, j in assign:
+        assert providers[j]["type"] in shifts[s]["allowed_provider_types"]
+
+
+def test_broken_pool_keeps_finished_components_and_splits_the_time(monkeypatch):
+    import concurrent.futures as cf
+    from concurrent.futures.process import BrokenProcessPool
+
+    class _Pool:
+        # the first component finishes, then the pool breaks
+        def __init__(self, *a, **kw):
+            self.n = 0
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def submit(self, fn, *args):
+            f = cf.Future()
+            if self.n == 0:
+                f.set_result(([], {"phase2": {}, "pooled": True}))
+            else:
+                f.set_exception(BrokenProcessPool("worker died"))
+            self.n += 1
+            return f
+
+    solved = []
+
+    def _solve(consts, case, K, seed):
+        solved.append((len(case["shifts"]), consts["solver"]["max_time_in_seconds"]))
+        return [], {"phase2": {}}
+
+    monkeypatch.setattr(cf, "ProcessPoolExecutor", _Pool)
+    monkeypatch.setattr(tcg, "_solve_component", _solve)
+    shifts = [_shift(d, "MD_D", ["MD"]) for d in DAYS]
+    shifts += [_shift(d, t, [t]) for d in DAYS[:2] for t in ("RN", "PA")]
+    providers = [_prov("M", "MD"), _prov("R", "RN"), _prov("P", "PA")]
+    case = _case(shifts, providers)
+    consts = {"solver": {"max_time_in_seconds": 30, "num_threads": 1}}
+    comps = tcg._eligibility_components(case)
+    assert [len(c[0]) for c in comps] == [3, 2, 2]
+
+    _, meta = tcg.solve_decomposed(consts, case, comps, 1, seed=1)
+    assert [m.get("pooled", False) for m in meta["components"]] == [True, False, False]
+    assert [n for n, _ in solved] == [2, 2]
+    assert all(12 < t <= 15 for _, t in solved)
@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+
+def _reference(pool, vecs, K, L, relax_to=0):
+    # the original sweep: best-first at threshold thr, one step lower per failed sweep
+    idxs = sorted(range(len(pool)), key=lambda k: pool[k][0])
+    selected, thr = [], L
+    while True:
+        for k in idxs:
+            if k not in selected and all(tcg._hamming(vecs[k], vecs[j]) >= thr for j in selected):
+                selected.append(k)
+                if len(selected) == K:
+                    return selected
+        if thr > relax_to:
+            thr -= 1
+        else:
+            return selected
+
+
+def _pool(n, nbits, seed):
+    rng = np.random.default_rng(seed)
+    base = rng.random(nbits) < 0.2
+    vecs = [np.packbits(base ^ (rng.random(nbits) < 0.05)).tobytes() for _ in range(n)]
+    return [(float(o), {}) for o in rng.integers(0, 50, n)], vecs
+
+
+@pytest.mark.parametrize("L", [0, 5, 12, 40])
+def test_matches_the_sweep_across_blocks(monkeypatch, L):
+    monkeypatch.setattr(tcg, "_DIVERSE_BLOCK", 16)
+    pool, vecs = _pool(100, 150, L)
+    assert tcg._select_diverse_k(pool, vecs, 6, L) == _reference(pool, vecs, 6, L)
+    assert tcg._select_diverse_k(pool, vecs, 6, L, relax_to=L) == _reference(pool, vecs, 6, L, relax_to=L)
+
+
+def test_maxmin_spreads_the_selection():
+    pool, vecs = _pool(60, 200, 7)
+    sel = tcg._select_diverse_k(pool, vecs, 4, 0, strategy="maxmin")
+    assert sel[0] == min(range(60), key=lambda k: pool[k][0])
+    for t in range(2, 4):
+        dist = lambda k: min(tcg._hamming(vecs[k], vecs[j]) for j in sel[:t - 1])
+        assert dist(sel[t - 1]) == max(dist(k) for k in range(60) if k not in sel[:t - 1])
+    with pytest.raises(ValueError):
+        tcg._select_diverse_k(pool, vecs, 4, 0, strategy="random")
+
+
+def test_swar_popcount(monkeypatch):
+    a = np.random.default_rng(1).integers(0, 2 ** 63, 1000, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    expected = np.array([bin(int(v)).count("1") for v in a])
+    monkeypatch.delattr(np, "bitwise_count", raising=False)
+    assert (tcg._popcount64(a) == expected).all()
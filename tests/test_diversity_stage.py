@@ -0,0 +1,80 @@
+import sys
+from datetime import date, timedelta
+from itertools import combinations
+from pathlib import Path
+
+import pytest
+from ortools.sat.python import cp_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+from test_lns import SOLVER, _phase2_ctx
+
+
+def _best():
+    ctx = _phase2_ctx()
+    cb = tcg.AssignmentPoolCollector(ctx["x"], ctx["S"], ctx["P"], ctx["days"], ctx["providers"], ctx["shifts"])
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = 1
+    solver.parameters.max_time_in_seconds = 2
+    assert solver.Solve(ctx["model"], cb) in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    best = min(range(len(cb.pool)), key=lambda k: cb.pool[k][0])
+    return ctx, cb, list(solver.ResponseProto().solution), solver.ObjectiveValue(), cb.pool_vecs[best]
+
+
+@pytest.mark.parametrize("processes", [False, True])
+def test_stage_adds_tables_at_distance_l(processes):
+    ctx, cb, sol, obj, vec = _best()
+    sp = dict(SOLVER, diversity_processes=processes)
+    extra, meta = tcg._diversity_stage(ctx, cb, sol, obj, [vec], 3, 6, sp, 4, seed=1)
+    assert len(extra) == meta["found"] == 2 and meta["missing"] == 2
+    assert meta["rounds"][0]["round"] == "blocks"
+    vecs = [vec] + [v for _, v in extra]
+    for a, b in combinations(vecs, 2):
+        assert tcg._hamming(a, b) >= 6
+    assert all(o <= meta["objective_cap"] for o, _ in extra)
+    assert [list(v.Proto().domain) for v in ctx["x"].values()] == [[0, 1]] * len(ctx["x"])
+
+
+def test_whole_schedule_round_when_blocks_are_too_small():
+    ctx, cb, sol, obj, vec = _best()
+    # 10 shifts per half of the calendar cannot differ in 30 places
+    extra, meta = tcg._diversity_stage(ctx, cb, sol, obj, [vec], 3, 30,
+                                       dict(SOLVER, diversity_processes=False), 4, seed=1)
+    assert {r["round"] for r in meta["rounds"]} == {"blocks", "whole"}
+    vecs = [vec] + [v for _, v in extra]
+    for a, b in combinations(vecs, 2):
+        assert tcg._hamming(a, b) >= 30
+
+
+def _covered(vec):
+    return int(tcg.np.unpackbits(tcg.np.frombuffer(vec, dtype=tcg.np.uint8)).sum())
+
+
+def _forced_case(n_days=30):
+    # every shift has exactly one eligible provider: a table L apart must leave shifts open
+    days = [(date(2025, 10, 6) + timedelta(days=k)).isoformat() for k in range(n_days)]
+    shifts = []
+    for d in days:
+        for t, (st, en), typ in (("MD_D", ("08:00", "16:00"), "MD"), ("RN_N", ("20:00", "23:00"), "RN")):
+            shifts.append({"id": f"{t}_{d}", "date": d, "type": t, "allowed_provider_types": [typ],
+                           "start": f"{d}T{st}:00", "end": f"{d}T{en}:00"})
+    providers = [{"name": typ, "type": typ, "limits": {"min_total": 0, "max_total": n_days},
+                  "max_consecutive_days": 0} for typ in ("MD", "RN")]
+    return {"calendar": {"days": days, "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": shifts, "providers": providers, "run": {"L": 2}}
+
+
+def test_diverse_tables_keep_the_best_coverage():
+    ctx, cb, sol, obj, vec = _best()
+    # the cap is relative to the penalty part, not to the -1e11-per-shift coverage reward
+    assert tcg._diversity_cap(ctx, obj, _covered(vec), {}) < obj + 0.05 * abs(obj)
+    extra, meta = tcg._diversity_stage(ctx, cb, sol, obj, [vec], 3, 30,
+                                       dict(SOLVER, diversity_processes=False), 4, seed=1)
+    assert meta["min_taken"] == _covered(vec) and all(_covered(v) >= _covered(vec) for _, v in extra)
+
+    # 60 shifts: a cap of 5% of the whole objective used to admit tables 2 shifts short
+    consts = {"solver": dict(SOLVER, max_time_in_seconds=20, model_cache=False, diversity_processes=False)}
+    case = _forced_case()
+    tables, meta = tcg.solve_two_phase(consts, case, tcg.build_model(consts, case), 3, seed=1)
+    assert [len(t["assignment"]) for t in tables] == [60]
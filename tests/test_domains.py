@@ -0,0 +1,87 @@
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+from ortools.sat.python import cp_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+
+def _case(ndays, providers):
+    days = [(date(2025, 10, 6) + timedelta(days=k)).isoformat() for k in range(ndays)]
+    shifts = [{"id": f"D_{d}", "date": d, "type": "MD_D", "allowed_provider_types": ["MD"],
+               "start": f"{d}T08:00:00", "end": f"{d}T16:00:00"} for d in days]
+    for p in providers:
+        p.setdefault("type", "MD")
+        p.setdefault("max_consecutive_days", 0)
+    return {"calendar": {"days": days, "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": shifts, "providers": providers}
+
+
+def _solve_both_phases(consts, case):
+    ctx = tcg.build_model(consts, case)
+    hard, meta1 = tcg.solve_phase1(consts, ctx, 10, seed=1)
+    assert hard is not None, meta1
+    tcg.build_phase2_objective(consts, ctx, hard)
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = 1
+    solver.parameters.max_time_in_seconds = 30
+    return ctx, meta1, solver, solver.Solve(ctx["model"])
+
+
+def test_consecutive_cap_beyond_horizon_is_no_cap():
+    case = _case(3, [{"name": "A", "limits": {"min_total": 3, "max_total": 3}, "max_consecutive_days": 100}])
+    ctx = tcg.build_model({"solver": {"num_threads": 1}}, case)
+    hard, meta1 = tcg.solve_phase1({"solver": {"num_threads": 1}}, ctx, 10, seed=1)
+    assert meta1["status_name"] == "OPTIMAL" and meta1["objective"] == 0
+
+
+def _unbalanced_case(days=20):
+    # A must take all days and B none, so B sits days/2 shifts below the average target.
+    dates = [(date(2025, 10, 6) + timedelta(days=k)).isoformat() for k in range(days)]
+    return _case(days, [
+        {"name": "A", "limits": {"min_total": days, "max_total": days}},
+        {"name": "B", "limits": {"min_total": 0, "max_total": days}, "forbidden_days_hard": dates},
+    ])
+
+
+def test_fairness_domains_scale_with_the_horizon():
+    # deviations = 10^2 = 100, which the old fixed very_heavy <= 50 ruled out
+    consts = {"solver": {"num_threads": 1, "fairness_cap": None},
+              "weights": {"hard": {"slack_cant_work": 1000}}}
+    ctx, meta1, solver, status = _solve_both_phases(consts, _unbalanced_case())
+    assert meta1["objective"] == 0
+    assert status == cp_model.OPTIMAL
+    assert solver.ObjectiveValue() > 90 * 5.6e14  # very_heavy = 100 - 9 = 91
+
+
+def test_infeasible_fairness_cap_is_dropped():
+    consts = {"solver": {"num_threads": 1, "max_time_in_seconds": 20, "model_cache": False},
+              "weights": {"hard": {"slack_cant_work": 1000}}}
+    case = _unbalanced_case()
+    ctx = tcg.build_model(consts, case)
+    tables, meta = tcg.solve_two_phase(consts, case, ctx, 1, seed=1)
+    assert meta["phase2"]["fairness_cap"] == {"cap": 50, "bound": 391, "dropped": True}
+    assert len(tables) == 1 and len(tables[0]["assignment"]) == 20
+
+
+def test_objective_overflow_is_reported():
+    case = _case(3, [{"name": "A", "limits": {"min_total": 0, "max_total": 3}}])
+    consts = {"solver": {"num_threads": 1}, "weights": {"soft": {"cluster_size": 10**18}}}
+    ctx = tcg.build_model(consts, case)
+    hard, _ = tcg.solve_phase1(consts, ctx, 10, seed=1)
+    with pytest.raises(ValueError, match="int64"):
+        tcg.build_phase2_objective(consts, ctx, hard)
+
+
+def test_provider_without_limits_is_not_capped_at_31():
+    case = _case(36, [{"name": "A"}])
+    ctx, _, solver, status = _solve_both_phases({"solver": {"num_threads": 1}}, case)
+    assert status == cp_model.OPTIMAL
+    taken = next(v for v in ctx["model"].Proto().variables if v.name == "provider_taken_0")
+    assert list(taken.domain) == [0, 36]
+    # as before the domains were derived: personal_target stays clamped at 31, and
+    # very_heavy allows a squared deviation of 9 on top of it
+    assert sum(solver.Value(v) for v in ctx["x"].values()) == 34
@@ -0,0 +1,92 @@
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from ortools.sat.python import cp_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+
+def _policy(clock, **sp):
+    stop = tcg._Phase2StopPolicy(sp)
+    stop.elapsed = lambda: clock[0]
+    return stop
+
+
+def test_stall_and_slow_progress():
+    clock = [0.0]
+    stop = _policy(clock, stall_seconds=10)
+    assert stop.enabled and stop.check() is None
+    assert stop.observe(100, 0) is None
+    clock[0] = 9
+    assert stop.observe(90, 0) is None
+    clock[0] = 18.9
+    assert stop.observe(95, 0) is None  # not an improvement: the clock runs from t=9
+    clock[0] = 19
+    assert stop.check() == "stall" and stop.stopped_at == 19
+
+    clock[0] = 0.0
+    stop = _policy(clock, stall_seconds=0, improvement_window_seconds=10, min_improvement=0.05)
+    for t, obj in ((0, 1000), (4, 900), (8, 880), (12, 860)):
+        clock[0] = t
+        assert stop.observe(obj, 0) is None
+    clock[0] = 14  # 900 -> 860 over the last 10 s is 4.4%
+    assert stop.check() == "slow_progress"
+
+    assert not tcg._Phase2StopPolicy({"stall_seconds": 0}).enabled
+    assert not tcg._Phase2StopPolicy({}).enabled  # opt-in
+
+
+def test_relative_gap_only_against_the_main_solve_bound():
+    clock = [0.0]
+    stop = _policy(clock, stall_seconds=0, relative_gap=0.01)
+    assert stop.observe(1000, 995) is None  # no watch(use_bound=True): the bound is ignored
+    stop.use_bound = True
+    assert stop.observe(1000, 980) is None
+    assert stop.observe(999, 995) == "relative_gap"
+
+
+def _case(n_days=28, n_prov=6):
+    days = [(date(2025, 10, 6) + timedelta(days=k)).isoformat() for k in range(n_days)]
+    shifts = []
+    for d in days:
+        for t, (st, en) in (("MD_D", ("08:00", "16:00")), ("MD_E", ("12:00", "20:00")), ("MD_N", ("20:00", "23:00"))):
+            shifts.append({"id": f"{t}_{d}", "date": d, "type": t, "allowed_provider_types": ["MD"],
+                           "start": f"{d}T{st}:00", "end": f"{d}T{en}:00"})
+    providers = [{"name": f"P{i}", "type": "MD", "limits": {"min_total": 8, "max_total": 14},
+                  "max_consecutive_days": 4,
+                  "forbidden_days_soft": [days[(3 * i) % n_days], days[(3 * i + 7) % n_days]],
+                  "preferred_days_soft": {days[-1 - i]: ["MD_N"]}} for i in range(n_prov)]
+    return {"calendar": {"days": days, "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": shifts, "providers": providers}
+
+
+def test_watch_stops_a_running_solve():
+    consts = {"solver": {"num_threads": 1}}
+    ctx = tcg.build_model(consts, _case())
+    hard, _ = tcg.solve_phase1(consts, ctx, 10, seed=1)
+    ctx = tcg.build_phase2_objective(consts, ctx, hard)
+    stop = tcg._Phase2StopPolicy({"stall_seconds": 1})
+    cb = tcg.AssignmentPoolCollector(ctx["x"], ctx["S"], ctx["P"], ctx["days"], ctx["providers"], ctx["shifts"])
+    cb.stop_policy = stop
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = 1
+    solver.parameters.max_time_in_seconds = 60
+    t0 = time.monotonic()
+    with stop.watch(solver):
+        status = solver.Solve(ctx["model"], cb)
+    assert status == cp_model.FEASIBLE and stop.reason == "stall"
+    assert time.monotonic() - t0 < 30 and stop.solver is None
+
+
+def test_two_phase_records_the_early_stop():
+    consts = {"solver": {"num_threads": 2, "max_time_in_seconds": 60, "model_cache": False, "stall_seconds": 1}}
+    case = _case()
+    ctx = tcg.build_model(consts, case)
+    t0 = time.monotonic()
+    tables, meta = tcg.solve_two_phase(consts, case, ctx, 1, seed=1)
+    early = meta["phase2"]["early_stop"]
+    assert tables and early["reason"] == "stall" and early["saved_s"] > 0
+    assert time.monotonic() - t0 < 45
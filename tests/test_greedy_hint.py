@@ -0,0 +1,53 @@
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+from ortools.sat.python import cp_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+DAYS = [(date(2025, 10, 6) + timedelta(days=k)).isoformat() for k in range(7)]
+
+
+def _case():
+    shifts = []
+    for d in DAYS:
+        for t, (st, en) in (("MD_D", ("08:00", "16:00")), ("MD_N", ("20:00", "23:00"))):
+            shifts.append({"id": f"{t}_{d}", "date": d, "type": t, "allowed_provider_types": ["MD"],
+                           "start": f"{d}T{st}:00", "end": f"{d}T{en}:00"})
+    shifts.append({"id": f"RN_{DAYS[0]}", "date": DAYS[0], "type": "RN_D", "allowed_provider_types": ["RN"],
+                   "start": f"{DAYS[0]}T08:00:00", "end": f"{DAYS[0]}T16:00:00"})
+    providers = [
+        {"name": "A", "type": "MD", "limits": {"min_total": 4, "max_total": 5}, "max_consecutive_days": 2,
+         "forbidden_days_hard": [DAYS[3]]},
+        {"name": "B", "type": "MD", "limits": {"min_total": 2, "max_total": 4}, "max_consecutive_days": 3,
+         "preferred_days_hard": {DAYS[6]: ["MD_N"]}},
+        {"name": "C", "type": "MD", "limits": {"min_total": 0, "max_total": 3}, "max_consecutive_days": 0},
+        {"name": "R", "type": "RN", "limits": {"min_total": 1, "max_total": 1}, "max_consecutive_days": 0},
+    ]
+    return {"calendar": {"days": DAYS, "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": shifts, "providers": providers}
+
+
+def test_greedy_schedule_has_no_hard_slack():
+    case = _case()
+    ctx = tcg.build_model({"solver": {"num_threads": 1}}, case)
+    chosen = tcg.greedy_assignment(ctx)
+    assert (len(case["shifts"]) - 1, 3) in chosen  # R takes the RN shift
+    assert (13, 1) in chosen                         # B's hard-ON night on the last day
+
+    model = ctx["model"]
+    for key, var in ctx["x"].items():
+        model.Add(var == (1 if key in chosen else 0))
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = 1
+    assert solver.Solve(model) == cp_model.OPTIMAL
+    assert solver.ObjectiveValue() == 0
+
+
+def test_phase1_reports_the_hint():
+    ctx = tcg.build_model({"solver": {"num_threads": 1}}, _case())
+    _, meta = tcg.solve_phase1({"solver": {"num_threads": 1}}, ctx, 5, seed=1)
+    assert meta["greedy_hint_assigned"] > 0 and meta["objective"] == 0
+    assert 0 < meta["greedy_hint_s"] <= meta["wall_time_s"]
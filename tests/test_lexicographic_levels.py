@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+# Plain ints stand in for the model expressions: each level is then sum(weight/gcd * value).
+TERMS = [
+    ("very_heavy", 5 * 10 ** 14, 2),
+    ("coverage", -100000000000, 30),
+    ("cluster", 1000, 7),
+    ("weekend", 1000000, 3),
+]
+
+
+def _names(levels):
+    return [names for names, _ in levels]
+
+
+def test_default_levels_follow_weight_dominance():
+    levels = tcg._lexicographic_levels({}, TERMS)
+    assert _names(levels) == [["very_heavy"], ["coverage"], ["cluster", "weekend"]]
+    # single-term levels drop their weight but keep its sign; mixed levels keep ratios
+    assert [expr for _, expr in levels] == [2, -30, 7 + 1000 * 3]
+
+
+def test_configured_levels_put_unnamed_terms_last():
+    consts = {"solver": {"lexicographic_levels": [["coverage"], ["weekend", "very_heavy"]]}}
+    levels = tcg._lexicographic_levels(consts, TERMS)
+    assert _names(levels) == [["coverage"], ["weekend", "very_heavy"], ["cluster"]]
+    assert levels[1][1] == 1 * 3 + 500000000 * 2
+
+
+def test_unknown_or_repeated_terms_are_rejected():
+    with pytest.raises(ValueError):
+        tcg._lexicographic_levels({"solver": {"lexicographic_levels": [["coverage"], ["nope"]]}}, TERMS)
+    with pytest.raises(ValueError):
+        tcg._lexicographic_levels({"solver": {"lexicographic_levels": [["coverage"], ["coverage"]]}}, TERMS)
@@ -0,0 +1,70 @@
+import sys
+from pathlib import Path
+
+import pytest
+from ortools.sat.python import cp_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+# Fri..Mon so one Saturday/Sunday pair is in the horizon
+DAYS = ["2025-10-10", "2025-10-11", "2025-10-12", "2025-10-13"]
+
+
+def _case():
+    shifts = []
+    for d in DAYS:
+        for t, (st, en) in (("MD_D", ("08:00", "16:00")), ("MD_N", ("20:00", "23:00"))):
+            shifts.append({"id": f"{t}_{d}", "date": d, "type": t, "allowed_provider_types": ["MD"],
+                           "start": f"{d}T{st}:00", "end": f"{d}T{en}:00"})
+    providers = [{"name": f"P{i}", "type": "MD", "limits": {"min_total": 1 + i, "max_total": 4},
+                  "max_consecutive_days": 3, "forbidden_days_soft": [DAYS[i]],
+                  "preferred_days_soft": {DAYS[-1 - i]: ["MD_N"]}} for i in range(3)]
+    return {"calendar": {"days": DAYS, "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": shifts, "providers": providers}
+
+
+def _optimum(linearize):
+    consts = {"solver": {"linearize": linearize, "num_threads": 1, "symmetry_breaking": "off"}}
+    ctx = tcg.build_model(consts, _case())
+    hard, _ = tcg.solve_phase1(consts, ctx, 10, seed=1)
+    tcg.build_phase2_objective(consts, ctx, hard)
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = 1
+    solver.parameters.max_time_in_seconds = 30
+    assert solver.Solve(ctx["model"]) == cp_model.OPTIMAL
+    return solver.ObjectiveValue()
+
+
+def test_linear_families_keep_the_optimum():
+    assert _optimum(True) == _optimum(False)
+
+
+def test_square_cuts_are_exact_at_integers():
+    for v in range(6):
+        model = cp_model.CpModel()
+        x = model.NewIntVar(v, v, "v")
+        sq = model.NewIntVar(0, 100, "sq")
+        tcg._add_square(model, sq, x, 5, True)
+        model.Minimize(sq)
+        solver = cp_model.CpSolver()
+        assert solver.Solve(model) == cp_model.OPTIMAL
+        assert solver.Value(sq) == v * v
+
+
+def test_families_parse():
+    assert tcg._linearize_families({}) == set(tcg.LINEARIZE_FAMILIES)
+    assert tcg._linearize_families({"solver": {"linearize": "none"}}) == set()
+    assert tcg._linearize_families({"solver": {"linearize": "weekend, abs"}}) == {"weekend", "abs"}
+    with pytest.raises(ValueError):
+        tcg._linearize_families({"solver": {"linearize": ["cubes"]}})
+
+
+def test_min_max_helpers_only_without_linearization():
+    for linearize, n_los in ((True, 0), (False, 3)):
+        consts = {"solver": {"linearize": linearize, "num_threads": 1}}
+        ctx = tcg.build_model(consts, _case())
+        hard, _ = tcg.solve_phase1(consts, ctx, 10, seed=1)
+        tcg.build_phase2_objective(consts, ctx, hard)
+        names = [v.name for v in ctx["model"].Proto().variables]
+        assert sum(n.startswith("los") for n in names) == n_los
@@ -0,0 +1,74 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+from ortools.sat.python import cp_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+# Wed..Tue of the following week: one Saturday/Sunday pair in the middle
+DAYS = ["2025-10-08", "2025-10-09", "2025-10-10", "2025-10-11", "2025-10-12", "2025-10-13",
+        "2025-10-14", "2025-10-15", "2025-10-16", "2025-10-17"]
+SOLVER = {"num_threads": 1, "lns_step_seconds": 1}
+
+
+def _case():
+    shifts = []
+    for d in DAYS:
+        for t, (st, en) in (("MD_D", ("08:00", "16:00")), ("MD_N", ("20:00", "23:00"))):
+            shifts.append({"id": f"{t}_{d}", "date": d, "type": t, "allowed_provider_types": ["MD"],
+                           "start": f"{d}T{st}:00", "end": f"{d}T{en}:00"})
+    providers = [{"name": f"P{i}", "type": "MD", "limits": {"min_total": 3, "max_total": 8},
+                  "max_consecutive_days": 3, "forbidden_days_soft": [DAYS[i], DAYS[i + 5]],
+                  "preferred_days_soft": {DAYS[-1 - i]: ["MD_N"]}} for i in range(4)]
+    return {"calendar": {"days": DAYS, "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": shifts, "providers": providers}
+
+
+def _phase2_ctx():
+    consts = {"solver": SOLVER}
+    ctx = tcg.build_model(consts, _case())
+    hard, _ = tcg.solve_phase1(consts, ctx, 10, seed=1)
+    return tcg.build_phase2_objective(consts, ctx, hard)
+
+
+def test_neighbourhood_shapes():
+    ctx = _phase2_ctx()
+    rng = random.Random(0)
+    week = tcg._lns_neighbourhood(ctx, "week", rng, 0.5)
+    days = sorted({ctx["shift_day"][s] for s, _ in week})
+    assert len(days) == 4 and days == list(range(days[0], days[0] + 4))
+    weekend = tcg._lns_neighbourhood(ctx, "weekend", rng, 1.0)
+    assert sorted({ctx["shift_day"][s] for s, _ in weekend}) == [2, 3, 4, 5]  # Fri..Mon
+    one_type = tcg._lns_neighbourhood(ctx, "shift_type", rng, 1.0)
+    assert len({ctx["shift_type"][s] for s, _ in one_type}) == 1 and len(one_type) == 4 * len(DAYS)
+    two = tcg._lns_neighbourhood(ctx, "providers", rng, 1.0)
+    assert len({j for _, j in two}) == 2 and len(two) == 2 * len(ctx["S"])
+
+
+def test_lns_never_worsens_and_restores_domains():
+    ctx = _phase2_ctx()
+    model = ctx["model"]
+    before = [list(v.Proto().domain) for v in ctx["x"].values()]
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = 1
+    solver.parameters.max_time_in_seconds = 5  # stops at the first solution
+    solver.parameters.stop_after_first_solution = True
+    assert solver.Solve(model) in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    start = solver.ObjectiveValue()
+
+    best, best_obj, meta = tcg.lns_improve(ctx, list(solver.ResponseProto().solution), start,
+                                           SOLVER, 4, seed=3)
+    assert best_obj <= start and meta["steps"] >= 1
+    assert [list(v.Proto().domain) for v in ctx["x"].values()] == before
+    check = cp_model.CpSolver()
+    for idx, v in enumerate(best):
+        model.Add(model.GetIntVarFromProtoIndex(idx) == v)
+    assert check.Solve(model) == cp_model.OPTIMAL and check.ObjectiveValue() == best_obj
+
+
+def test_unknown_neighbourhood():
+    with pytest.raises(ValueError):
+        tcg.lns_improve(_phase2_ctx(), [], None, {"lns_neighbourhoods": ["month"]}, 1)
@@ -0,0 +1,78 @@
+import copy
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+
+def _case(tmp_path):
+    days = ["2025-10-06", "2025-10-07", "2025-10-08"]
+    shifts = []
+    for d in days:
+        for t, (st, en) in (("MD_D", ("08:00", "16:00")), ("MD_N", ("20:00", "23:00"))):
+            shifts.append({"id": f"{t}_{d}", "date": d, "type": t, "allowed_provider_types": ["MD"],
+                           "start": f"{d}T{st}:00", "end": f"{d}T{en}:00"})
+    providers = [{"name": f"P{i}", "type": "MD", "limits": {"min_total": 1, "max_total": 3},
+                  "max_consecutive_days": 3} for i in range(3)]
+    consts = {"solver": {"max_time_in_seconds": 10, "num_threads": 1,
+                         "model_cache_dir": str(tmp_path)}}
+    case = {"calendar": {"days": days, "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": shifts, "providers": providers, "run": {"k": 1, "L": 0, "seed": 1}}
+    return consts, case
+
+
+def test_key_ignores_run_time_settings_only(tmp_path):
+    consts, case = _case(tmp_path)
+    key = tcg._model_cache_key(consts, case)
+
+    c2, k2 = copy.deepcopy(consts), copy.deepcopy(case)
+    c2["solver"].update(max_time_in_seconds=999, num_threads=16, phase1_fraction=0.1)
+    k2["run"] = {"k": 5, "L": 3, "seed": 7}
+    assert tcg._model_cache_key(c2, k2) == key
+
+    k2["providers"][0]["limits"]["max_total"] = 2
+    assert tcg._model_cache_key(c2, k2) != key
+
+
+def test_hit_restores_model_and_phase1(tmp_path):
+    consts, case = _case(tmp_path)
+    ctx = tcg.build_model_cached(consts, case)
+    assert ctx["model_cache"]["hit"] is False
+    hard, meta1 = tcg.solve_phase1(consts, ctx, 5, seed=1)
+    ctx["phase1_values"], ctx["phase1_meta"] = hard, meta1
+    tcg._model_cache_store(consts, ctx)
+
+    cached = tcg.build_model_cached(consts, case)
+    assert cached["model_cache"]["hit"] is True
+    assert cached["model"].Proto() == ctx["model"].Proto()
+    assert {k: v.Index() for k, v in cached["x"].items()} == {k: v.Index() for k, v in ctx["x"].items()}
+    assert cached["phase1_values"] == hard
+    assert cached["phase1_solution"] == ctx["phase1_solution"]
+    assert cached["shifts"] is case["shifts"]
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    for n, age in (("old", 300), ("mid", 200), ("new", 100)):
+        path = tmp_path / f"{n}.pkl"
+        path.write_bytes(b"x" * 1000)
+        os.utime(path, (1e9 - age, 1e9 - age))
+    tcg._model_cache_evict(str(tmp_path), 2000)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["mid.pkl", "new.pkl"]
+
+
+def test_cache_skips_entries_others_can_write(tmp_path):
+    consts, case = _case(tmp_path / "cache")
+    ctx = tcg.build_model_cached(consts, case)
+    assert (tmp_path / "cache").stat().st_mode & 0o777 == 0o700
+    tcg._model_cache_store(consts, ctx)
+    (entry,) = (tmp_path / "cache").iterdir()
+    assert entry.stat().st_mode & 0o777 == 0o600
+    assert tcg.build_model_cached(consts, case)["model_cache"]["hit"] is True
+
+    entry.chmod(0o666)
+    assert tcg.build_model_cached(consts, case)["model_cache"]["hit"] is False
+    entry.chmod(0o600)
+    (tmp_path / "cache").chmod(0o777)
+    assert "model_cache" not in tcg.build_model_cached(consts, case)
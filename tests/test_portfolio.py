@@ -0,0 +1,50 @@
+import multiprocessing
+import sys
+from pathlib import Path
+
+from ortools.sat.python import cp_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+from test_lns import SOLVER, _case, _phase2_ctx
+
+
+def test_shared_incumbent_caps_lns_steps(monkeypatch):
+    monkeypatch.setattr(tcg, "_portfolio_incumbent", None)
+    assert tcg._portfolio_cutoff() is None
+    tcg._portfolio_publish(5.0)  # no portfolio: nothing to publish to
+    tcg._portfolio_init(multiprocessing.get_context("spawn").Value("d", float("inf")))
+    assert tcg._portfolio_cutoff() is None
+    tcg._portfolio_publish(7.0)
+    tcg._portfolio_publish(9.0)
+    assert tcg._portfolio_cutoff() == 7.0
+
+    ctx = _phase2_ctx()
+    model = ctx["model"]
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = 1
+    solver.parameters.max_time_in_seconds = 0.2
+    solver.parameters.stop_after_first_solution = True
+    assert solver.Solve(model) in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    start = solver.ObjectiveValue()
+    # an incumbent nobody can reach: every step fails, the start stays, the domain comes back
+    tcg._portfolio_publish(start - 1e15)
+    best, best_obj, meta = tcg.lns_improve(ctx, list(solver.ResponseProto().solution), start, SOLVER, 2, seed=3)
+    assert best_obj == start and meta["improvements"] == 0
+    assert all(s["status_name"] in ("INFEASIBLE", "UNKNOWN") for s in meta["history"])
+    assert list(model.Proto().objective.domain) == []
+    monkeypatch.setattr(tcg, "_portfolio_incumbent", None)
+
+
+def test_portfolio_merges_member_pools():
+    case = _case()
+    case["run"] = {"L": 2}
+    consts = {"solver": dict(SOLVER, num_threads=2, max_time_in_seconds=12, model_cache=False, portfolio=2)}
+    tables, meta = tcg.solve_portfolio(consts, case, 2, seed=4)
+    m2 = meta["phase2"]
+    assert m2["status_name"] == "PORTFOLIO" and [m["seed"] for m in m2["members"]] == [4, 5]
+    assert all(m["best_objective"] is not None for m in m2["members"])
+    assert m2["best_objective"] <= min(m["best_objective"] for m in m2["members"])
+    assert m2["solutions_collected"] >= max(m["solutions_collected"] for m in m2["members"])
+    assert len(tables) == 2 and m2["per_table"][0]["objective"] == m2["best_objective"]
+    assert len(set(tables[0]["assignment"]) ^ set(tables[1]["assignment"])) >= 2
@@ -0,0 +1,89 @@
+import sys
+from pathlib import Path
+
+from ortools.sat.python import cp_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+
+def _prov(name, **kw):
+    p = {"name": name, "type": "MD", "limits": {"min_total": 0, "max_total": 3},
+         "max_consecutive_days": 3, "forbidden_days_hard": [], "preferred_days_hard": {},
+         "preferred_days_soft": {}}
+    p.update(kw)
+    return p
+
+
+def test_classes_ignore_names_and_unused_fields():
+    providers = [
+        _prov("A"),
+        _prov("B", weekday_pref={"Monday": 1}),
+        _prov("C", forbidden_days_hard=["2025-10-06"]),
+        _prov("D", type="NP"),
+        _prov("E", forbidden_days_hard=["2025-10-06"]),
+        _prov("F", preferred_days_soft={"2025-10-07": ["ANY"]}),
+    ]
+    assert tcg._provider_symmetry_classes(providers) == [[0, 1], [2, 4]]
+
+
+def _x_patterns(mode):
+    days = ["2025-10-06", "2025-10-07", "2025-10-08"]
+    shifts = [{"id": f"D_{d}", "date": d, "type": "MD_D", "allowed_provider_types": ["MD"],
+               "start": f"{d}T08:00:00", "end": f"{d}T16:00:00"} for d in days]
+    case = {"calendar": {"days": days, "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": shifts, "providers": [_prov("A"), _prov("B"), _prov("C")]}
+    ctx = tcg.build_model({"solver": {"symmetry_breaking": mode}}, case)
+    model = ctx["model"]
+    model.ClearObjective()
+    keys = sorted(ctx["x"])
+    seen = set()
+    # project onto x: forbid each pattern found until none is left
+    while True:
+        solver = cp_model.CpSolver()
+        solver.parameters.num_workers = 1
+        if solver.Solve(model) not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return keys, seen
+        vec = tuple(solver.Value(ctx["x"][k]) for k in keys)
+        seen.add(vec)
+        model.AddBoolOr([ctx["x"][k].Not() if v else ctx["x"][k] for k, v in zip(keys, vec)])
+
+
+def _canonical(keys, vec):
+    cols = {}
+    for (s, j), v in zip(keys, vec):
+        cols.setdefault(j, []).append(v)
+    return tuple(sorted(tuple(c) for c in cols.values()))
+
+
+def test_lex_keeps_one_schedule_per_permutation_class():
+    keys, full = _x_patterns("off")
+    _, lex = _x_patterns("lex")
+    assert len(lex) < len(full)
+    assert {_canonical(keys, v) for v in lex} == {_canonical(keys, v) for v in full}
+    assert len({_canonical(keys, v) for v in lex}) == len(lex)
+
+
+def test_count_ordering_keeps_every_schedule_up_to_permutation():
+    keys, full = _x_patterns("off")
+    _, count = _x_patterns("count")
+    assert len(count) < len(full)
+    assert {_canonical(keys, v) for v in count} == {_canonical(keys, v) for v in full}
+
+
+def test_carry_in_separates_window_providers():
+    # A ends the previous window on a 3-day streak, so only B can take the first day
+    day = "2025-10-06"
+    case = {"calendar": {"days": [day], "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": [{"id": f"D_{day}", "date": day, "type": "MD_D", "allowed_provider_types": ["MD"],
+                        "start": f"{day}T08:00:00", "end": f"{day}T16:00:00"}],
+            "providers": [_prov("A", carry_in={"streak": 3, "blocked_shifts": []}),
+                          _prov("B", carry_in={"streak": 0, "blocked_shifts": []})]}
+    assert tcg._provider_symmetry_classes(case["providers"]) == []
+    assert tcg._provider_symmetry_classes([_prov("A", carry_in={"streak": 1}), _prov("B", carry_in={"streak": 1})]) \
+        == [[0, 1]]
+    for mode in ("count", "lex"):
+        consts = {"solver": {"num_threads": 1, "symmetry_breaking": mode, "model_cache": False}}
+        ctx = tcg.build_model(consts, case)
+        tables, _ = tcg.solve_two_phase(consts, case, ctx, 1, seed=1)
+        assert tables[0]["assignment"] == ((0, 1),), mode
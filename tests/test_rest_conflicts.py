@@ -0,0 +1,59 @@
+import random
+import sys
+from datetime import datetime, timedelta
+from itertools import combinations
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+
+def _pairwise_conflicts(shifts):
+    """Reference O(S^2) check, same rule as the original build_model loop."""
+    out = set()
+    for a, b in combinations(range(len(shifts)), 2):
+        sa, ea = (datetime.fromisoformat(shifts[a][k]) for k in ('start', 'end'))
+        sb, eb = (datetime.fromisoformat(shifts[b][k]) for k in ('start', 'end'))
+        if sa > sb:
+            sa, ea, sb = sb, eb, sa
+        if sb < ea or (sb - ea).total_seconds() < 12 * 3600:
+            out.add((a, b))
+    return out
+
+
+def _clique_pairs(cliques):
+    return {pair for c in cliques for pair in combinations(sorted(c), 2)}
+
+
+def _random_shifts(n, seed):
+    rnd = random.Random(seed)
+    base = datetime(2025, 10, 1)
+    shifts = []
+    for i in range(n):
+        st = base + timedelta(hours=rnd.randrange(0, 24 * 14), minutes=rnd.choice((0, 30)))
+        en = st + timedelta(hours=rnd.choice((4, 8, 10, 12, 24)))
+        shifts.append({'id': f's{i}', 'start': st.isoformat(), 'end': en.isoformat()})
+    return shifts
+
+
+def test_cliques_cover_exactly_the_conflicting_pairs():
+    for seed in range(20):
+        shifts = _random_shifts(60, seed)
+        assert _clique_pairs(tcg._rest_conflict_cliques(shifts)) == _pairwise_conflicts(shifts)
+
+
+def test_exactly_twelve_hours_apart_is_allowed():
+    shifts = [
+        {'id': 'day', 'start': '2025-10-01T08:00:00', 'end': '2025-10-01T16:00:00'},
+        {'id': 'next', 'start': '2025-10-02T04:00:00', 'end': '2025-10-02T12:00:00'},
+        {'id': 'close', 'start': '2025-10-02T03:59:00', 'end': '2025-10-02T12:00:00'},
+    ]
+    assert _clique_pairs(tcg._rest_conflict_cliques(shifts)) == {(0, 2), (1, 2)}
+
+
+def test_timezone_suffixes_are_ignored():
+    shifts = [
+        {'id': 'a', 'start': '2025-10-01T08:00:00Z', 'end': '2025-10-01T16:00:00Z'},
+        {'id': 'b', 'start': '2025-10-01T20:00:00+02:00', 'end': '2025-10-02T04:00:00+02:00'},
+    ]
+    assert _clique_pairs(tcg._rest_conflict_cliques(shifts)) == {(0, 1)}
@@ -0,0 +1,89 @@
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+from ortools.sat.python import cp_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+DAYS = [(date(2025, 10, 6) + timedelta(days=k)).isoformat() for k in range(17)]
+
+
+def _case():
+    shifts = []
+    for d in DAYS:
+        # the 20:00-23:59 night leaves no 12h rest before the next day's 08:00
+        for t, (st, en) in (("MD_D", ("08:00", "16:00")), ("MD_N", ("20:00", "23:59"))):
+            shifts.append({"id": f"{t}_{d}", "date": d, "type": t, "allowed_provider_types": ["MD"],
+                           "start": f"{d}T{st}:00", "end": f"{d}T{en}:00"})
+    providers = [{"name": f"P{i}", "type": "MD", "limits": {"min_total": 6, "max_total": 10},
+                  "max_consecutive_days": 3} for i in range(4)]
+    return {"calendar": {"days": DAYS, "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": shifts, "providers": providers}
+
+
+def test_windows_overlap_and_commit_everything_once():
+    assert tcg._rolling_windows(17, 10, 7) == [(0, 10, 7), (7, 17, 17)]
+    assert tcg._rolling_windows(90, 35, 28) == [(0, 35, 28), (28, 63, 56), (56, 90, 90)]
+    assert tcg._rolling_windows(5, 35, 28) == [(0, 5, 5)]
+    assert tcg._rolling_windows(93, 35, 28) == [(0, 35, 28), (28, 63, 56), (56, 93, 93)]  # 2-day tail absorbed
+    with pytest.raises(ValueError):
+        tcg._rolling_windows(30, 7, 10)
+
+
+def test_carried_streak_counts_against_the_cap():
+    case = _case()
+    case["calendar"]["days"] = DAYS[:2]
+    case["shifts"] = [s for s in case["shifts"] if s["date"] in DAYS[:2]]
+    case["providers"] = [dict(case["providers"][0], carry_in={"streak": 3, "blocked_shifts": [f"MD_D_{DAYS[0]}"]})]
+    ctx = tcg.build_model({"solver": {"num_threads": 1}}, case)
+    assert (0, 0) not in ctx["x"]  # the morning after a night stays closed
+    model = ctx["model"]
+    model.Add(ctx["y"][0, 0] == 1)
+    model.Minimize(ctx["hard_slacks"]["slack_consec"][0])
+    solver = cp_model.CpSolver()
+    assert solver.Solve(model) == cp_model.OPTIMAL
+    assert solver.ObjectiveValue() == 1  # a fourth day in a row
+
+
+def test_stitched_schedule_respects_rest_and_streaks_across_windows():
+    case = _case()
+    consts = {"solver": {"num_threads": 1, "max_time_in_seconds": 20, "model_cache": False,
+                         "rolling_window_days": 10, "rolling_step_days": 7}}
+    tables, meta = tcg.solve_rolling_horizon(consts, case, 2, seed=1)
+    assert [w["days"] for w in meta["phase2"]["windows"]] == [[DAYS[0], DAYS[9]], [DAYS[7], DAYS[16]]]
+    assert 1 <= len(tables) <= 2
+    for table in tables:
+        assign = table["assignment"]
+        assert len({s for s, _ in assign}) == len(assign)
+        for j in range(4):
+            mine = sorted(s for s, jj in assign if jj == j)
+            assert len(mine) <= 10
+            worked = {case["shifts"][s]["date"] for s in mine}
+            run = 0
+            for d in DAYS:
+                run = run + 1 if d in worked else 0
+                assert run <= 3
+            for a, b in zip(mine, mine[1:]):
+                # a night followed by the next morning is the only rest conflict here
+                assert not (case["shifts"][a]["type"] == "MD_N" and b == a + 1)
+
+
+def test_committed_days_survive_a_failed_last_window(monkeypatch):
+    case = _case()
+    consts = {"solver": {"num_threads": 1, "max_time_in_seconds": 10, "model_cache": False,
+                         "rolling_window_days": 10, "rolling_step_days": 7}}
+    solve = tcg.solve_two_phase
+
+    def last_window_fails(consts, case, ctx, K, seed=None):
+        if case["calendar"]["days"][-1] == DAYS[-1]:
+            return [], {"phase1": None, "phase2": None}
+        return solve(consts, case, ctx, K, seed=seed)
+
+    monkeypatch.setattr(tcg, "solve_two_phase", last_window_fails)
+    tables, meta = tcg.solve_rolling_horizon(consts, case, 2, seed=1)
+    assert len(tables) == 1 and meta["phase2"]["windows"][-1]["tables"] == 0
+    days = {case["shifts"][s]["date"] for s, _ in tables[0]["assignment"]}
+    assert days and max(days) <= DAYS[6]  # the first window's committed days only
@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+from ortools.sat.python import cp_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+from test_lns import DAYS, _case
+
+
+def _scarce_case():
+    case = _case()
+    # P0..P2 cannot work the 3rd day: its two shifts are left with one candidate each
+    for p in case["providers"][:3]:
+        p["forbidden_days_hard"] = [DAYS[2]]
+    return case
+
+
+def test_scarcity_counts_candidates_and_rest_conflicts():
+    ctx = tcg.build_model({"solver": {}}, _scarce_case())
+    scarcity, shifts = ctx["shift_scarcity"], ctx["shifts"]
+    by_id = {sh["id"]: scarcity[s] for s, sh in enumerate(shifts)}
+    # day shift conflicts with the previous night and its own night, the first one only with its night
+    assert by_id[f"MD_D_{DAYS[0]}"] == (4, 1)
+    assert by_id[f"MD_D_{DAYS[1]}"] == (4, 2) and by_id[f"MD_N_{DAYS[1]}"] == (4, 2)
+    assert by_id[f"MD_D_{DAYS[2]}"] == (1, 2) and by_id[f"MD_N_{DAYS[2]}"] == (1, 2)
+    assert by_id[f"MD_N_{DAYS[-1]}"] == (4, 1)
+
+
+def test_strategy_branches_on_scarce_shifts_first():
+    case = _scarce_case()
+    assert not tcg.build_model({"solver": {}}, case)["model"].Proto().search_strategy
+    ctx = tcg.build_model({"solver": {"scarcity_strategy": True}}, case)
+    model, x = ctx["model"], ctx["x"]
+    (strategy,) = model.Proto().search_strategy
+    assert strategy.variable_selection_strategy == cp_model.CHOOSE_FIRST
+    assert strategy.domain_reduction_strategy == cp_model.SELECT_MAX_VALUE
+    key_of = {v.Index(): k for k, v in x.items()}
+    order = [key_of[i] for i in strategy.variables]
+    assert sorted(order) == sorted(x)
+    first = {ctx["shifts"][s]["id"] for s, _ in order[:8]}  # 4 x vars each
+    assert first == {f"MD_D_{DAYS[2]}", f"MD_N_{DAYS[2]}"}
+
+    model.Minimize(ctx["U"])
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = 1
+    solver.parameters.search_branching = cp_model.FIXED_SEARCH
+    solver.parameters.stop_after_first_solution = True
+    solver.parameters.max_time_in_seconds = 10
+    assert solver.Solve(model) in (cp_model.OPTIMAL, cp_model.FEASIBLE)
@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import fastapi_solver_service as svc
+from test_capacity_precheck import _case, _prov
+
+
+def test_rejected_case_is_not_solved_by_the_fallbacks(monkeypatch, tmp_path):
+    if svc._tcg is None:
+        pytest.skip("testcase_gui is not importable from the service")
+
+    def _no_solve(*a, **kw):
+        raise AssertionError("a rejected case must not be solved")
+
+    monkeypatch.setattr(svc._tcg, "build_model", _no_solve)
+    monkeypatch.setattr(svc._tcg, "solve_two_phase", _no_solve)
+    monkeypatch.setattr(svc.solver, "output_dir", tmp_path)
+    case = _case([_prov("A", 0, 20), _prov("B", 0, 4)])  # 14 of 20 shifts coverable
+    case["constants"] = {"solver": {"capacity_precheck": "reject"}}
+
+    out = svc.solver._solve_with_ortools(case, "precheck-run")
+    assert out["status"] == "success"
+    result = out["result"]
+    assert result["solver_status"] == "REJECTED" and result["rejected"] == "capacity_precheck"
+    assert result["solutions"] == [] and result["capacity_precheck"]["unfilled_lower_bound"] == 6
+
+    payload = svc.solver._to_webapp_response(result, "precheck-run")
+    assert payload["status"] == "rejected" and payload["rejected"] == "capacity_precheck"
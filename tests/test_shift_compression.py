@@ -0,0 +1,64 @@
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+DAYS = ["2025-10-08", "2025-10-09", "2025-10-10", "2025-10-11", "2025-10-12", "2025-10-13", "2025-10-14"]
+
+
+def _case(n_days=7, n_prov=5):
+    # two identical ED day shifts and one night per day
+    days, shifts = DAYS[:n_days], []
+    for d in days:
+        for t, (st, en), ids in (("ED_D", ("08:00", "16:00"), ("a", "b")), ("ED_N", ("20:00", "23:00"), ("",))):
+            for suffix in ids:
+                shifts.append({"id": f"{t}_{d}{suffix}", "date": d, "type": t, "allowed_provider_types": ["MD"],
+                               "start": f"{d}T{st}:00", "end": f"{d}T{en}:00"})
+    providers = [{"name": f"P{i}", "type": "MD", "limits": {"min_total": 2 * n_days // n_prov, "max_total": n_days},
+                  "max_consecutive_days": 3, "forbidden_days_soft": [days[i % n_days], days[(i + 3) % n_days]],
+                  "preferred_days_soft": {days[-1 - i % n_days]: ["ED_N"]}} for i in range(n_prov)]
+    return {"calendar": {"days": days, "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": shifts, "providers": providers}
+
+
+def test_identical_shifts_form_slot_classes():
+    case = _case()
+    small, classes = tcg._compress_identical_shifts(case)
+    assert len(small["shifts"]) == len(classes) == 14
+    assert [len(c) for c in classes] == [2, 1] * 7
+    assert small["shifts"][0] == dict(case["shifts"][0], demand=2) and "demand" not in small["shifts"][1]
+    assert "demand" not in case["shifts"][0]
+    case["shifts"][1]["start"] = f"{DAYS[0]}T09:00:00"  # no longer identical
+    assert tcg._compress_identical_shifts(case)[1][0] == [0]
+    assert tcg._compress_identical_shifts(dict(case, shifts=case["shifts"][2:4])) == \
+        (dict(case, shifts=case["shifts"][2:4]), None)
+
+
+def _solve(case):
+    # the per-type cluster term walks a type's shifts in order, so on the uncompressed
+    # list it depends on which copy a provider takes; without it both models agree
+    consts = {"solver": {"num_threads": 1, "max_time_in_seconds": 20, "model_cache": False},
+              "weights": {"soft": {"cluster": 0}}}
+    ctx = tcg.build_model(consts, case)
+    tables, meta = tcg.solve_two_phase(consts, case, ctx, 1, seed=1)
+    return ctx, tables, meta
+
+
+def test_compressed_solve_expands_to_the_same_optimum():
+    case = _case(5, 4)
+    small, classes = tcg._compress_identical_shifts(case)
+    ctx, tables, meta = _solve(small)
+    assert ctx["shift_demand"] == [2, 1] * 5 and len(ctx["x"]) == 10 * 4
+    full_ctx, _, full_meta = _solve(case)
+    assert len(full_ctx["x"]) == 15 * 4
+    assert meta["phase2"]["status_name"] == full_meta["phase2"]["status_name"] == "OPTIMAL"
+    assert meta["phase2"]["best_objective"] == full_meta["phase2"]["best_objective"]
+
+    (table,) = tcg._expand_compressed_tables(tables, case, classes)
+    assert table["shifts"] is case["shifts"]
+    assert len(table["assignment"]) == len(tables[0]["assignment"])
+    assert max(Counter(s for s, _ in table["assignment"]).values()) == 1
+    for s, j in tables[0]["assignment"]:
+        assert sum(1 for t, i in table["assignment"] if i == j and t in classes[s]) == 1
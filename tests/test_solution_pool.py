@@ -0,0 +1,117 @@
+import random
+import sys
+import types
+from itertools import combinations
+from pathlib import Path
+
+from ortools.sat.python import cp_model
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+
+def _collect(**kw):
+    # 3 shifts, 3 providers, provider 2 cannot take shift 0; every shift goes to exactly one
+    model = cp_model.CpModel()
+    x = {(s, j): model.NewBoolVar(f"x_{s}_{j}") for s in range(3) for j in range(3) if (s, j) != (0, 2)}
+    for s in range(3):
+        model.AddExactlyOne(v for (ss, _), v in x.items() if ss == s)
+    cb = tcg.AssignmentPoolCollector(x, range(3), range(3), [], [], [], **kw)
+    solver = cp_model.CpSolver()
+    solver.parameters.enumerate_all_solutions = True
+    solver.parameters.num_workers = 1
+    solver.parameters.max_time_in_seconds = 10
+    solver.Solve(model, cb)
+    return cb
+
+
+def test_pool_packs_and_unpacks_assignments():
+    cb = _collect()
+    tables = [cb.table(k) for k in range(len(cb.pool))]
+    assigns = {t["assignment"] for t in tables}
+    assert len(assigns) == len(cb.pool) == len(cb._seen_vecs) == 2 * 3 * 3
+    for k, t in enumerate(tables):
+        assert sorted(s for s, _ in t["assignment"]) == [0, 1, 2]
+        assert len(cb.pool_vecs[k]) == 1  # 8 x keys in one byte
+        assert cb.pool[k][1]["assignments"] == 3
+
+
+def test_hamming_is_popcount_of_xor():
+    cb = _collect()
+    for a, b in combinations(range(len(cb.pool)), 2):
+        ta, tb = set(cb.table(a)["assignment"]), set(cb.table(b)["assignment"])
+        assert tcg._hamming(cb.pool_vecs[a], cb.pool_vecs[b]) == len(ta ^ tb)
+
+
+def test_pool_limit_bounds_the_pool():
+    cb = _collect(pool_limit=2)
+    assert len(cb.pool) == 2 and len(cb.pool_vecs) == 2 and len(cb._seen_vecs) == 2
+
+
+class _Feed(tcg.AssignmentPoolCollector):
+    # replays given solutions through the callback
+    def Response(self): return self.resp
+    def ObjectiveValue(self): return self.obj
+    def BestObjectiveBound(self): return 0
+    def NumConflicts(self): return 0
+    def NumBranches(self): return 0
+    def WallTime(self): return 0.0
+
+
+def _feed(stream, n_bits=40, **kw):
+    model = cp_model.CpModel()
+    x = {(s, 0): model.NewBoolVar(f"x_{s}") for s in range(n_bits)}
+    cb = _Feed(x, range(n_bits), [0], [], [], [], **kw)
+    for bits, obj in stream:
+        cb.resp, cb.obj = types.SimpleNamespace(solution=bits), obj
+        cb.on_solution_callback()
+    return cb
+
+
+def _stream(n, seed, n_bits=40):
+    rng = random.Random(seed)
+    base = [rng.random() < 0.3 for _ in range(n_bits)]
+    out = []
+    for _ in range(n):
+        out.append(([int(b ^ (rng.random() < 0.1)) for b in base], rng.randrange(1000)))
+    return out
+
+
+def test_bounded_pool_keeps_the_best_objectives():
+    stream = _stream(300, 1)
+    lowest, highest = {}, {}  # a re-found assignment keeps its best objective
+    for bits, obj in stream:
+        lowest[tuple(bits)] = min(obj, lowest.get(tuple(bits), obj))
+        highest[tuple(bits)] = max(obj, highest.get(tuple(bits), obj))
+    assert lowest != highest
+    cb = _feed(stream, pool_limit=7)
+    assert sorted(o for o, _ in cb.pool) == sorted(lowest.values())[:7]
+    assert len(cb._seen_vecs) == len(cb.pool_vecs) == 7
+    for (obj, meta), vec in zip(cb.pool, cb.pool_vecs):
+        assert meta["objective"] == obj and lowest[tuple(int(b) for b in tcg.np.unpackbits(
+            tcg.np.frombuffer(vec, dtype=tcg.np.uint8), count=40))] == obj
+    top = _feed(stream, pool_limit=7, sense="max")
+    assert sorted(o for o, _ in top.pool) == sorted(highest.values())[-7:]
+
+
+def test_refound_assignment_keeps_the_better_objective():
+    a, b = [1] * 4 + [0] * 36, [0] * 36 + [1] * 4
+    cb = _feed([(a, 50), (b, 30), (a, 10), (a, 20)], pool_limit=2)
+    assert sorted(o for o, _ in cb.pool) == [10, 30]
+    assert {o: m["objective"] for o, m in cb.pool} == {10: 10, 30: 30}
+    cb = _feed([(a, 50), (b, 30), (a, 10), ([1] * 40, 20)], pool_limit=2)
+    assert sorted(o for o, _ in cb.pool) == [10, 20]  # b, not the re-found a, is now the worst
+
+
+def test_min_distance_keeps_the_pool_spread():
+    stream = _stream(400, 2)
+    cb = _feed(stream, min_distance=8, reserve_size=3)
+    assert 3 <= len(cb.pool) < 100
+    for a, b in combinations(range(len(cb.pool)), 2):
+        assert tcg._hamming(cb.pool_vecs[a], cb.pool_vecs[b]) >= 8
+    assert min(o for o, _ in cb.pool) == min(o for _, o in stream)
+    assert len(cb.reserve) == 3
+    assert len(tcg._select_diverse_k(cb.pool, cb.pool_vecs, 3, 8, relax_to=8)) == 3
+    n = len(cb.pool)
+    cb.absorb_reserve()
+    assert len(cb.pool) == n + 3 and not cb.reserve
@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+
+DAYS = ["2025-10-09", "2025-10-10", "2025-10-11", "2025-10-12", "2025-10-13", "2025-10-14"]
+
+
+def _case():
+    shifts = []
+    for d in DAYS:
+        for t, (st, en), allowed in (("MD_D", ("08:00", "16:00"), ["MD"]), ("MD_N", ("20:00", "23:00"), ["MD", "RN"])):
+            shifts.append({"id": f"{t}_{d}", "date": d, "type": t, "allowed_provider_types": allowed,
+                           "start": f"{d}T{st}:00", "end": f"{d}T{en}:00"})
+    providers = [{"name": f"P{i}", "type": "MD", "limits": {"min_total": 2, "max_total": 5},
+                  "max_consecutive_days": 3, "forbidden_days_hard": [DAYS[i + 1]],
+                  "forbidden_days_soft": [DAYS[-1 - i]], "preferred_days_soft": {DAYS[i]: ["MD_N"]}}
+                 for i in range(3)]
+    providers.append({"name": "R0", "type": "RN", "limits": {"min_total": 1, "max_total": 3},
+                      "max_consecutive_days": 2})
+    return {"calendar": {"days": DAYS, "weekend_days": ["Saturday", "Sunday"]},
+            "shifts": shifts, "providers": providers}
+
+
+def _solve(sparse):
+    consts = {"solver": {"num_threads": 1, "max_time_in_seconds": 20, "model_cache": False,
+                         "sparse_vars": sparse},
+              "weights": {"hard": {"slack_cant_work": tcg.HARD_INF_WEIGHT}}}
+    case = _case()
+    ctx = tcg.build_model(consts, case)
+    tables, meta = tcg.solve_two_phase(consts, case, ctx, 1, seed=1)
+    return ctx, tables, meta
+
+
+def test_sparse_x_reaches_the_dense_optimum():
+    ctx, tables, meta = _solve(True)
+    dense_ctx, dense_tables, dense_meta = _solve(False)
+    # RN only on nights, and no MD provider on its hard-forbidden day
+    assert len(dense_ctx["x"]) == 12 * 4 and len(ctx["x"]) == 12 * 3 - 3 * 2 + 6
+    assert meta["phase1_stage"]["objective"] == dense_meta["phase1_stage"]["objective"]
+    assert meta["phase2"]["status_name"] == dense_meta["phase2"]["status_name"] == "OPTIMAL"
+    assert meta["phase2"]["best_objective"] == dense_meta["phase2"]["best_objective"]
+    assert tables and dense_tables
@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import testcase_gui as tcg
+from test_sparse_vars import _case
+
+
+def _solve(warm):
+    consts = {"solver": {"num_threads": 1, "max_time_in_seconds": 20, "model_cache": False,
+                         "phase2_warm_start": warm}}
+    case = _case()
+    ctx = tcg.build_model(consts, case)
+    tables, meta = tcg.solve_two_phase(consts, case, ctx, 1, seed=1)
+    return ctx, tables, meta["phase2"]
+
+
+def test_phase1_incumbent_warm_starts_phase2():
+    ctx, tables, m2 = _solve(True)
+    n_phase1 = len(ctx["phase1_solution"])
+    assert m2["warm_start"]["hinted_vars"] == n_phase1 and m2["warm_start"]["completed"] is True
+    # the completed hint covers the phase-2 variables too
+    proto = ctx["model"].Proto()
+    assert len(proto.variables) > n_phase1 and len(proto.solution_hint.vars) == len(proto.variables)
+
+    _, cold_tables, cold = _solve(False)
+    assert "warm_start" not in cold
+    assert tables and cold_tables and m2["status_name"] == "OPTIMAL"
+    assert m2["best_objective"] <= cold["best_objective"]
@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("boto3")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import solver_worker_ecs as worker
+from test_capacity_precheck import _case, _prov
+
+
+def test_rejected_case_is_reported_as_rejected(monkeypatch, tmp_path):
+    if worker.solver_core_real is None:
+        pytest.skip("solver_core_real is not importable from the worker")
+    statuses = []
+    monkeypatch.setattr(worker, "update_job_status", lambda run_id, status, meta: statuses.append((status, meta)))
+    monkeypatch.setattr(worker, "upload_results_to_s3", lambda run_id, output_dir, meta: "result_1")
+    monkeypatch.setattr(worker.SmoothProgressTracker, "start", lambda self: None)
+    case = _case([_prov("A", 0, 20), _prov("B", 0, 4)])  # 14 of 20 shifts coverable
+    case["constants"] = {"solver": {"capacity_precheck": "reject"}}
+
+    worker.process_solver_job({"run_id": "precheck-run", "case": case})
+    status, meta = statuses[-1]
+    assert status == "rejected" and meta["rejected"] == "capacity_precheck"
+    assert meta["solutions_count"] == 0 and meta["message"] == "Case rejected (capacity_precheck)"